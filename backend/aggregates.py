@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from backend.data_processing import bucket_sales
+
+
+# Acumuladores agrupados: nombre -> (columna de agrupación, columna sumada)
+GROUPED_SUMS = {
+    "profit_by_state": ("State", "Profit"),
+    "sales_by_region": ("Region", "Sales"),
+    "profit_by_product": ("Product_Name", "Profit"),
+    "sales_by_category": ("Category", "Sales"),
+    "sales_by_segment": ("Segment", "Sales"),
+    "profit_by_subcategory": ("Sub_Category", "Profit"),
+    "sales_by_ship_mode": ("Ship_Mode", "Sales"),
+}
+
+# Dimensiones de /config/filters -> acumulador cuyas claves son sus valores
+DIMENSION_SUMS = {
+    "segment": "sales_by_segment",
+    "state": "profit_by_state",
+    "sub_category": "profit_by_subcategory",
+    "ship_mode": "sales_by_ship_mode",
+}
+
+
+def _merge_sums(base, delta, inplace=False):
+    """
+    Suma 'delta' sobre 'base' (o sobre una copia si inplace=False). El costo depende
+    del tamaño de 'delta' y del número de claves distintas, no de las filas históricas.
+    """
+    merged = base if inplace else dict(base)
+    for key, value in delta.items():
+        merged[key] = merged.get(key, 0.0) + value
+    return merged
+
+
+class SalesAggregates:
+    """
+    Estado derivado del dataset que se puede actualizar de forma incremental:
+    - ventas diarias por (Categoría, Región), base de aggregate_sales,
+    - acumuladores de los KPIs globales de calculate_global_kpis.
+
+    Los objetos son inmutables en la práctica: update() devuelve uno nuevo y
+    solo copia las partes que toca el lote, así cada snapshot conserva su estado.
+    """
+
+    def __init__(self):
+        # (Categoría, Región) -> {día (Timestamp a medianoche): ventas}
+        self.daily_sales = {}
+        self.rows = 0
+        self.total_sales = 0.0
+        self.total_profit = 0.0
+        self.discount_sum = 0.0
+        self.discount_count = 0
+        self.shipping_days_sum = 0.0
+        self.shipping_days_count = 0
+        self.late_shipments = 0
+        self.grouped = {name: {} for name in GROUPED_SUMS}
+
+    # --- Construcción ---
+    @classmethod
+    def from_frame(cls, df):
+        return cls().accumulate(df)
+
+    def _copy(self):
+        clone = SalesAggregates.__new__(SalesAggregates)
+        clone.__dict__.update(self.__dict__)
+        clone.daily_sales = dict(self.daily_sales)
+        clone.grouped = dict(self.grouped)
+        return clone
+
+    def update(self, batch):
+        """
+        Devuelve un nuevo SalesAggregates con las filas de 'batch' incorporadas.
+        """
+        new = self._copy()
+        new._accumulate(batch, inplace=False)
+        return new
+
+    def accumulate(self, chunk):
+        """
+        Incorpora 'chunk' modificando este objeto. Pensado para la carga por bloques,
+        antes de publicar el snapshot (cuando nadie más lo está leyendo).
+        """
+        self._accumulate(chunk, inplace=True)
+        return self
+
+    def _accumulate(self, batch, inplace):
+        if batch is None or batch.empty:
+            return
+
+        # 1. Ventas diarias por (Categoría, Región)
+        days = batch['Order_Date'].dt.floor('D')
+        daily = batch.groupby(
+            [batch['Category'], batch['Region'], days], observed=True
+        )['Sales'].sum()
+        touched = {}
+        for (category, region, day), value in daily.items():
+            touched.setdefault((category, region), {})[day] = value
+        for key, delta in touched.items():
+            self.daily_sales[key] = _merge_sums(self.daily_sales.get(key, {}), delta, inplace)
+
+        # 2. KPIs financieros
+        self.rows += int(len(batch))
+        self.total_sales += float(batch['Sales'].sum())
+        self.total_profit += float(batch['Profit'].sum())
+        self.discount_sum += float(batch['Discount'].sum())
+        self.discount_count += int(batch['Discount'].count())
+
+        # 3. KPIs logísticos
+        shipping_time = (batch['Ship_Date'] - batch['Order_Date']).dt.days
+        self.shipping_days_sum += float(shipping_time.sum())
+        self.shipping_days_count += int(shipping_time.count())
+        self.late_shipments += int((shipping_time > 7).sum())
+
+        # 4. Sumas agrupadas (estado, región, producto, categoría...)
+        for name, (group_col, value_col) in GROUPED_SUMS.items():
+            if group_col not in batch.columns:
+                continue
+            delta = batch.groupby(group_col, observed=True)[value_col].sum().to_dict()
+            self.grouped[name] = _merge_sums(self.grouped[name], delta, inplace)
+
+    # --- Consultas ---
+    @property
+    def categories(self):
+        return sorted({category for category, _ in self.daily_sales})
+
+    @property
+    def regions(self):
+        return sorted({region for _, region in self.daily_sales})
+
+    def dimension_values(self, dim):
+        """
+        Valores de una dimensión filtrable presentes en los datos (sin leer las filas).
+        """
+        return sorted(str(value) for value in self.grouped.get(DIMENSION_SUMS.get(dim), {}))
+
+    def sales_series(self, category="All Categories", region="All Regions", frequency="ME"):
+        """
+        Equivalente a aggregate_sales() pero a partir de las ventas diarias acumuladas.
+        """
+        days, sales = [], []
+        for (cat, reg), daily in self.daily_sales.items():
+            if (category == "All Categories" or cat == category) and (region == "All Regions" or reg == region):
+                days.extend(daily.keys())
+                sales.append(np.fromiter(daily.values(), dtype=np.float64, count=len(daily)))
+        if not days:
+            return pd.Series(dtype='float64'), False
+
+        index = pd.DatetimeIndex(days)
+        ts_aggregated = bucket_sales(
+            index.as_unit('s').asi8 // 86400, np.concatenate(sales), frequency, index.unit
+        )
+        return ts_aggregated, True
+
+    def to_kpis(self):
+        """
+        Devuelve el mismo diccionario que calculate_global_kpis() sin recorrer las filas.
+        """
+        if self.rows == 0:
+            return {}
+
+        def _sorted(name, ascending=False):
+            return pd.Series(self.grouped[name], dtype='float64').sort_values(ascending=ascending)
+
+        sales_by_region = dict(self.grouped["sales_by_region"])
+        product_profit = _sorted("profit_by_product")
+
+        return {
+            # Financieros
+            "total_sales": self.total_sales,
+            "total_profit": self.total_profit,
+            "total_orders": self.rows,
+            "avg_discount": self.discount_sum / self.discount_count if self.discount_count else float('nan'),
+            "profit_ratio": self.total_profit / self.total_sales if self.total_sales != 0 else 0,
+            "avg_ticket": self.total_sales / max(1, self.rows),
+            # Logistica
+            "avg_shipping_time": (
+                self.shipping_days_sum / self.shipping_days_count if self.shipping_days_count else float('nan')
+            ),
+            "pct_late_shipments": self.late_shipments / self.rows * 100,
+            # Geografía
+            "profit_by_state": dict(self.grouped["profit_by_state"]),
+            "sales_by_region": sales_by_region,
+            "top_region": max(sales_by_region, key=sales_by_region.get) if sales_by_region else "N/A",
+            "bottom_region": min(sales_by_region, key=sales_by_region.get) if sales_by_region else "N/A",
+            # Producto
+            "top_10_products_profit": product_profit.head(10).to_dict(),
+            "bottom_10_products_profit": product_profit.tail(10).sort_values(ascending=True).to_dict(),
+            # Categoría/Segmento/Subcategoría
+            "sales_by_category": _sorted("sales_by_category").to_dict(),
+            "sales_by_segment": _sorted("sales_by_segment").to_dict(),
+            "profit_by_subcategory": _sorted("profit_by_subcategory").to_dict()
+        }
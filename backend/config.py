@@ -1,29 +1,153 @@
+import os
+import threading
 from fastapi import HTTPException
-# Importamos la función de carga desde su nueva ubicación
-from backend.data_processing import load_data 
-
-# 2. Carga de Datos (Lógica de api_service.py) 
-DF_RAW, STATUS = load_data() 
-
-if DF_RAW is None:
-    print(f"FATAL ERROR: Datos no cargados. Razón: {STATUS}") # 
-    # En un escenario real, podrías querer que la app falle si no carga datos.
-    # Por ahora, dejamos que las variables se inicialicen como None o vacías.
-    CATEGORIES = ['All Categories']
-    REGIONS = ['All Regions']
-    FREQUENCIES = {"Mensual (M)": "M"}
-else:
-    print("Datos cargados y preprocesados exitosamente.") 
-    CATEGORIES = ['All Categories'] + sorted(DF_RAW['Category'].unique().tolist()) 
-    REGIONS = ['All Regions'] + sorted(DF_RAW['Region'].unique().tolist()) 
-    # Definimos las frecuencias que soporta nuestro API 
-    FREQUENCIES = { 
-        "Mensual (ME)": "ME", 
-        "Trimestral (QE)": "QE", 
-        "Anual (AE)": "AE" 
-    }
-
-# Función helper para verificar el estado de los datos en los routers
+# El dataset vive en un contenedor versionado que permite recargarlo sin reiniciar
+from backend.data_processing import FILE_NAME, PROJECT_ROOT
+from backend.dataset_store import DatasetHolder
+from backend.services.job_service import JobManager
+from backend.services.model_cache import ModelCache
+from backend.services.model_registry import ModelRegistry
+from backend.services.order_store import SarimaOrderStore
+from backend.services.precompute_service import Precomputer
+from backend.streaming import DEFAULT_CHUNK_ROWS
+
+# 1. Frecuencias que soporta nuestro API (no dependen de los datos)
+FREQUENCIES = { 
+    "Mensual (ME)": "ME", 
+    "Trimestral (QE)": "QE", 
+    "Anual (AE)": "AE",
+    "Semanal (W)": "W",
+    "Diario (D)": "D"
+}
+
+# 2. Estado de los Datos
+# La carga se hace en segundo plano (ver lifespan en backend/main.py) para que el
+# servidor acepte conexiones de inmediato. Cada recarga publica un snapshot nuevo
+# (datos + filtros) con un número de versión; las peticiones en curso terminan con
+# el snapshot que tomaron al empezar.
+# Fuente de datos: el Excel de Superstore por defecto, o una exportación CSV/Parquet
+# (archivo o directorio de partes) que se carga por bloques de DATA_CHUNK_ROWS filas.
+# Con DATA_KEEP_ROWS=disk las filas limpias se guardan en disco en lugar de en memoria.
+DATA_SOURCE = os.getenv("DATA_SOURCE", FILE_NAME)
+DATA_CHUNK_ROWS = int(os.getenv("DATA_CHUNK_ROWS", str(DEFAULT_CHUNK_ROWS)))
+DATA_KEEP_ROWS = os.getenv("DATA_KEEP_ROWS", "memory")
+
+DATASET = DatasetHolder(DATA_SOURCE, chunk_rows=DATA_CHUNK_ROWS, keep_rows=DATA_KEEP_ROWS)
+
+# Cada lote de /data/transactions publica una versión, pero los listeners costosos
+# (purga de la caché, modelos globales y precálculo) corren como máximo una vez cada
+# DATA_APPEND_COALESCE_SECONDS segundos con la última versión. Las recargas del
+# archivo fuente los disparan de inmediato.
+DATA_APPEND_COALESCE_SECONDS = float(os.getenv("DATA_APPEND_COALESCE_SECONDS", "60"))
+
+
+def _warm_snapshot(snapshot):
+    # El cubo se construye en segundo plano al publicar
+    # cada versión, para que la primera petición no pague ese costo
+    threading.Thread(target=snapshot.warm, name=f"dataset-warm-v{snapshot.version}", daemon=True).start()
+
+
+DATASET.add_listener(_warm_snapshot)
+
+# 3. Caché de modelos entrenados
+# Un segmento (modelo, categoría, región, frecuencia, filtros) se entrena una vez por
+# versión del dataset; cambiar el horizonte solo vuelve a pronosticar.
+# El límite es por memoria: un precálculo completo guarda cientos de modelos y
+# backtests pequeños. MODEL_CACHE_MAX_ENTRIES > 0 agrega un tope por cantidad.
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "0"))
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "256"))
+# Últimos pronósticos y métricas por segmento (pocos KB cada uno): se sirven sin
+# tocar el modelo mientras no cambien los datos y respaldan las respuestas degradadas
+MODEL_CACHE_MAX_LATEST = int(os.getenv("MODEL_CACHE_MAX_LATEST", "2048"))
+
+# Registro en disco de los modelos entrenados: segundo nivel de la caché, sobrevive a
+# reinicios y despliegues (vacío = desactivado). Se poda con `python -m backend.registry_cli prune`.
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(PROJECT_ROOT, 'data', 'models'))
+
+MODEL_REGISTRY = ModelRegistry(MODEL_REGISTRY_DIR) if MODEL_REGISTRY_DIR else None
+
+MODEL_CACHE = ModelCache(
+    max_entries=MODEL_CACHE_MAX_ENTRIES,
+    max_bytes=int(MODEL_CACHE_MAX_MB * 1024 * 1024),
+    registry=MODEL_REGISTRY,
+    max_latest=MODEL_CACHE_MAX_LATEST
+)
+
+
+def _purge_model_cache(snapshot):
+    # Los modelos de versiones anteriores ya no se pueden pedir: liberamos su memoria
+    MODEL_CACHE.purge_versions(snapshot.version)
+
+
+DATASET.add_listener(_purge_model_cache, append_delay=DATA_APPEND_COALESCE_SECONDS)
+
+# Frecuencias cuyo modelo XGBoost global se entrena al publicar cada versión, al
+# comienzo de cada corrida del precálculo (vacío = solo bajo demanda, en la primera petición)
+GLOBAL_MODEL_PRETRAIN = [f for f in os.getenv("GLOBAL_MODEL_PRETRAIN", "ME,QE,W,D").split(",") if f]
+
+
+# 4. Jobs asíncronos de pronóstico
+# El estado de los jobs se guarda en SQLite para sobrevivir a reinicios del servidor.
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(PROJECT_ROOT, 'data', 'jobs.sqlite'))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+JOBS = JobManager(JOBS_DB, DATASET, model_cache=MODEL_CACHE, workers=JOB_WORKERS)
+
+# 5. Órdenes SARIMA elegidos por la búsqueda automática (order=auto)
+# Se guardan por segmento y versión de los datos para no repetir la búsqueda.
+SARIMA_ORDERS_DB = os.getenv("SARIMA_ORDERS_DB", os.path.join(PROJECT_ROOT, 'data', 'sarima_orders.sqlite'))
+
+SARIMA_ORDERS = SarimaOrderStore(SARIMA_ORDERS_DB)
+
+# Tiempo máximo por defecto (ms) de /sales/forecast y /sales/evaluation cuando la
+# petición no trae deadline_ms (0 = sin límite). Pasado ese tiempo se responde con el
+# último resultado del segmento o con un baseline y el modelo sigue entrenándose.
+FORECAST_DEADLINE_MS = int(os.getenv("FORECAST_DEADLINE_MS", "10000"))
+
+# 6. Precálculo en segundo plano
+# Al publicarse cada versión del dataset se calculan el pronóstico y las métricas de
+# cada (modelo, categoría, región, frecuencia), para que la primera petición de cada
+# segmento no entrene. PRECOMPUTE_WORKERS=0 (o listas vacías) lo desactiva; los modelos
+# globales de GLOBAL_MODEL_PRETRAIN se entrenan igual, en la misma corrida.
+PRECOMPUTE_MODELS = [m for m in os.getenv("PRECOMPUTE_MODELS", "sarima,xgboost,xgboost_global").split(",") if m]
+PRECOMPUTE_FREQUENCIES = [f for f in os.getenv("PRECOMPUTE_FREQUENCIES", "ME,QE,W").split(",") if f]
+PRECOMPUTE_STEPS = int(os.getenv("PRECOMPUTE_STEPS", "52"))
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "2"))
+
+PRECOMPUTE = Precomputer(
+    MODEL_CACHE, PRECOMPUTE_MODELS, PRECOMPUTE_FREQUENCIES, steps=PRECOMPUTE_STEPS, workers=PRECOMPUTE_WORKERS,
+    global_frequencies=GLOBAL_MODEL_PRETRAIN
+)
+
+DATASET.add_listener(PRECOMPUTE.start, append_delay=DATA_APPEND_COALESCE_SECONDS)
+
+# Segundos sugeridos al cliente (cabecera Retry-After) mientras se cargan los datos
+RETRY_AFTER_SECONDS = 5
+
+# Cada cuántos segundos se revisa si cambió el archivo de datos (0 = desactivado)
+DATA_WATCH_INTERVAL = float(os.getenv("DATA_WATCH_INTERVAL", "10"))
+
+
+def start_background_load():
+    """
+    Lanza la carga inicial del dataset en segundo plano y el vigilante del archivo fuente.
+    """
+    thread = DATASET.reload_async()
+    DATASET.start_watcher(DATA_WATCH_INTERVAL)
+    return thread
+
+
+# Función helper para verificar el estado de los datos en los routers.
+# Devuelve el snapshot activo: los routers deben usar este mismo objeto
+# durante toda la petición.
 def check_data_loaded():
-    if DF_RAW is None:
-        raise HTTPException(status_code=500, detail=f"Datos no cargados. Razón: {STATUS}") 
\ No newline at end of file
+    snapshot = DATASET.snapshot
+    if snapshot is not None:
+        return snapshot
+    if DATASET.loading:
+        raise HTTPException(
+            status_code=503,
+            detail="Los datos se están cargando. Intente de nuevo en unos segundos.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+    raise HTTPException(status_code=500, detail=f"Datos no cargados. Razón: {DATASET.status}")
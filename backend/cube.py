@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from backend.data_processing import pandas_frequency, period_codes, period_end_days
+
+# Frecuencias precalculadas en el cubo (las del API)
+CUBE_FREQUENCIES = ("ME", "QE", "AE", "W", "D")
+
+
+class SalesCube:
+    """
+    Cubo de ventas Categoría × Región × período para cada frecuencia soportada,
+    con los totales "All Categories"/"All Regions" ya calculados (índice 0 de cada eje).
+    Se construye una vez por versión del dataset a partir de las ventas diarias de
+    SalesAggregates; una consulta de aggregate_sales es solo un recorte del arreglo.
+    """
+
+    def __init__(self, aggregates, frequencies=CUBE_FREQUENCIES):
+        self.aggregates = aggregates
+        self.categories = ["All Categories"] + aggregates.categories
+        self.regions = ["All Regions"] + aggregates.regions
+        self._category_index = {name: i for i, name in enumerate(self.categories)}
+        self._region_index = {name: i for i, name in enumerate(self.regions)}
+
+        # frecuencia -> (índice de períodos, ventas[C, R, P], primer período, último período)
+        self._tables = {}
+        cells = self._daily_cells()
+        if cells is not None:
+            for frequency in frequencies:
+                self._tables[frequency] = self._build(cells, frequency)
+
+    def _daily_cells(self):
+        """
+        Aplana las ventas diarias a arreglos (categoría, región, día, ventas), con el
+        día como entero desde 1970-01-01, más la unidad de tiempo del índice original.
+        """
+        cat_idx, reg_idx, days, sales = [], [], [], []
+        for (category, region), daily in self.aggregates.daily_sales.items():
+            n = len(daily)
+            cat_idx.append(np.full(n, self._category_index[category], dtype=np.int64))
+            reg_idx.append(np.full(n, self._region_index[region], dtype=np.int64))
+            days.extend(daily.keys())
+            sales.append(np.fromiter(daily.values(), dtype=np.float64, count=n))
+        if not days:
+            return None
+        days = pd.DatetimeIndex(days)
+        return (
+            np.concatenate(cat_idx),
+            np.concatenate(reg_idx),
+            days.as_unit('s').asi8 // 86400,
+            np.concatenate(sales),
+            days.unit
+        )
+
+    def _build(self, cells, frequency):
+        cat_idx, reg_idx, days, sales, unit = cells
+        n_cat, n_reg = len(self.categories), len(self.regions)
+
+        # 1. Período de cada día como código entero (sin Period ni get_indexer)
+        codes = period_codes(days, frequency)
+        first_code = codes.min()
+        period_idx = codes - first_code
+        n_periods = int(period_idx.max()) + 1
+        ends = period_end_days(np.arange(first_code, first_code + n_periods), frequency)
+        index = pd.DatetimeIndex(
+            ends.astype('datetime64[D]').astype(f'datetime64[{unit}]'), freq=pandas_frequency(frequency)
+        )
+
+        # 2. Suma por celda con un solo bincount sobre el índice plano (C, R, P)
+        flat = (cat_idx * n_reg + reg_idx) * n_periods + period_idx
+        size = n_cat * n_reg * n_periods
+        values = np.bincount(flat, weights=sales, minlength=size).reshape(n_cat, n_reg, n_periods)
+        present = np.bincount(flat, minlength=size).reshape(n_cat, n_reg, n_periods) > 0
+
+        # 3. Totales "All" (índice 0 en cada eje)
+        values[0, 1:] = values[1:, 1:].sum(axis=0)
+        values[1:, 0] = values[1:, 1:].sum(axis=1)
+        values[0, 0] = values[1:, 1:].sum(axis=(0, 1))
+        present[0, 1:] = present[1:, 1:].any(axis=0)
+        present[1:, 0] = present[1:, 1:].any(axis=1)
+        present[0, 0] = present[1:, 1:].any(axis=(0, 1))
+
+        # 4. Rango con datos de cada celda (aggregate_sales va del primer al último período con ventas)
+        has_data = present.any(axis=2)
+        first = np.where(has_data, present.argmax(axis=2), -1)
+        last = np.where(has_data, n_periods - 1 - present[:, :, ::-1].argmax(axis=2), -1)
+        return index, values, first, last
+
+    def panel(self, frequency):
+        """
+        Panel completo de una frecuencia para el modelo global (ver backend/models/global_xgboost.py):
+        (índice de períodos, ventas[C, R, P], primer período[C, R], último período[C, R]),
+        o None si la frecuencia no está en el cubo.
+        """
+        return self._tables.get(frequency)
+
+    def sales_series(self, category="All Categories", region="All Regions", frequency="ME", filters=None):
+        """
+        Misma salida que aggregate_sales() leída directamente del cubo.
+        Las frecuencias que no están en el cubo se calculan desde los agregados diarios.
+        El cubo solo tiene Categoría y Región: otros filtros se resuelven con FilterIndex.
+        """
+        if filters:
+            raise ValueError("El cubo de ventas no admite filtros adicionales; use FilterIndex.")
+
+        table = self._tables.get(frequency)
+        if table is None:
+            return self.aggregates.sales_series(category, region, frequency)
+
+        c = self._category_index.get(category)
+        r = self._region_index.get(region)
+        if c is None or r is None:
+            return pd.Series(dtype='float64'), False
+
+        index, values, first, last = table
+        start, end = first[c, r], last[c, r]
+        if start < 0:
+            return pd.Series(dtype='float64'), False
+
+        ts_aggregated = pd.Series(
+            values[c, r, start:end + 1], index=index[start:end + 1], name='Sales'
+        )
+        ts_aggregated.index.name = 'Order_Date'
+        return ts_aggregated, True
@@ -1,68 +1,507 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import hashlib
+import time
+
+# Pyarrow es opcional: sin él se desactiva la caché columnar y se lee siempre el Excel
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
 
 # --- Constante de Ruta Absoluta ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 FILE_NAME = os.path.join(PROJECT_ROOT, 'data', 'US Superstore data.xls')
 
+# --- Esquema compacto en memoria ---
+# Solo se conservan las columnas que usan los servicios; las dimensiones de baja
+# cardinalidad se guardan como categóricas y los numéricos se reducen si no hay pérdida.
+COMPACT_SCHEMA = os.environ.get('DATA_COMPACT_SCHEMA', '1') != '0'
+COMPACT_COLUMNS = [
+    'Order_Date', 'Ship_Date',
+    'Category', 'Sub_Category', 'Region', 'State', 'Segment', 'Product_Name', 'Ship_Mode',
+    'Sales', 'Profit', 'Discount'
+]
+CATEGORICAL_COLUMNS = [
+    'Category', 'Sub_Category', 'Region', 'State', 'Segment', 'Product_Name', 'Ship_Mode'
+]
+
+# Columnas obligatorias (y su tipo) de las transacciones que se agregan en caliente
+TRANSACTION_SCHEMA = {
+    'Order_Date': 'datetime',
+    'Ship_Date': 'datetime',
+    'Category': 'str',
+    'Sub_Category': 'str',
+    'Region': 'str',
+    'State': 'str',
+    'Segment': 'str',
+    'Product_Name': 'str',
+    'Sales': 'number',
+    'Profit': 'number',
+    'Discount': 'number'
+}
+# Columnas opcionales: se validan si vienen en el lote (sin ellas la fila no tiene
+# ese dato y los filtros por esa dimensión no la incluyen)
+OPTIONAL_TRANSACTION_SCHEMA = {
+    'Ship_Mode': 'str'
+}
+
+# Dimensiones filtrables: nombre del parámetro del API -> columna del DataFrame
+FILTER_DIMENSIONS = {
+    "category": "Category",
+    "region": "Region",
+    "segment": "Segment",
+    "state": "State",
+    "sub_category": "Sub_Category",
+    "ship_mode": "Ship_Mode",
+}
+
+# Códigos de frecuencia del API -> alias de pandas ('AE' no es un alias válido de pandas)
+PANDAS_FREQUENCIES = {"ME": "ME", "QE": "QE", "AE": "YE", "W": "W", "D": "D"}
+
+# --- Caché columnar (Parquet) del dataset limpio ---
+CACHE_DIR = os.environ.get('DATA_CACHE_DIR', os.path.join(PROJECT_ROOT, 'data', '.cache'))
+# Incrementar si cambia la lógica de limpieza para invalidar las cachés existentes
+CACHE_SCHEMA_VERSION = 2
+
+
+def _cache_paths(source_path, compact=False):
+    """
+    Devuelve las rutas (parquet, metadatos) de la caché asociada a un archivo fuente.
+    Cada modo de esquema (completo/compacto) tiene su propia caché.
+    """
+    base = os.path.splitext(os.path.basename(source_path))[0].replace(' ', '_')
+    if compact:
+        base = f'{base}.compact'
+    return (
+        os.path.join(CACHE_DIR, f'{base}.parquet'),
+        os.path.join(CACHE_DIR, f'{base}.meta.json')
+    )
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    """
+    Calcula el hash SHA-256 del archivo leyéndolo por bloques.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Extensiones que se leen por bloques (exportaciones grandes, una o varias partes)
+SHARD_EXTENSIONS = ('.csv', '.parquet')
+
+
+def list_shards(path):
+    """
+    Devuelve las partes (CSV/Parquet) de una fuente: el archivo mismo o, si es un
+    directorio, sus archivos con extensión soportada en orden alfabético.
+    """
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(SHARD_EXTENSIONS)
+        )
+    return [path]
+
+
+def is_shard_source(path):
+    """
+    True si la fuente debe leerse con el cargador por bloques (CSV/Parquet o directorio).
+    """
+    return os.path.isdir(path) or path.lower().endswith(SHARD_EXTENSIONS)
+
+
+def source_signature(path):
+    """
+    Firma barata del archivo fuente (mtime y tamaño) para validar la caché.
+    Para un directorio de partes se usa el mtime más reciente y el tamaño total.
+    """
+    if os.path.isdir(path):
+        stats = [os.stat(shard) for shard in list_shards(path)]
+        return {
+            "mtime_ns": max((st.st_mtime_ns for st in stats), default=0),
+            "size": sum(st.st_size for st in stats),
+            "files": len(stats)
+        }
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def source_fingerprint(path):
+    """
+    Huella estable del contenido del archivo fuente (identifica la versión de los datos
+    entre reinicios, a diferencia del contador de versión en memoria).
+    Para directorios de partes (potencialmente varios GB) se usa el nombre, tamaño y
+    mtime de cada parte en lugar de leer todo el contenido.
+    """
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for shard in list_shards(path):
+            stat = os.stat(shard)
+            digest.update(f"{os.path.basename(shard)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+    return _file_sha256(path)
+
+
+def _read_cache(source_path, compact=False):
+    """
+    Intenta leer la caché Parquet. Retorna el DataFrame o None si no es válida.
+    Si el mtime cambió pero el hash del contenido es el mismo, se reutiliza la caché.
+    """
+    parquet_path, meta_path = _cache_paths(source_path, compact)
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return None
+
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("schema_version") != CACHE_SCHEMA_VERSION:
+        return None
+
+    signature = source_signature(source_path)
+    if signature["mtime_ns"] != meta.get("mtime_ns") or signature["size"] != meta.get("size"):
+        # El archivo fue tocado: solo reconstruimos si el contenido realmente cambió
+        if _file_sha256(source_path) != meta.get("sha256"):
+            return None
+        meta.update(signature)
+        _write_json_atomic(meta_path, meta)
+
+    try:
+        return pd.read_parquet(parquet_path)
+    except Exception:
+        return None
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _write_cache(source_path, df, compact=False):
+    """
+    Escribe el DataFrame limpio a Parquet de forma atómica (varios workers pueden
+    arrancar a la vez) junto con los metadatos de la fuente.
+    """
+    parquet_path, meta_path = _cache_paths(source_path, compact)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    tmp_path = f'{parquet_path}.{os.getpid()}.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+
+    meta = source_signature(source_path)
+    meta["sha256"] = _file_sha256(source_path)
+    meta["schema_version"] = CACHE_SCHEMA_VERSION
+    meta["rows"] = int(len(df))
+    meta["created_at"] = time.time()
+    _write_json_atomic(meta_path, meta)
+
+
+def clean_columns(df):
+    """
+    Normaliza nombres de columnas, convierte fechas y estandariza las columnas principales.
+    """
+    # Limpieza de columnas
+    df.columns = df.columns.str.replace(' ', '_').str.replace('-', '_').str.lower()
+
+    # Aseguramos que las columnas clave existan antes de renombrar
+    if 'order_date' in df.columns:
+        df['Order_Date'] = pd.to_datetime(df['order_date'])
+    if 'ship_date' in df.columns:
+        df['Ship_Date'] = pd.to_datetime(df['ship_date'])
+
+    # Estandarizar nombres de columnas principales que usaremos
+    df = df.rename(columns={
+        'category': 'Category',
+        'region': 'Region',
+        'sales': 'Sales',
+        'profit': 'Profit',
+        'discount': 'Discount',
+        'state': 'State',
+        'product_name': 'Product_Name',
+        'segment': 'Segment',
+        'sub_category': 'Sub_Category',
+        'ship_mode': 'Ship_Mode'
+    })
+    return df
+
+
+def _downcast_lossless(series):
+    """
+    Reduce el tipo numérico de una columna solo si el valor de cada fila se conserva exacto.
+    """
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        candidate = series.astype(np.float32)
+        if np.array_equal(candidate.astype(series.dtype).to_numpy(), series.to_numpy(), equal_nan=True):
+            return candidate
+    return series
+
+
+def compact_dataframe(df):
+    """
+    Convierte el DataFrame limpio al esquema compacto:
+    - elimina las columnas que no usan los servicios (incluidas order_date/ship_date duplicadas),
+    - guarda las dimensiones de baja cardinalidad como categóricas,
+    - reduce los numéricos cuando la conversión es exacta.
+    """
+    columns = [col for col in COMPACT_COLUMNS if col in df.columns]
+    df = df[columns].copy()
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in df.select_dtypes(include='number').columns:
+        df[col] = _downcast_lossless(df[col])
+
+    return df
+
+
+def memory_report(df_before, df_after):
+    """
+    Compara el uso de memoria por columna (en bytes, incluyendo strings) entre dos DataFrames.
+    """
+    before = df_before.memory_usage(deep=True, index=False)
+    after = df_after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype_before': df_before.dtypes.astype(str),
+        'bytes_before': before,
+        'dtype_after': df_after.dtypes.astype(str).reindex(before.index).fillna('(eliminada)'),
+        'bytes_after': after.reindex(before.index)
+    })
+    report.loc['TOTAL'] = ['', before.sum(), '', after.sum()]
+    report['bytes_after'] = report['bytes_after'].fillna(0).astype('int64')
+    report['reduction_pct'] = (1 - report['bytes_after'] / report['bytes_before']) * 100
+    return report
+
+
+def validate_transactions(batch, reference=None):
+    """
+    Valida un lote de transacciones nuevas contra el esquema limpio.
+    Acepta nombres de columnas originales ('Order Date') o ya limpios ('Order_Date').
+    Si se pasa 'reference' (el DataFrame activo), el lote se ajusta a sus columnas y tipos.
+    Retorna (DataFrame, lista_de_errores).
+    """
+    if batch is None or batch.empty:
+        return None, ["El lote no contiene transacciones."]
+
+    batch = clean_columns(batch.copy())
+
+    missing = [col for col in TRANSACTION_SCHEMA if col not in batch.columns]
+    if missing:
+        return None, [f"Faltan columnas obligatorias: {', '.join(missing)}"]
+
+    errors = []
+    optional = {col: kind for col, kind in OPTIONAL_TRANSACTION_SCHEMA.items() if col in batch.columns}
+    for col, kind in {**TRANSACTION_SCHEMA, **optional}.items():
+        if kind == 'datetime':
+            batch[col] = pd.to_datetime(batch[col], errors='coerce')
+        elif kind == 'number':
+            batch[col] = pd.to_numeric(batch[col], errors='coerce')
+        else:
+            batch[col] = batch[col].astype('str').str.strip()
+            batch.loc[batch[col].isin(['', 'nan', 'None']), col] = None
+
+        # Las columnas opcionales pueden venir vacías en algunas filas
+        invalid = batch.index[batch[col].isna()].tolist() if col in TRANSACTION_SCHEMA else []
+        if invalid:
+            errors.append(f"Valores inválidos o vacíos en '{col}' (filas {invalid[:10]})")
+
+    if errors:
+        return None, errors
+
+    if reference is not None:
+        batch = conform_to(batch, reference)
+    return batch.reset_index(drop=True), []
+
+
+def conform_to(batch, reference):
+    """
+    Ajusta columnas y tipos de 'batch' a los de 'reference' (mismo esquema, completo o compacto).
+    """
+    batch = batch.reindex(columns=reference.columns)
+    for col, dtype in reference.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            batch[col] = batch[col].astype('category')
+        else:
+            try:
+                batch[col] = batch[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return batch
+
+
+def concat_frames(frames):
+    """
+    Concatena el DataFrame base con los lotes agregados después, conservando
+    las columnas categóricas (unión de categorías) del esquema compacto.
+    """
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) == 1:
+        return frames[0]
+
+    categorical = [
+        col for col, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    for col in categorical:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def pandas_frequency(frequency_code):
+    """
+    Traduce el código de frecuencia del API al alias que entiende pandas.
+    """
+    return PANDAS_FREQUENCIES.get(frequency_code, frequency_code)
+
+
+# --- Asignación vectorizada de días a períodos ---
+# Cada día (entero de días desde 1970-01-01) se convierte en un código entero de período;
+# las ventas por período se suman con np.bincount en lugar de resample.
+def period_codes(days, frequency):
+    """
+    Código entero del período de cada día para la frecuencia dada.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if frequency == "D":
+        return days
+    if frequency == "W":
+        # Semanas de lunes a domingo (como 'W' de pandas, que etiqueta con el domingo).
+        # El 1970-01-01 fue jueves: el lunes de esa semana es el día -3.
+        return np.floor_divide(days + 3, 7)
+
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    if frequency == "ME":
+        return months
+    if frequency == "QE":
+        return np.floor_divide(months, 3)
+    if frequency == "AE":
+        return np.floor_divide(months, 12)
+    raise ValueError(f"Frecuencia no soportada: {frequency}")
+
+
+def period_end_days(codes, frequency):
+    """
+    Inverso de period_codes: día (entero) con el que se etiqueta cada período,
+    el último día del período, igual que resample.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    if frequency == "D":
+        return codes
+    if frequency == "W":
+        return codes * 7 + 3
+
+    months_per_period = {"ME": 1, "QE": 3, "AE": 12}[frequency]
+    next_start = ((codes + 1) * months_per_period).astype('datetime64[M]').astype('datetime64[D]')
+    return next_start.astype(np.int64) - 1
+
+
+def bucket_sales(days, sales, frequency, unit='ns'):
+    """
+    Suma 'sales' por período a partir de los días de cada venta. Devuelve una Serie
+    indexada por fin de período, del primer al último período con datos (los
+    períodos intermedios sin ventas quedan en 0), con la misma forma que resample.
+    """
+    codes = period_codes(days, frequency)
+    first = codes.min()
+    totals = np.bincount(codes - first, weights=sales)
+    ends = period_end_days(np.arange(first, first + len(totals)), frequency)
+
+    ts_aggregated = pd.Series(
+        totals,
+        index=pd.DatetimeIndex(ends.astype('datetime64[D]').astype(f'datetime64[{unit}]'),
+                               freq=pandas_frequency(frequency)),
+        name='Sales'
+    )
+    ts_aggregated.index.name = 'Order_Date'
+    return ts_aggregated
+
+
 # --- Funciones de Carga y Preprocesamiento ---
-def load_data():
+def load_data(file_name=None, use_cache=True, compact=None):
     """
     Carga el dataset de Excel, lo limpia y retorna el DataFrame.
+    Si hay una caché Parquet válida (mismo mtime/hash de la fuente) se lee de ella;
+    en caso contrario se parsea el Excel y se regenera la caché.
+    Con compact=True (por defecto según COMPACT_SCHEMA) se aplica el esquema compacto.
     Retorna (DataFrame, status_message).
     """
+    file_name = file_name or FILE_NAME
+    compact = COMPACT_SCHEMA if compact is None else compact
     try:
-        df = pd.read_excel(FILE_NAME)
-        
-        # Limpieza de columnas
-        df.columns = df.columns.str.replace(' ', '_').str.replace('-', '_').str.lower()
-        
-        # Aseguramos que las columnas clave existan antes de renombrar
-        if 'order_date' in df.columns:
-             df['Order_Date'] = pd.to_datetime(df['order_date'])
-        if 'ship_date' in df.columns:
-            df['Ship_Date'] = pd.to_datetime(df['ship_date'])
-
-        # Estandarizar nombres de columnas principales que usaremos
-        df = df.rename(columns={
-            'category': 'Category',
-            'region': 'Region',
-            'sales': 'Sales',
-            'profit': 'Profit',
-            'discount': 'Discount',
-            'state': 'State',
-            'product_name': 'Product_Name',
-            'segment': 'Segment',
-            'sub_category': 'Sub_Category'
-        })
+        if not os.path.exists(file_name):
+            raise FileNotFoundError(file_name)
+
+        use_cache = use_cache and PARQUET_AVAILABLE
+        if use_cache:
+            df = _read_cache(file_name, compact)
+            if df is not None:
+                return df, "Success"
+
+        df = clean_columns(pd.read_excel(file_name))
+        if compact:
+            df = compact_dataframe(df)
+
+        if use_cache:
+            try:
+                _write_cache(file_name, df, compact)
+            except Exception as e:
+                # La caché es una optimización: un fallo de escritura no debe impedir la carga
+                print(f"Aviso: no se pudo escribir la caché de datos: {e}")
 
         return df, "Success"
     except FileNotFoundError:
-        return None, f"Error: Archivo no encontrado en la ruta esperada: {FILE_NAME}"
+        return None, f"Error: Archivo no encontrado en la ruta esperada: {file_name}"
     except Exception as e:
         return None, f"Error al cargar o preprocesar los datos: {e}"
 
 # --- Agregación de ventas ---
-def aggregate_sales(df, category="All Categories", region="All Regions", frequency="M"):
+def aggregate_sales(df, category="All Categories", region="All Regions", frequency="M", filters=None):
     """
     Filtra el DataFrame y agrega las ventas a un nivel de frecuencia (M, Q, etc.).
+    'filters' es un dict opcional {dimensión: [valores]} (segment, state, sub_category,
+    ship_mode) con selección multi-valor.
+    'df' también puede ser una estructura derivada del snapshot (SalesCube,
+    SalesAggregates o FilterIndex): en ese caso la serie se lee de ella sin
+    recorrer las columnas de texto.
     """
     if df is None:
         return pd.Series(dtype='float64'), False
+
+    if hasattr(df, 'sales_series'):
+        if filters:
+            return df.sales_series(category, region, frequency, filters=filters)
+        return df.sales_series(category, region, frequency)
     
     df_filtered = df.copy()
     if category != "All Categories":
         df_filtered = df_filtered[df_filtered['Category'] == category]
     if region != "All Regions":
         df_filtered = df_filtered[df_filtered['Region'] == region]
+    for dim, values in (filters or {}).items():
+        if values:
+            df_filtered = df_filtered[df_filtered[FILTER_DIMENSIONS[dim]].isin(values)]
     
     if df_filtered.empty:
         return pd.Series(dtype='float64'), False
     
     df_filtered = df_filtered.set_index('Order_Date')
-    ts_aggregated = df_filtered['Sales'].resample(f'{frequency}').sum()
+    ts_aggregated = df_filtered['Sales'].resample(pandas_frequency(frequency)).sum()
     ts_aggregated = ts_aggregated[ts_aggregated.index.min():]
     
     return ts_aggregated, True
@@ -72,19 +511,25 @@ def create_features_for_ml(ts_data, frequency_code="M"):
     """
     Crea características de ML (lags, mes, año) a partir de una serie de tiempo.
     """
+    # Importación local: backend.models importa este módulo
+    from backend.models.frequency import get_frequency_settings
+
     df = pd.DataFrame(ts_data.copy())
     df.columns = ['Sales']
     df['month'] = df.index.month
     df['year'] = df.index.year
     df['quarter'] = df.index.quarter
     
-    # Lags dinámicos según frecuencia
-    if frequency_code == "ME":
-        lag_period = 12
-    elif frequency_code == "QE":
-        lag_period = 4
-    else: # 'A' o cualquier otro
-        lag_period = 1
+    # Calendario fino para frecuencias semanales y diarias
+    if frequency_code == "W":
+        df['week'] = df.index.isocalendar().week.astype('int64').values
+    elif frequency_code == "D":
+        df['dayofweek'] = df.index.dayofweek
+        df['dayofyear'] = df.index.dayofyear
+    
+    # Lags dinámicos según frecuencia (un ciclo estacional: 12 meses, 4 trimestres,
+    # 52 semanas, 7 días; 1 período en anual)
+    lag_period = get_frequency_settings(frequency_code)["seasonal_period"]
         
     df[f'lag_{lag_period}'] = df['Sales'].shift(lag_period)
     df = df.bfill()
@@ -92,4 +537,4 @@ def create_features_for_ml(ts_data, frequency_code="M"):
     X = df.drop('Sales', axis=1)
     y = df['Sales']
     
-    return X, y
\ No newline at end of file
+    return X, y
@@ -0,0 +1,425 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import pandas as pd
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.filter_index import FilterIndex
+from backend.data_processing import (
+    FILE_NAME, concat_frames, is_shard_source, load_data, source_fingerprint, source_signature
+)
+from backend.streaming import (
+    DEFAULT_CHUNK_ROWS, new_rows_path, prune_spooled_rows, read_spooled_rows, stream_load
+)
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """
+    Versión inmutable del dataset. Cada petición toma un snapshot al inicio y
+    trabaja sobre él hasta terminar, aunque entre tanto se publique otro.
+
+    Las filas se guardan como una tupla de DataFrames (el archivo base o sus bloques,
+    más los lotes agregados por /data/transactions); 'df' los concatena solo si alguien
+    lo pide. Si la carga se hizo con keep_rows="disk", las filas base están en
+    'rows_path' y se leen de disco bajo demanda.
+    """
+    frames: tuple
+    aggregates: SalesAggregates
+    version: int
+    fingerprint: str
+    source: str
+    source_hash: str
+    template: pd.DataFrame
+    rows_path: str = None
+    categories: list = field(default_factory=list)
+    regions: list = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.time)
+    # (índice de filtros, cuántos de 'frames' cubre) de una versión anterior: el índice
+    # de esta versión lo extiende con los lotes restantes en lugar de reconstruirse
+    filter_base: tuple = field(default=None, repr=False)
+
+    @cached_property
+    def df(self):
+        frames = self.frames
+        if self.rows_path:
+            frames = (read_spooled_rows(self.rows_path),) + frames
+        return concat_frames(frames)
+
+    @cached_property
+    def cube(self):
+        # Se construye una sola vez por versión, la primera vez que se consulta
+        return SalesCube(self.aggregates)
+
+    @cached_property
+    def filter_index(self):
+        # Bitmaps por valor para filtros multi-dimensionales. Se construye en la primera
+        # petición con filtros adicionales, solo con las columnas que necesita
+        if self.filter_base is not None:
+            index, covered = self.filter_base
+            return index.extend(*self.frames[covered:])
+        return FilterIndex.from_rows(self.frames, self.rows_path)
+
+    def next_filter_base(self):
+        """
+        filter_base de la versión siguiente a esta (None si nunca se construyó el índice).
+        """
+        if "filter_index" in self.__dict__:
+            return self.filter_index, len(self.frames)
+        return self.filter_base
+
+    def warm(self):
+        """
+        Construye el cubo por adelantado. El índice de filtros no: necesita leer las
+        filas y solo lo usan las peticiones con filtros adicionales.
+        """
+        self.cube
+
+    @property
+    def rows(self):
+        return self.aggregates.rows
+
+
+def build_snapshot(frames, aggregates, version, fingerprint, source, source_hash,
+                   template, rows_path=None, filter_base=None):
+    """
+    Construye un snapshot tomando las listas de filtros de los agregados,
+    de modo que datos y filtros se publiquen en el mismo instante.
+    """
+    return DatasetSnapshot(
+        frames=tuple(frames),
+        aggregates=aggregates,
+        version=version,
+        fingerprint=fingerprint,
+        source=source,
+        source_hash=source_hash,
+        template=template,
+        rows_path=rows_path,
+        filter_base=filter_base,
+        categories=['All Categories'] + aggregates.categories,
+        regions=['All Regions'] + aggregates.regions
+    )
+
+
+class _CoalescedListener:
+    """
+    Listener que agrupa las versiones publicadas por append(): la primera programa
+    una llamada 'delay' segundos después y esa llamada recibe el snapshot más
+    reciente, así que corre como máximo una vez cada 'delay' segundos mientras
+    lleguen lotes. Una recarga completa lo llama de inmediato y cancela lo pendiente.
+    """
+
+    def __init__(self, holder, callback, delay):
+        self.holder = holder
+        self.callback = callback
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def __call__(self, snapshot, append=False):
+        if not append:
+            self.cancel()
+            self.callback(snapshot)
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+        snapshot = self.holder.snapshot
+        try:
+            self.callback(snapshot)
+        except Exception as e:
+            print(f"Aviso: listener de dataset falló tras publicar v{snapshot.version}: {e}")
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class DatasetHolder:
+    """
+    Contenedor del dataset activo con contador de versión.
+    La carga se hace fuera del lock y el intercambio es una sola asignación,
+    así que los lectores nunca ven un estado a medio construir.
+    """
+
+    def __init__(self, file_name=FILE_NAME, chunk_rows=DEFAULT_CHUNK_ROWS, keep_rows="memory"):
+        self.file_name = file_name
+        # Parámetros del cargador por bloques (fuentes CSV/Parquet o directorios de partes)
+        self.chunk_rows = chunk_rows
+        self.keep_rows = keep_rows
+        self.status = "Datos aún no cargados."
+        self.loading = False
+        self._snapshot = None
+        self._version = 0
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._loaded_signature = None
+        self._watcher = None
+        self._stop_watcher = threading.Event()
+        # Directorios de filas en disco en uso: los de snapshots vivos (también los que
+        # retienen peticiones en curso) y el de la carga que se está publicando
+        self._rows_lock = threading.RLock()
+        self._rows_snapshots = weakref.WeakValueDictionary()
+        self._rows_reserved = set()
+
+    # --- Lectura ---
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._version
+
+    def is_ready(self):
+        return self._snapshot is not None
+
+    # --- Publicación ---
+    def add_listener(self, callback, append_delay=0):
+        """
+        Registra una función callback(snapshot) que se invoca tras cada intercambio.
+        Con append_delay > 0 las versiones de append() se agrupan: el callback corre
+        como máximo una vez cada 'append_delay' segundos con la última versión (para
+        los listeners costosos, que no deben repetirse con cada lote pequeño).
+        """
+        if append_delay > 0:
+            self._listeners.append(_CoalescedListener(self, callback, append_delay))
+        else:
+            self._listeners.append(lambda snapshot, append=False: callback(snapshot))
+
+    def publish(self, df, fingerprint, source=None):
+        """
+        Publica un nuevo DataFrame como snapshot activo (intercambio atómico).
+        """
+        return self._publish(
+            [df], SalesAggregates.from_frame(df), fingerprint, source, df.iloc[:0]
+        )
+
+    def _publish(self, frames, aggregates, fingerprint, source, template, rows_path=None):
+        with self._swap_lock:
+            version = self._version + 1
+            snapshot = build_snapshot(
+                frames, aggregates, version, fingerprint, source or self.file_name, fingerprint,
+                template, rows_path
+            )
+            self._snapshot = snapshot
+            self._version = version
+
+        self._track_rows(snapshot)
+        self._notify(snapshot)
+        return snapshot
+
+    def append(self, batch):
+        """
+        Agrega un lote de transacciones ya validado y publica una versión nueva.
+        El costo depende del tamaño del lote: no se concatenan las filas históricas
+        y los agregados se actualizan de forma incremental.
+        Los lotes viven solo en memoria; una recarga del archivo fuente los descarta.
+        """
+        with self._swap_lock:
+            current = self._snapshot
+            if current is None:
+                raise RuntimeError("No hay un dataset cargado al cual agregar transacciones.")
+
+            batch_hash = hashlib.sha256(
+                pd.util.hash_pandas_object(batch, index=False).values.tobytes()
+            ).hexdigest()
+            version = self._version + 1
+            snapshot = build_snapshot(
+                current.frames + (batch,),
+                current.aggregates.update(batch),
+                version,
+                hashlib.sha256(f"{current.fingerprint}:{batch_hash}".encode()).hexdigest(),
+                current.source,
+                current.source_hash,
+                current.template,
+                current.rows_path,
+                current.next_filter_base()
+            )
+            self._snapshot = snapshot
+            self._version = version
+
+        self._track_rows(snapshot)
+        self._notify(snapshot, append=True)
+        return snapshot
+
+    # --- Filas en disco ---
+    def _track_rows(self, snapshot):
+        """
+        Tras publicar: registra el directorio de filas del snapshot y borra los que ya
+        no usa ningún snapshot vivo. Cuando un snapshot anterior se libera (terminaron
+        las peticiones que lo tenían) se vuelve a revisar, en otro hilo.
+        """
+        if snapshot.rows_path:
+            with self._rows_lock:
+                self._rows_snapshots[snapshot.version] = snapshot
+            finalizer = weakref.finalize(snapshot, self._prune_rows_async)
+            finalizer.atexit = False
+        self._prune_rows()
+
+    def _prune_rows(self):
+        with self._rows_lock:
+            keep = {snapshot.rows_path for snapshot in self._rows_snapshots.values()} | self._rows_reserved
+            current = self._snapshot
+            if current is not None:
+                keep.add(current.rows_path)
+            prune_spooled_rows(keep)
+
+    def _prune_rows_async(self):
+        threading.Thread(target=self._prune_rows, name="dataset-prune-rows", daemon=True).start()
+
+    def _notify(self, snapshot, append=False):
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot, append=append)
+            except Exception as e:
+                print(f"Aviso: listener de dataset falló tras publicar v{snapshot.version}: {e}")
+
+    # --- Carga ---
+    def reload(self, file_name=None):
+        """
+        Carga (bloqueante) el archivo indicado y lo publica si la carga fue exitosa.
+        Si falla, o si el contenido no cambió, el snapshot anterior sigue activo.
+        Retorna True si se publicó una versión nueva.
+        """
+        with self._reload_lock:
+            file_name = file_name or self.file_name
+            self.loading = True
+            self.status = "Cargando datos..."
+            # La firma se toma antes de leer: si el archivo cambia durante la carga,
+            # el vigilante lo detectará en el siguiente sondeo
+            signature = self._current_signature(file_name)
+            try:
+                fingerprint = source_fingerprint(file_name)
+                current = self._snapshot
+                if current is not None and current.source == file_name and current.source_hash == fingerprint:
+                    # Mismo contenido (p. ej. solo cambió el mtime): no invalidamos cachés
+                    self._loaded_signature = signature
+                    self.status = "Success"
+                    return False
+
+                if is_shard_source(file_name):
+                    # Exportaciones CSV/Parquet (posiblemente varios GB): carga por bloques.
+                    # Las filas en disco van a un directorio nuevo, reservado hasta publicarlo
+                    rows_path = new_rows_path(fingerprint) if self.keep_rows == "disk" else None
+                    with self._rows_lock:
+                        self._rows_reserved.add(rows_path)
+                    try:
+                        result, status = stream_load(
+                            file_name, fingerprint, chunk_rows=self.chunk_rows, keep_rows=self.keep_rows,
+                            rows_path=rows_path
+                        )
+                        if result is None:
+                            print(f"FATAL ERROR: Datos no cargados. Razón: {status}")
+                            self.status = status
+                            return False
+                        snapshot = self._publish(
+                            result.frames, result.aggregates, fingerprint, file_name,
+                            result.template, result.rows_path
+                        )
+                    finally:
+                        with self._rows_lock:
+                            self._rows_reserved.discard(rows_path)
+                else:
+                    df, status = load_data(file_name)
+                    if df is None:
+                        print(f"FATAL ERROR: Datos no cargados. Razón: {status}")
+                        self.status = status
+                        return False
+                    snapshot = self.publish(df, fingerprint, file_name)
+
+                self.file_name = file_name
+                self._loaded_signature = signature
+                self.status = status
+                print(f"Datos cargados y preprocesados exitosamente (versión {snapshot.version}).")
+                return True
+            except FileNotFoundError:
+                self.status = f"Error: Archivo no encontrado en la ruta esperada: {file_name}"
+                return False
+            except Exception as e:
+                self.status = f"Error al cargar o preprocesar los datos: {e}"
+                print(f"FATAL ERROR: Datos no cargados. Razón: {self.status}")
+                return False
+            finally:
+                self.loading = False
+
+    def reload_async(self, file_name=None):
+        """
+        Lanza la recarga en un hilo daemon. Retorna None si ya hay una recarga en curso.
+        """
+        if self._reload_lock.locked():
+            return None
+        self.loading = True
+        thread = threading.Thread(
+            target=self.reload, args=(file_name,), name="dataset-loader", daemon=True
+        )
+        thread.start()
+        return thread
+
+    # --- Vigilancia del archivo fuente ---
+    def start_watcher(self, interval):
+        """
+        Sondea cada 'interval' segundos el archivo fuente y lanza una recarga cuando
+        su mtime o tamaño cambian y se mantienen estables durante un sondeo
+        (evita leer un archivo que todavía se está copiando).
+        """
+        if interval <= 0 or self._watcher is not None:
+            return None
+
+        def _watch():
+            pending = None
+            while not self._stop_watcher.wait(interval):
+                current = self._current_signature()
+                if current is None or current == self._loaded_signature:
+                    pending = None
+                    continue
+                if current != pending:
+                    pending = current
+                    continue
+                self.reload_async()
+                pending = None
+
+        self._watcher = threading.Thread(target=_watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        self._stop_watcher.set()
+        # Las llamadas agrupadas pendientes tampoco se ejecutan al apagar
+        for listener in self._listeners:
+            if isinstance(listener, _CoalescedListener):
+                listener.cancel()
+
+    def _current_signature(self, file_name=None):
+        file_name = file_name or self.file_name
+        try:
+            return file_name, source_signature(file_name)
+        except OSError:
+            return None
+
+
+def resolve_data_file(file_name, data_dir=None):
+    """
+    Resuelve un nombre de archivo relativo al directorio data/ y evita salir de él.
+    """
+    data_dir = os.path.realpath(data_dir or os.path.dirname(FILE_NAME))
+    path = os.path.realpath(os.path.join(data_dir, file_name))
+    if os.path.commonpath([data_dir, path]) != data_dir:
+        raise ValueError("El archivo debe estar dentro del directorio de datos.")
+    return path
@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.data_processing import FILTER_DIMENSIONS, bucket_sales
+
+# Dimensiones adicionales que se publican en /config/filters (Categoría y Región ya existen)
+EXTRA_DIMENSIONS = ("segment", "state", "sub_category", "ship_mode")
+
+# Columnas que necesita el índice: el resto de las filas nunca se lee
+INDEX_COLUMNS = ("Order_Date", "Sales") + tuple(FILTER_DIMENSIONS.values())
+
+
+class _FilterPart:
+    """
+    Bitmaps de un tramo contiguo de filas (un bloque de la carga o un lote agregado).
+    """
+
+    def __init__(self, df):
+        self.n_rows = int(len(df))
+        self.sales = df['Sales'].to_numpy(dtype=np.float64)
+        self.days = df['Order_Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        self.date_unit = np.datetime_data(df['Order_Date'].dtype)[0]
+
+        # dimensión -> {valor: bitmap empaquetado (uint8)}
+        self.bitmaps = {}
+        for dim, col in FILTER_DIMENSIONS.items():
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            bitmaps = {}
+            for i, value in enumerate(uniques):
+                bits = np.zeros(self.n_rows, dtype=bool)
+                bits[order[bounds[i]:bounds[i + 1]]] = True
+                bitmaps[str(value)] = np.packbits(bits)
+            self.bitmaps[dim] = bitmaps
+
+    def select(self, selection):
+        mask = None
+        for dim, values in selection.items():
+            bitmaps = [self.bitmaps.get(dim, {})[v] for v in values if v in self.bitmaps.get(dim, {})]
+            if not bitmaps:
+                return np.empty(0, dtype=np.int64)
+            union = bitmaps[0] if len(bitmaps) == 1 else np.bitwise_or.reduce(bitmaps)
+            mask = union if mask is None else mask & union
+
+        if mask is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows))
+
+
+def _index_columns(df):
+    return df[[col for col in INDEX_COLUMNS if col in df.columns]]
+
+
+def _spooled_parts(rows_path):
+    # Las filas en disco se indexan parte por parte y solo con las columnas del índice
+    import pyarrow.parquet as pq
+    for name in sorted(os.listdir(rows_path)):
+        if not name.endswith('.parquet'):
+            continue
+        path = os.path.join(rows_path, name)
+        columns = [col for col in INDEX_COLUMNS if col in pq.read_schema(path).names]
+        yield _FilterPart(pd.read_parquet(path, columns=columns))
+
+
+class FilterIndex:
+    """
+    Índice de bitmaps por valor para cada dimensión filtrable. Una combinación de
+    filtros se resuelve con OR entre los valores de una misma dimensión y AND entre
+    dimensiones, sobre bitmaps empaquetados (1 bit por fila), sin comparar columnas
+    de texto.
+
+    Se compone de tramos (uno por bloque de filas): extend() agrega el tramo de un
+    lote nuevo sin reconstruir los anteriores, que se comparten entre versiones.
+    """
+
+    def __init__(self, parts=()):
+        self.parts = tuple(part for part in parts if part.n_rows)
+        self.n_rows = sum(part.n_rows for part in self.parts)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls([_FilterPart(_index_columns(df))])
+
+    @classmethod
+    def from_rows(cls, frames=(), rows_path=None):
+        """
+        Índice de las filas de un snapshot: las guardadas en disco (rows_path) y los
+        bloques en memoria, sin concatenarlos.
+        """
+        parts = list(_spooled_parts(rows_path)) if rows_path else []
+        parts.extend(_FilterPart(_index_columns(frame)) for frame in frames if frame is not None)
+        return cls(parts)
+
+    def extend(self, *frames):
+        """
+        Nuevo índice con las filas de 'frames' agregadas al final (costo según el lote).
+        """
+        return FilterIndex(self.parts + tuple(_FilterPart(_index_columns(frame)) for frame in frames))
+
+    def values(self, dim):
+        return sorted({value for part in self.parts for value in part.bitmaps.get(dim, {})})
+
+    def _selection(self, selection):
+        selection = {dim: values for dim, values in selection.items() if values}
+        for dim in selection:
+            if not any(dim in part.bitmaps for part in self.parts):
+                raise ValueError(f"La dimensión '{dim}' no está disponible en el dataset.")
+        return selection
+
+    def select(self, selection):
+        """
+        Devuelve los índices de fila que cumplen la selección {dimensión: [valores]}.
+        Una dimensión ausente o con lista vacía no filtra.
+        """
+        selection = self._selection(selection)
+        rows, offset = [], 0
+        for part in self.parts:
+            rows.append(part.select(selection) + offset)
+            offset += part.n_rows
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def sales_series(self, category="All Categories", region="All Regions", frequency="ME", filters=None):
+        """
+        Misma salida que aggregate_sales() pero con filtros multi-valor en cualquier dimensión.
+        """
+        selection = dict(filters or {})
+        if category != "All Categories":
+            selection["category"] = [category]
+        if region != "All Regions":
+            selection["region"] = [region]
+        selection = self._selection(selection)
+
+        # Ventas por período de las filas seleccionadas de cada tramo (un bincount sobre el código de período)
+        days, sales = [], []
+        for part in self.parts:
+            rows = part.select(selection)
+            days.append(part.days[rows])
+            sales.append(part.sales[rows])
+        days = np.concatenate(days) if days else np.empty(0, dtype=np.int64)
+        if days.size == 0:
+            return pd.Series(dtype='float64'), False
+
+        ts_aggregated = bucket_sales(days, np.concatenate(sales), frequency, self.parts[0].date_unit)
+        return ts_aggregated, True
@@ -1,13 +1,39 @@
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from backend import config
+from backend.services.model_executor import MODEL_QUEUE_SIZE, MODEL_WORKERS, shutdown_process_pool
 # Importamos TODOS nuestros routers
-from backend.routers import config_router, kpi_router, forecast_router
+from backend.routers import (
+    config_router, kpi_router, forecast_router, health_router, admin_router, data_router, jobs_router
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El dataset se carga en segundo plano: el servidor acepta conexiones de
+    # inmediato y /health/ready indica cuándo está listo para atender peticiones.
+    config.start_background_load()
+    # Retoma los jobs que quedaron pendientes o a medias antes del reinicio
+    config.JOBS.start()
+    # Cada entrenamiento en el pool ocupa un hilo del servidor que solo espera el resultado:
+    # reservamos hilos de sobra para que los endpoints livianos nunca se queden sin uno
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, MODEL_WORKERS + MODEL_QUEUE_SIZE + 40)
+    yield
+    config.DATASET.stop_watcher()
+    config.PRECOMPUTE.shutdown()
+    config.JOBS.shutdown()
+    shutdown_process_pool()
+
 
 # Inicialización de la Aplicación
 app = FastAPI(
     title="Retail Forecasting API",
     description="API para obtener pronósticos de ventas (SARIMA y XGBoost) filtrado por categoría y región.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -25,6 +51,10 @@ def read_root():
 
 # --- Incluimos los routers ---
 # Esto conecta todos los endpoints
+app.include_router(health_router.router)
 app.include_router(config_router.router)
 app.include_router(kpi_router.router)
-app.include_router(forecast_router.router)
\ No newline at end of file
+app.include_router(forecast_router.router)
+app.include_router(data_router.router)
+app.include_router(jobs_router.router)
+app.include_router(admin_router.router)
\ No newline at end of file
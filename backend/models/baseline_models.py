@@ -0,0 +1,322 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from backend.data_processing import pandas_frequency
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import forecast_metrics, series_metrics
+
+# Modelos de referencia (baselines): pronósticos en microsegundos para comparar y
+# filtrar cientos de segmentos antes de entrenar SARIMA o XGBoost
+BASELINE_MODELS = ("seasonal_naive", "drift", "moving_average", "ses", "holt_winters")
+
+# Grillas de los parámetros de suavizado: cada serie se queda con la combinación de
+# menor error a un paso dentro de la muestra (todas se evalúan a la vez)
+SES_ALPHAS = tuple(np.linspace(0.05, 1.0, 20))
+HOLT_WINTERS_ALPHAS = (0.1, 0.2, 0.4, 0.7)
+HOLT_WINTERS_BETAS = (0.0, 0.01, 0.05)
+HOLT_WINTERS_GAMMAS = (0.0, 0.1, 0.3)
+
+# Cuantil normal de los intervalos al 95% (misma cobertura que SARIMA)
+Z_95 = 1.959963984540054
+
+
+def right_align(values, first, last):
+    """
+    Matriz [serie, período] con cada serie alineada a la derecha (su último período
+    en la última columna) y NaN antes de su primer período. 'values' es [serie,
+    período] y 'first'/'last' el rango con datos de cada serie (last < 0: sin datos).
+    Así todas las series se pronostican desde la misma columna.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    first = np.asarray(first)
+    last = np.asarray(last)
+    n_periods = int(max(1, (last - first + 1).max(initial=1)))
+    source = last[:, None] - (n_periods - 1) + np.arange(n_periods)
+    inside = (source >= first[:, None]) & (last[:, None] >= 0)
+    rows = np.arange(len(values))[:, None]
+    return np.where(inside, values[rows, source.clip(0, values.shape[1] - 1)], np.nan)
+
+
+def _one_step_sigma(errors):
+    # Desvío de los errores a un paso dentro de la muestra, por serie
+    with np.errstate(invalid="ignore"):
+        return np.sqrt(np.nanmean(errors ** 2, axis=1))
+
+
+def _exponential_smoothing(Y, start, season, alphas, betas, gammas):
+    """
+    Suavizado exponencial aditivo (nivel, tendencia y estacionalidad en forma de
+    corrección de error) sobre todas las series y todas las combinaciones de
+    parámetros a la vez: un solo recorrido en el tiempo con operaciones de NumPy.
+    Retorna el estado final y el desvío de la mejor combinación de cada serie.
+    """
+    n, n_periods = Y.shape
+    grid = np.array([combo for combo in product(alphas, betas, gammas) if combo[1] <= combo[0]])
+    size = len(grid)
+    rows = np.arange(n)
+
+    # Estado inicial por serie: nivel = media del primer ciclo, tendencia = cambio
+    # entre los dos primeros ciclos, estacionalidad = primer ciclo menos el nivel
+    first_cycle = Y[rows[:, None], (start[:, None] + np.arange(season)).clip(0, n_periods - 1)]
+    level0 = first_cycle.mean(axis=1)
+    if season > 1:
+        second_cycle = Y[rows[:, None], (start[:, None] + season + np.arange(season)).clip(0, n_periods - 1)]
+        trend0 = (second_cycle.mean(axis=1) - level0) / season
+        seasonal0 = first_cycle - level0[:, None]
+    else:
+        trend0 = Y[rows, (start + 1).clip(0, n_periods - 1)] - level0
+        seasonal0 = np.zeros((n, 1))
+    if (grid[:, 1] == 0).all():
+        trend0 = np.zeros(n)
+
+    # Un carril por (serie, combinación)
+    y = np.repeat(Y, size, axis=0)
+    lane_start = np.repeat(start, size)
+    alpha, beta, gamma = (np.tile(grid[:, k], n) for k in range(3))
+    level = np.repeat(level0, size)
+    trend = np.repeat(trend0, size)
+    seasonal = np.repeat(seasonal0, size, axis=0)
+    lanes = np.arange(n * size)
+    burn = lane_start + max(season, 1)
+    sse = np.zeros(n * size)
+
+    for t in range(int(start.min(initial=n_periods)), n_periods):
+        active = t >= lane_start
+        k = (t - lane_start) % season
+        season_t = seasonal[lanes, k]
+        error = np.where(active, y[:, t] - (level + trend + season_t), 0.0)
+        sse += np.where(t >= burn, error * error, 0.0)
+        level = np.where(active, level + trend + alpha * error, level)
+        trend = np.where(active, trend + beta * error, trend)
+        seasonal[lanes, k] = np.where(active, season_t + gamma * error, season_t)
+
+    best = np.where(np.isfinite(sse), sse, np.inf).reshape(n, size).argmin(axis=1)
+    chosen = rows * size + best
+    periods = np.maximum(1, n_periods - burn[chosen])
+    return {
+        "level": level[chosen],
+        "trend": trend[chosen],
+        "seasonal": seasonal[chosen],
+        "phase": (n_periods - start) % season,
+        "sigma": np.sqrt(sse[chosen] / periods),
+        "alpha": grid[best, 0],
+        "beta": grid[best, 1],
+        "gamma": grid[best, 2]
+    }
+
+
+def fit_baselines(Y, method, season, window=None):
+    """
+    Ajusta un baseline sobre muchas series a la vez. 'Y' es [serie, período] alineada
+    a la derecha (ver right_align). Todos los métodos se expresan con el mismo estado:
+    pronóstico(h) = nivel + h * tendencia + estacionalidad[(fase + h - 1) % s].
+    - seasonal_naive: repite el último ciclo (último valor si no hay estacionalidad),
+    - drift: último valor más la pendiente media de la historia,
+    - moving_average: media de los últimos 'window' períodos (por defecto, un ciclo),
+    - ses: suavizado exponencial simple,
+    - holt_winters: suavizado con tendencia y estacionalidad aditivas.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    n, n_periods = Y.shape
+    season = season if season > 1 else 1
+    count = np.isfinite(Y).sum(axis=1)
+    start = n_periods - count
+    rows = np.arange(n)
+    last = Y[:, -1]
+    state = {
+        "method": method,
+        "season": season,
+        "nobs": count,
+        "level": np.zeros(n),
+        "trend": np.zeros(n),
+        "seasonal": np.zeros((n, season)),
+        "phase": np.zeros(n, dtype=np.int64)
+    }
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if method == "seasonal_naive":
+            if season > 1:
+                state["seasonal"] = Y[:, n_periods - season:].copy()
+            else:
+                state["level"] = last
+            state["sigma"] = _one_step_sigma(Y[:, season:] - Y[:, :-season])
+        elif method == "drift":
+            slope = (last - Y[rows, start.clip(0, n_periods - 1)]) / (count - 1)
+            state["level"] = last
+            state["trend"] = slope
+            state["sigma"] = _one_step_sigma(np.diff(Y, axis=1) - slope[:, None])
+        elif method == "moving_average":
+            window = int(window or max(season, 3))
+            state["window"] = window
+            state["level"] = np.nanmean(Y[:, -window:], axis=1)
+            means = np.lib.stride_tricks.sliding_window_view(Y, window, axis=1)[:, :-1].mean(axis=-1)
+            state["sigma"] = _one_step_sigma(Y[:, window:] - means)
+        elif method == "ses":
+            state.update(_exponential_smoothing(Y, start, 1, SES_ALPHAS, (0.0,), (0.0,)))
+            state["season"] = 1
+        elif method == "holt_winters":
+            gammas = HOLT_WINTERS_GAMMAS if season > 1 else (0.0,)
+            state.update(_exponential_smoothing(
+                Y, start, season, HOLT_WINTERS_ALPHAS, HOLT_WINTERS_BETAS, gammas
+            ))
+        else:
+            raise ValueError(f"Baseline desconocido: {method}")
+    return state
+
+
+def _horizon_multiplier(state, steps):
+    """
+    Factor del desvío a un paso para cada horizonte h = 1..steps (intervalos de los
+    métodos de referencia, con errores normales).
+    """
+    h = np.arange(1, steps + 1)
+    method = state["method"]
+    season = state["season"]
+    if method == "seasonal_naive":
+        return np.sqrt((h - 1) // season + 1)[None, :]
+    if method == "drift":
+        count = np.maximum(state["nobs"], 2)[:, None]
+        return np.sqrt(h * (1 + h / (count - 1)))
+    if method == "moving_average":
+        return np.full((1, steps), np.sqrt(1 + 1 / state["window"]))
+    # Suavizado exponencial: var(h) = sigma² (1 + sum_{j<h} c_j²), c_j = alfa + j beta + gamma [j % s == 0]
+    j = np.arange(1, steps)
+    c = state["alpha"][:, None] + j * state["beta"][:, None] + state["gamma"][:, None] * (j % season == 0)
+    return np.sqrt(1 + np.concatenate([np.zeros((len(c), 1)), np.cumsum(c ** 2, axis=1)], axis=1))
+
+
+def forecast_baselines(state, steps=12):
+    """
+    Pronóstico de 'steps' períodos de todas las series ajustadas con fit_baselines().
+    Retorna (pronóstico, límite inferior, límite superior), cada uno [serie, h].
+    """
+    h = np.arange(1, steps + 1)
+    rows = np.arange(len(state["level"]))[:, None]
+    seasonal = state["seasonal"][rows, (state["phase"][:, None] + h - 1) % state["season"]]
+    mean = state["level"][:, None] + h * state["trend"][:, None] + seasonal
+    half_width = Z_95 * state["sigma"][:, None] * _horizon_multiplier(state, steps)
+    return mean, mean - half_width, mean + half_width
+
+
+def forecast_frame(mean, lower, upper, last_date, frequency_code="ME"):
+    """
+    DataFrame de pronóstico de una serie (mismas columnas que los otros modelos).
+    """
+    dates = pd.date_range(start=last_date, periods=len(mean) + 1, freq=pandas_frequency(frequency_code))[1:]
+    return pd.DataFrame({
+        'Sales Forecast': np.clip(mean, 0, None),
+        'Lower Bound': np.clip(lower, 0, None),
+        'Upper Bound': np.clip(upper, 0, None)
+    }, index=dates)
+
+
+def _insufficient(method, frequency_code, min_periods):
+    return f"Datos insuficientes para {method} (se requieren > {min_periods} períodos para la frecuencia {frequency_code})."
+
+
+def fit_baseline(ts_history, frequency_code="ME", method="seasonal_naive"):
+    """
+    Ajusta un baseline sobre una serie (misma historia mínima que SARIMA y XGBoost).
+    Retorna (estado, "Success") o (None, mensaje_de_error).
+    """
+    min_periods = get_frequency_settings(frequency_code)["min_periods"]
+    if len(ts_history) < min_periods:
+        return None, _insufficient(method, frequency_code, min_periods)
+    try:
+        season = get_frequency_settings(frequency_code)["seasonal_period"]
+        return fit_baselines(ts_history.to_numpy(dtype=np.float64)[None, :], method, season), "Success"
+    except Exception as e:
+        return None, f"Error en el ajuste {method}: {e}"
+
+
+def forecast_baseline(state, ts_history, steps=12, frequency_code="ME"):
+    """
+    Pronóstico de 'steps' períodos con un baseline ya ajustado sobre 'ts_history'.
+    Retorna (forecast_df, "Success") o (None, mensaje_de_error).
+    """
+    try:
+        mean, lower, upper = forecast_baselines(state, steps)
+        return forecast_frame(mean[0], lower[0], upper[0], ts_history.index[-1], frequency_code), "Success"
+    except Exception as e:
+        return None, f"Error en el pronóstico {state.get('method', 'baseline')}: {e}"
+
+
+def _backtest(Y, method, season, test_periods):
+    # Pronósticos [serie, período] de los últimos 'test_periods', ajustando sin ellos
+    return forecast_baselines(fit_baselines(Y[:, :-test_periods], method, season), test_periods)
+
+
+def backtest_errors(Y, method, season, test_periods):
+    """
+    Errores (real - pronóstico) [serie, período] de los últimos 'test_periods' de todas
+    las series, ajustando sin ellos.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    predictions, _, _ = _backtest(Y, method, season, test_periods)
+    return Y[:, -test_periods:] - predictions
+
+
+def backtest_baselines(Y, method, season, test_periods):
+    """
+    Backtest de todas las series a la vez: se ajusta sin los últimos 'test_periods'
+    y se comparan los pronósticos (y sus intervalos) con los valores reales.
+    Retorna las métricas de backend/models/metrics.py, cada una un arreglo por serie.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    predictions, lower, upper = _backtest(Y, method, season, test_periods)
+    return forecast_metrics(
+        Y[:, -test_periods:], predictions, lower, upper, history=Y[:, :-test_periods], season=season
+    )
+
+
+def run_backtest_baseline(ts_history, frequency_code="ME", method="seasonal_naive"):
+    """
+    Backtest de un baseline (mismo período de prueba y formato que los otros modelos).
+    """
+    settings = get_frequency_settings(frequency_code)
+    min_periods = settings["min_periods"]
+    test_periods = settings["test_periods"]
+    if len(ts_history) < (min_periods + test_periods):
+        return {
+            "status": "Error",
+            "message": f"Datos insuficientes para backtest {method}. Se necesitan > {(min_periods + test_periods)} períodos."
+        }
+    try:
+        Y = ts_history.to_numpy(dtype=np.float64)[None, :]
+        season = settings["seasonal_period"]
+        predictions, lower, upper = _backtest(Y, method, season, test_periods)
+        metrics = forecast_metrics(
+            Y[:, -test_periods:], predictions, lower, upper, history=Y[:, :-test_periods], season=season
+        )
+        return {
+            "status": "Success",
+            "test_period_months": test_periods,
+            **series_metrics(metrics),
+            "residuals": (Y[0, -test_periods:] - predictions[0]).tolist()
+        }
+    except Exception as e:
+        return {"status": "Error", "message": f"Error en backtesting {method}: {e}"}
+
+
+def run_folds_baseline(ts_history, frequency_code="ME", origins=(), horizon=12, method="seasonal_naive"):
+    """
+    Backtest de origen móvil de un baseline (mismo formato que run_folds_xgboost).
+    """
+    season = get_frequency_settings(frequency_code)["seasonal_period"]
+    values = ts_history.to_numpy(dtype=np.float64)
+
+    folds = []
+    for origin in origins:
+        test = values[origin:origin + horizon]
+        fold = {
+            "train_end": ts_history.index[origin - 1].strftime("%Y-%m-%d"),
+            "train_periods": int(origin),
+            "test_periods": int(len(test))
+        }
+        try:
+            metrics = backtest_baselines(values[None, :origin + len(test)], method, season, len(test))
+            folds.append({**fold, "status": "Success", **series_metrics(metrics)})
+        except Exception as e:
+            folds.append({**fold, "status": "Error", "message": f"Error en backtesting {method}: {e}"})
+    return folds
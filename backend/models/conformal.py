@@ -0,0 +1,36 @@
+import numpy as np
+
+# Cobertura de los intervalos conformales: la misma que los intervalos de SARIMA (95%)
+CONFORMAL_COVERAGE = 0.95
+
+
+def conformal_halfwidth(residuals, coverage=CONFORMAL_COVERAGE):
+    """
+    Semiancho del intervalo conformal dividido (split conformal): cuantil de los
+    residuos absolutos del backtest con la corrección de muestra finita
+    ceil((n + 1) * coverage) / n. Con pocos residuos (p. ej. 12 meses al 95%) el
+    cuantil es el máximo. Retorna NaN si no hay residuos.
+    """
+    residuals = np.abs(np.asarray(residuals, dtype=np.float64))
+    residuals = residuals[np.isfinite(residuals)]
+    n = len(residuals)
+    if n == 0:
+        return np.nan
+    level = min(1.0, np.ceil((n + 1) * coverage) / n)
+    return float(np.quantile(residuals, level, method="higher"))
+
+
+def add_conformal_bounds(forecast_df, residuals, coverage=CONFORMAL_COVERAGE):
+    """
+    Completa 'Lower Bound' y 'Upper Bound' del pronóstico con el intervalo conformal
+    de los residuos del backtest (sin entrenar nada). Si no hay residuos, el
+    pronóstico queda como está (intervalos NaN).
+    """
+    halfwidth = conformal_halfwidth(residuals, coverage)
+    if not np.isfinite(halfwidth):
+        return forecast_df
+    forecast_df = forecast_df.copy()
+    # Las ventas no son negativas: el pronóstico ya se recorta en 0, el intervalo también
+    forecast_df['Lower Bound'] = (forecast_df['Sales Forecast'] - halfwidth).clip(lower=0)
+    forecast_df['Upper Bound'] = forecast_df['Sales Forecast'] + halfwidth
+    return forecast_df
@@ -0,0 +1,19 @@
+# Parámetros de los modelos según la frecuencia de la serie:
+# - seasonal_period: longitud del ciclo estacional (s de SARIMA y rezago de XGBoost)
+# - min_periods: historia mínima para entrenar (dos ciclos, o 3 años en anual)
+# - test_periods: tamaño del período de prueba del backtest
+FREQUENCY_SETTINGS = {
+    "ME": {"seasonal_period": 12, "min_periods": 24, "test_periods": 12},  # 1 año de meses
+    "QE": {"seasonal_period": 4, "min_periods": 8, "test_periods": 4},     # 1 año de trimestres
+    "AE": {"seasonal_period": 1, "min_periods": 3, "test_periods": 1},     # sin estacionalidad
+    "W": {"seasonal_period": 52, "min_periods": 104, "test_periods": 13},  # ciclo anual, prueba de 1 trimestre
+    "D": {"seasonal_period": 7, "min_periods": 56, "test_periods": 28},    # ciclo semanal, prueba de 4 semanas
+}
+
+
+def get_frequency_settings(frequency_code):
+    """
+    Devuelve los parámetros de la frecuencia. Códigos desconocidos se tratan como
+    anuales (sin estacionalidad), igual que hacían los modelos originalmente.
+    """
+    return FREQUENCY_SETTINGS.get(frequency_code, FREQUENCY_SETTINGS["AE"])
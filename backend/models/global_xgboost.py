@@ -0,0 +1,245 @@
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+from backend.data_processing import pandas_frequency
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import METRIC_NAMES, forecast_metrics
+
+# Hiperparámetros del modelo global: el panel tiene decenas de series, no unas pocas
+# filas, así que usa más árboles que el XGBoost por serie
+GLOBAL_XGBOOST_PARAMS = {"objective": "reg:squarederror", "n_estimators": 300}
+
+
+def panel_from_cube(cube, frequency_code="ME"):
+    """
+    Panel Categoría × Región (incluidos los totales "All ...") de una frecuencia,
+    tomado del cubo de ventas. Retorna None si la frecuencia no está en el cubo.
+    Es un diccionario de arreglos: se envía tal cual a los procesos del pool.
+    """
+    table = cube.panel(frequency_code)
+    if table is None:
+        return None
+    index, values, first, last = table
+    return {
+        "frequency": frequency_code,
+        "index": index,
+        "values": values,
+        "first": first,
+        "last": last,
+        "categories": list(cube.categories),
+        "regions": list(cube.regions)
+    }
+
+
+def _panel_matrix(panel, horizon=0):
+    """
+    Ventas [segmento, período] con los segmentos aplanados (c * R + r), NaN antes de
+    la primera venta de cada segmento y en los 'horizon' períodos futuros. Desde la
+    primera venta hasta el final del panel los períodos sin ventas valen 0, como en
+    el cubo: un segmento que dejó de vender sigue en el panel con ventas en 0.
+    """
+    values = panel["values"]
+    n_periods = values.shape[2]
+    first = panel["first"].ravel()
+    last = panel["last"].ravel()
+    periods = np.arange(n_periods)
+    inside = (periods >= first[:, None]) & (last[:, None] >= 0)
+
+    matrix = np.full((len(first), n_periods + horizon), np.nan)
+    matrix[:, :n_periods] = np.where(inside, values.reshape(len(first), n_periods), np.nan)
+    return matrix
+
+
+def _calendar(panel, n_periods):
+    """
+    Features de calendario de cada período del panel (mismas que create_features_for_ml),
+    una fila por período; las filas del panel las toman por índice.
+    """
+    frequency_code = panel["frequency"]
+    dates = pd.date_range(panel["index"][0], periods=n_periods, freq=pandas_frequency(frequency_code))
+    columns = [dates.month, dates.quarter, dates.year]
+    if frequency_code == "W":
+        columns.append(dates.isocalendar().week.to_numpy())
+    elif frequency_code == "D":
+        columns.extend([dates.dayofweek, dates.dayofyear])
+    return dates, np.column_stack([np.asarray(column, dtype=np.float64) for column in columns])
+
+
+def build_panel_features(matrix, scale, segments, periods, calendar, n_regions, lag):
+    """
+    Matriz de features de las filas (segmento, período) en una sola pasada de NumPy:
+    categoría y región del segmento, calendario del período y las ventas de uno y dos
+    ciclos estacionales antes, normalizadas por la escala del segmento.
+    """
+    lags = []
+    for k in (1, 2):
+        lagged = periods - k * lag
+        lag_values = np.full(len(periods), np.nan)
+        valid = lagged >= 0
+        lag_values[valid] = matrix[segments[valid], lagged[valid]]
+        lags.append(lag_values / scale[segments])
+    return np.column_stack([segments // n_regions, segments % n_regions, calendar[periods], *lags])
+
+
+def fit_global_xgboost(panel, train_periods=None):
+    """
+    Entrena un único XGBoost sobre todas las series del panel apiladas (los primeros
+    'train_periods' períodos; por defecto, todos). Cada serie se normaliza por su
+    media, así los segmentos grandes y chicos comparten los mismos árboles.
+    Retorna (modelo, "Success") o (None, mensaje_de_error); el modelo es un
+    diccionario con el XGBRegressor y la escala de cada segmento.
+    """
+    try:
+        frequency_code = panel["frequency"]
+        lag = get_frequency_settings(frequency_code)["seasonal_period"]
+        n_regions = len(panel["regions"])
+        train = _panel_matrix(panel)[:, :train_periods]
+
+        segments, periods = np.nonzero(~np.isnan(train))
+        if len(segments) == 0:
+            return None, "Datos insuficientes para XGBoost global."
+
+        with np.errstate(invalid="ignore"):
+            scale = np.nanmean(np.abs(train), axis=1)
+        scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+
+        _, calendar = _calendar(panel, train.shape[1])
+        X = build_panel_features(train, scale, segments, periods, calendar, n_regions, lag)
+        y = train[segments, periods] / scale[segments]
+
+        model = XGBRegressor(**GLOBAL_XGBOOST_PARAMS)
+        model.fit(X, y)
+        return {"model": model, "scale": scale, "lag": lag, "n_regions": n_regions}, "Success"
+
+    except Exception as e:
+        return None, f"Error en el entrenamiento XGBoost global: {e}"
+
+
+def _segment(panel, category, region):
+    try:
+        c = panel["categories"].index(category)
+        r = panel["regions"].index(region)
+    except ValueError:
+        return None
+    if panel["last"][c, r] < 0:
+        return None
+    return c * len(panel["regions"]) + r
+
+
+def forecast_global_xgboost(model, panel, category, region, steps=12):
+    """
+    Pronóstico de 'steps' períodos de un segmento con el modelo global ya entrenado:
+    arma las features de los períodos futuros (desde el final del panel, común a
+    todos los segmentos) y hace una sola llamada a predict.
+    Retorna (forecast_df, "Success") o (None, mensaje_de_error).
+    """
+    try:
+        segment = _segment(panel, category, region)
+        if segment is None:
+            return None, f"No data found for {category}/{region}."
+
+        matrix = _panel_matrix(panel, horizon=steps)
+        n_periods = panel["values"].shape[2]
+        periods = np.arange(n_periods, n_periods + steps)
+        segments = np.full(steps, segment)
+
+        dates, calendar = _calendar(panel, matrix.shape[1])
+        X = build_panel_features(matrix, model["scale"], segments, periods, calendar, model["n_regions"], model["lag"])
+        predictions = (model["model"].predict(X) * model["scale"][segment]).clip(min=0)
+
+        forecast_df = pd.DataFrame({
+            'Sales Forecast': predictions,
+            'Lower Bound': np.nan,
+            'Upper Bound': np.nan
+        }, index=dates[periods])
+        return forecast_df, "Success"
+
+    except Exception as e:
+        return None, f"Error en el pronóstico XGBoost global: {e}"
+
+
+def run_backtest_global_xgboost(panel):
+    """
+    Backtest del modelo global: entrena una vez sin los últimos 'test_periods' del
+    panel y evalúa todos los segmentos con una sola llamada a predict.
+    Retorna las métricas de todos los segmentos; backtest_metrics() extrae las de uno.
+    """
+    settings = get_frequency_settings(panel["frequency"])
+    test_periods = settings["test_periods"]
+    n_periods = panel["values"].shape[2]
+    cutoff = n_periods - test_periods
+    if cutoff <= 0:
+        return {"status": "Error", "message": f"Datos insuficientes para backtest XGBoost global. Se necesitan > {test_periods} períodos."}
+
+    model, status = fit_global_xgboost(panel, train_periods=cutoff)
+    if model is None:
+        return {"status": "Error", "message": status}
+
+    try:
+        matrix = _panel_matrix(panel)
+        segments, periods = np.nonzero(~np.isnan(matrix[:, cutoff:]))
+        periods = periods + cutoff
+        _, calendar = _calendar(panel, n_periods)
+        X = build_panel_features(matrix, model["scale"], segments, periods, calendar, model["n_regions"], model["lag"])
+        predictions = model["model"].predict(X) * model["scale"][segments]
+        actual = matrix[segments, periods]
+
+        # Métricas de todos los segmentos en una pasada: pronósticos [segmento, período]
+        # con NaN donde un segmento no tiene datos de prueba
+        matrix_predictions = np.full((matrix.shape[0], test_periods), np.nan)
+        matrix_predictions[segments, periods - cutoff] = predictions
+        metrics = forecast_metrics(
+            matrix[:, cutoff:], matrix_predictions, history=matrix[:, :cutoff], season=settings["seasonal_period"]
+        )
+
+        # Períodos desde la primera venta hasta el final del panel (0 si el segmento no tiene datos);
+        # con el panel completado con 0 el período de prueba está completo si la historia alcanza
+        first = panel["first"].ravel()
+        history = np.where(panel["last"].ravel() >= 0, n_periods - first, 0)
+        return {
+            "status": "Success",
+            "test_period_months": test_periods,
+            "min_periods": settings["min_periods"] + test_periods,
+            "history": history,
+            # Mismo requisito que el backtest por serie: historia suficiente
+            "eligible": history >= settings["min_periods"] + test_periods,
+            **metrics,
+            # Residuos de todas las filas de prueba y su segmento (intervalos conformales)
+            "residuals": actual - predictions,
+            "segments": segments
+        }
+    except Exception as e:
+        return {"status": "Error", "message": f"Error en backtesting XGBoost global: {e}"}
+
+
+def backtest_metrics(backtest, panel, category, region):
+    """
+    Métricas del backtest global para un segmento (mismo formato que run_backtest_xgboost).
+    """
+    if backtest.get("status") != "Success":
+        return backtest
+    segment = _segment(panel, category, region)
+    if segment is None:
+        return {"status": "Error", "message": f"No data found for {category}/{region}."}
+    if not backtest["eligible"][segment]:
+        return {
+            "status": "Error",
+            "message": (f"Datos insuficientes para backtest XGBoost global: {category}/{region} tiene "
+                        f"{int(backtest['history'][segment])} períodos desde su primera venta y se necesitan "
+                        f">= {backtest['min_periods']}.")
+        }
+    return {
+        "status": "Success",
+        "test_period_months": backtest["test_period_months"],
+        **{name: float(backtest[name][segment]) for name in METRIC_NAMES if name in backtest}
+    }
+
+
+def segment_residuals(backtest, panel, category, region):
+    """
+    Residuos del backtest global de un segmento (arreglo vacío si no es elegible).
+    """
+    segment = _segment(panel, category, region)
+    if backtest.get("status") != "Success" or segment is None or not backtest["eligible"][segment]:
+        return np.empty(0)
+    return backtest["residuals"][backtest["segments"] == segment]
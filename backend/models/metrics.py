@@ -0,0 +1,88 @@
+import numpy as np
+
+# Métricas que devuelven los backtests (coverage solo si el modelo da intervalos)
+METRIC_NAMES = ("mape", "rmse", "mae", "smape", "mase", "bias", "coverage")
+
+
+def _as_matrix(values):
+    # Una serie 1-D cuenta como una fila [1, h]
+    values = np.asarray(values, dtype=np.float64)
+    return values[None, :] if values.ndim == 1 else values
+
+
+def _mean(values, mask):
+    # Media por fila de los valores donde 'mask' es verdadero (NaN si no hay ninguno)
+    count = mask.sum(axis=1)
+    total = np.where(mask, values, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def naive_scale(history, season=1):
+    """
+    Escala del MASE [serie]: error absoluto medio del pronóstico ingenuo estacional
+    (y_t - y_{t-season}) dentro de la historia de entrenamiento [serie, período].
+    Si la historia es más corta que un ciclo se usa el ingenuo simple (season=1).
+    Los NaN (series de distinto largo alineadas) se ignoran.
+    """
+    history = _as_matrix(history)
+    lag = season if 1 <= season < history.shape[1] else 1
+    if history.shape[1] <= lag:
+        return np.full(len(history), np.nan)
+    differences = np.abs(history[:, lag:] - history[:, :-lag])
+    return _mean(differences, np.isfinite(differences))
+
+
+def forecast_metrics(actual, predictions, lower=None, upper=None, history=None, season=1):
+    """
+    Métricas de error de muchas series a la vez, en una sola pasada de NumPy.
+    'actual' y 'predictions' son [serie, h] (o una serie 1-D); los períodos con NaN en
+    cualquiera de los dos no cuentan, así que las series pueden tener distinto largo.
+    - mape: error porcentual absoluto medio (%), sin los períodos con ventas en 0,
+    - rmse, mae: raíz del error cuadrático medio y error absoluto medio,
+    - smape: MAPE simétrico (%, 0 cuando real y pronóstico son 0),
+    - mase: MAE sobre el del ingenuo estacional en 'history' (requiere 'history'),
+    - bias: error medio pronóstico - real (positivo = sobrepronóstico),
+    - coverage: fracción de valores reales dentro de [lower, upper] (si se dan).
+    Retorna un dict de arreglos por serie (las métricas que no aplican no se incluyen).
+    """
+    actual = _as_matrix(actual)
+    predictions = _as_matrix(predictions)
+    valid = np.isfinite(actual) & np.isfinite(predictions)
+    errors = np.where(valid, predictions - actual, 0.0)
+    absolute = np.abs(errors)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nonzero = valid & (actual != 0)
+        denominator = np.abs(actual) + np.abs(predictions)
+        metrics = {
+            "mape": _mean(absolute / np.where(nonzero, np.abs(actual), 1.0), nonzero) * 100,
+            "rmse": np.sqrt(_mean(errors ** 2, valid)),
+            "mae": _mean(absolute, valid),
+            "smape": _mean(np.where(denominator > 0, 2 * absolute / np.where(denominator > 0, denominator, 1.0), 0.0),
+                           valid) * 100,
+            "bias": _mean(errors, valid)
+        }
+        if history is not None:
+            scale = naive_scale(history, season)
+            metrics["mase"] = np.where(scale > 0, metrics["mae"] / np.where(scale > 0, scale, 1.0), np.nan)
+        if lower is not None and upper is not None:
+            lower, upper = _as_matrix(lower), _as_matrix(upper)
+            bounded = valid & np.isfinite(lower) & np.isfinite(upper)
+            metrics["coverage"] = _mean(((actual >= lower) & (actual <= upper)).astype(np.float64), bounded)
+    return metrics
+
+
+def series_metrics(metrics, index=0):
+    """
+    Métricas de una serie (fila 'index' de forecast_metrics) como floats, para el
+    dict de resultado de los backtests.
+    """
+    return {name: float(values[index]) for name, values in metrics.items()}
+
+
+def score_series(actual, predictions, lower=None, upper=None, history=None, season=1):
+    """
+    forecast_metrics de una sola serie, como floats.
+    """
+    return series_metrics(forecast_metrics(actual, predictions, lower, upper, history, season))
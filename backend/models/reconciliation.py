@@ -0,0 +1,129 @@
+import numpy as np
+
+# Métodos de reconciliación de la jerarquía Total / Categoría / Región / Categoría × Región
+RECONCILIATION_METHODS = ("bottom_up", "top_down", "ols", "wls", "mint")
+
+
+def summing_matrix(n_categories, n_regions):
+    """
+    Matriz de agregación S [serie, serie de base] de la jerarquía del cubo: las filas
+    son todas las celdas Categoría × Región en el orden del panel (c * R + r, con el
+    índice 0 = "All ..."), las columnas las celdas de base (c >= 1, r >= 1). Cada
+    total es la suma de las celdas de base que contiene: y = S @ y_base.
+    """
+    categories = np.arange(n_categories)[:, None, None, None]
+    regions = np.arange(n_regions)[None, :, None, None]
+    base_categories = np.arange(1, n_categories)[None, None, :, None]
+    base_regions = np.arange(1, n_regions)[None, None, None, :]
+    S = ((categories == 0) | (categories == base_categories)) & ((regions == 0) | (regions == base_regions))
+    return S.reshape(n_categories * n_regions, (n_categories - 1) * (n_regions - 1)).astype(np.float64)
+
+
+def base_rows(n_categories, n_regions):
+    """
+    Filas de S que son celdas de base (en el orden de las columnas de S).
+    """
+    return (np.arange(1, n_categories)[:, None] * n_regions + np.arange(1, n_regions)).ravel()
+
+
+def shrink_covariance(residuals, weights=None):
+    """
+    Covarianza de los errores [serie, período] con encogimiento hacia la diagonal
+    (Schäfer-Strimmer, como en MinT-shrink): con pocos períodos de prueba y muchas
+    series la covarianza muestral no es invertible. Cada par de series usa los
+    períodos que ambas tienen: los NaN de las series más cortas no cuentan como error 0.
+    Una serie sin ningún error no tiene varianza estimable. Con 'weights' (p. ej. las
+    de WLS, S.sum(axis=1)) se le da la varianza estructural, escalada con la mediana de
+    varianza / peso de las series con errores, y covarianza 0 con las demás. Sin
+    'weights' se rechaza (ValueError).
+    Retorna (covarianza, lambda).
+    """
+    residuals = np.asarray(residuals, dtype=np.float64)
+    observed = np.isfinite(residuals)
+    missing = ~observed.any(axis=1)
+    if missing.all():
+        raise ValueError("Ninguna serie tiene errores del backtest.")
+    if missing.any() and weights is None:
+        raise ValueError("Hay series sin errores del backtest.")
+
+    E = np.where(observed, residuals, 0.0).T
+    M = observed.T.astype(np.float64)
+    n_periods = np.maximum(M.T @ M, 1)
+    sample = E.T @ E / n_periods
+    target = np.diag(np.diag(sample))
+
+    # Errores estandarizados (sin centrar) y varianza de sus correlaciones
+    scale = np.sqrt(np.diag(sample))
+    scale = np.where(scale > 0, scale, 1.0)
+    X = E / scale
+    correlation = X.T @ X / n_periods
+    variance = (X ** 2).T @ (X ** 2) - n_periods * correlation ** 2
+    variance /= n_periods * np.maximum(n_periods - 1, 1)
+    off_diagonal = ~np.eye(len(sample), dtype=bool) & ~missing[:, None] & ~missing[None, :]
+    denominator = (correlation[off_diagonal] ** 2).sum()
+    shrinkage = float(np.clip(variance[off_diagonal].sum() / denominator, 0, 1)) if denominator > 0 else 1.0
+    covariance = shrinkage * target + (1 - shrinkage) * sample
+
+    if missing.any():
+        weights = np.asarray(weights, dtype=np.float64)
+        ratio = np.median(np.diag(sample)[~missing] / weights[~missing])
+        covariance[missing, :] = 0.0
+        covariance[:, missing] = 0.0
+        covariance[missing, missing] = weights[missing] * (ratio if ratio > 0 else 1.0)
+    return covariance, shrinkage
+
+
+def _projection(S, W):
+    """
+    G = (S' W⁻¹ S)⁻¹ S' W⁻¹: lleva los pronósticos de todas las series a las de base
+    con el menor error (ponderado por W) que respeta la jerarquía.
+    """
+    W_inv = np.linalg.pinv(W)
+    return np.linalg.solve(S.T @ W_inv @ S, S.T @ W_inv)
+
+
+def reconciliation_matrix(S, method, rows=None, proportions=None, residuals=None):
+    """
+    Matriz G [serie de base, serie] del método: los pronósticos coherentes son
+    S @ G @ pronósticos_base.
+    - bottom_up: solo las celdas de base ('rows': sus filas en S),
+    - top_down: el total (fila 0) repartido según 'proportions' (una por celda de base),
+    - ols: todas las series con el mismo peso,
+    - wls: peso según cuántas celdas de base suma cada serie (W estructural),
+    - mint: W = covarianza encogida de los errores del backtest ('residuals' [serie, período]);
+      las series sin errores toman la varianza estructural de wls (ver shrink_covariance).
+    Retorna (G, información del método).
+    """
+    n_series, n_base = S.shape
+    if method == "bottom_up":
+        G = np.zeros((n_base, n_series))
+        G[np.arange(n_base), rows] = 1.0
+        return G, {}
+    if method == "top_down":
+        G = np.zeros((n_base, n_series))
+        G[:, 0] = proportions
+        return G, {}
+    if method == "ols":
+        return _projection(S, np.eye(n_series)), {}
+    if method == "wls":
+        return _projection(S, np.diag(S.sum(axis=1))), {}
+    if method == "mint":
+        W, shrinkage = shrink_covariance(residuals, weights=S.sum(axis=1))
+        return _projection(S, W), {"shrinkage": round(shrinkage, 4)}
+    raise ValueError(f"method debe ser uno de: {', '.join(RECONCILIATION_METHODS)}")
+
+
+def reconcile(base, S, G):
+    """
+    Pronósticos coherentes [serie, h] a partir de los de base [serie, h]. Las celdas de
+    base negativas se recortan en 0 antes de sumar (las ventas no son negativas), así
+    que el resultado sigue sumando exactamente.
+    """
+    return S @ np.clip(G @ base, 0, None)
+
+
+def coherence_error(forecasts, S, rows):
+    """
+    Máxima diferencia absoluta entre cada serie y la suma de sus celdas de base.
+    """
+    return float(np.abs(forecasts - S @ forecasts[rows]).max())
@@ -1,33 +1,62 @@
+import warnings
+from itertools import product
+
 import pandas as pd
 import numpy as np
 import statsmodels.api as sm
+from statsmodels.tsa.stattools import kpss
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+from statsmodels.tsa.statespace.kalman_filter import MEMORY_CONSERVE, MEMORY_NO_FORECAST_COV
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import score_series
 
-def get_sarima_forecast(ts_history, steps=12, frequency_code="ME"):
+# El modelo entrenado se guarda en la caché de modelos: no conservamos los estados
+# suavizados ni las matrices por observación (con s=52 pasan de cientos de MB),
+# solo lo necesario para pronosticar con intervalos de confianza.
+FORECAST_ONLY_MEMORY = MEMORY_CONSERVE & ~MEMORY_NO_FORECAST_COV
+
+# Orden ARIMA (p, d, q) por defecto
+DEFAULT_ORDER = (0, 1, 1)
+
+# Grilla de la búsqueda automática de órdenes: p, q <= 2 y P, Q <= 1
+MAX_AR_ORDER = 2
+MAX_MA_ORDER = 2
+MAX_SEASONAL_AR_ORDER = 1
+MAX_SEASONAL_MA_ORDER = 1
+
+# Poda estática: cada parámetro necesita al menos esta cantidad de observaciones
+MIN_OBS_PER_PARAM = 3
+
+
+def get_seasonal_order(frequency_code):
     """
-    Entrena el modelo SARIMA y genera el pronóstico de 'steps' períodos futuros.
+    (P, D, Q, s) según la frecuencia. Sin ciclo estacional (anual) usamos
+    (0,0,0,0) para evitar el error del API.
+    """
+    seasonal_period = get_frequency_settings(frequency_code)["seasonal_period"]
+    if seasonal_period <= 1:
+        return (0, 0, 0, 0)
+    return (0, 1, 1, seasonal_period)
+
+
+def fit_sarima(ts_history, frequency_code="ME", start_params=None, order=None, seasonal_order=None, maxiter=None,
+               simple_differencing=False):
+    """
+    Entrena el modelo SARIMA sobre toda la historia.
+    Retorna (SARIMAXResults, "Success") o (None, mensaje_de_error).
     La estacionalidad (S) se adapta dinámicamente o se desactiva si es Anual.
+    'start_params' (p. ej. los parámetros de un ajuste sobre una ventana vecina)
+    arranca el optimizador cerca de la solución y reduce las iteraciones.
+    'order' y 'seasonal_order' reemplazan los órdenes por defecto (ver order=auto en
+    backend/services/order_search_service.py); 'maxiter' limita las iteraciones.
+    'simple_differencing' ajusta sobre la serie ya diferenciada: el espacio de estados
+    es mucho menor (con s=52, ~10 veces más rápido), pero el modelo solo sirve para
+    comparar órdenes, no para pronosticar la serie original.
     """
     
-    # 1. Lógica de Estacionalidad Dinámica
-    if frequency_code == "ME":
-        seasonal_period = 12 
-        min_periods = 24 # 2 años de datos
-        # (P, D, Q, s) Estacionalidad de 12 meses
-        seasonal_order = (0, 1, 1, 12)
-        
-    elif frequency_code == "QE":
-        seasonal_period = 4 # 4 trimestres
-        min_periods = 8 # 2 años de datos
-        # (P, D, Q, s)  Estacionalidad de 4 trimestres
-        seasonal_order = (0, 1, 1, 4)
-        
-    else: # Anual (AE) o cualquier otro
-        seasonal_period = 1 
-        min_periods = 3 # 3 años de datos
-       
-        # Para anual, NO hay estacionalidad. Usamos (0,0,0,0) para evitar el error del API.
-        seasonal_order = (0, 0, 0, 0) 
+    # 1. Lógica de Estacionalidad Dinámica (ver backend/models/frequency.py)
+    min_periods = get_frequency_settings(frequency_code)["min_periods"]
+    seasonal_order = tuple(seasonal_order) if seasonal_order is not None else get_seasonal_order(frequency_code)
 
     try:
         # 2. Validación Dinámica
@@ -35,7 +64,7 @@ def get_sarima_forecast(ts_history, steps=12, frequency_code="ME"):
             return None, f"Datos insuficientes para SARIMA (se requieren > {min_periods} períodos para la frecuencia {frequency_code})."
         
         # Parámetros ARIMA (Base)
-        order = (0, 1, 1)
+        order = tuple(order) if order is not None else DEFAULT_ORDER
         
         # Entrenar el modelo
         model = SARIMAX(
@@ -43,10 +72,69 @@ def get_sarima_forecast(ts_history, steps=12, frequency_code="ME"):
             order=order,
             seasonal_order=seasonal_order, # Ahora es seguro para anual
             enforce_stationarity=False,
+            enforce_invertibility=False,
+            simple_differencing=simple_differencing
+        )
+        model.ssm.set_conserve_memory(FORECAST_ONLY_MEMORY)
+        fit_options = {"maxiter": maxiter} if maxiter else {}
+        results = model.fit(start_params=start_params, disp=False, **fit_options)
+        return results, "Success"
+    
+    except Exception as e:
+        return None, f"Error en el entrenamiento SARIMA: {e}"
+
+
+def load_sarima(ts_history, frequency_code="ME", params=None, order=None, seasonal_order=None):
+    """
+    Reconstruye un modelo SARIMA ya entrenado a partir de sus parámetros (p. ej. los
+    guardados en el registro de modelos): una sola pasada del filtro de Kalman sobre
+    la historia, sin optimizar. Pronostica igual que el resultado de fit_sarima().
+    Retorna (SARIMAXResults, "Success") o (None, mensaje_de_error).
+    """
+    try:
+        model = SARIMAX(
+            ts_history,
+            order=tuple(order) if order is not None else DEFAULT_ORDER,
+            seasonal_order=tuple(seasonal_order) if seasonal_order is not None else get_seasonal_order(frequency_code),
+            enforce_stationarity=False,
             enforce_invertibility=False
         )
-        results = model.fit(disp=False)
+        model.ssm.set_conserve_memory(FORECAST_ONLY_MEMORY)
+        return model.filter(np.asarray(params, dtype=float)), "Success"
+    except Exception as e:
+        return None, f"Error al cargar el modelo SARIMA: {e}"
+
 
+def update_sarima(ts_history, frequency_code, params, order, seasonal_order, base_llf, base_nobs, base_burn=0):
+    """
+    Actualización incremental de un SARIMA ya entrenado cuando llegan observaciones
+    nuevas: aplica los parámetros existentes a la historia completa sin reoptimizar
+    (lo mismo que results.append(refit=False), pero admite que el último período
+    cambie, p. ej. un mes que seguía abierto).
+    La deriva es cuánto empeora la log-verosimilitud media por observación en los
+    datos nuevos respecto de la historia con la que se entrenó ('base_llf' sobre
+    'base_nobs' observaciones, sin las 'base_burn' iniciales difusas).
+    Retorna (SARIMAXResults, deriva, "Success") o (None, None, mensaje_de_error).
+    """
+    results, status = load_sarima(ts_history, frequency_code, params, order, seasonal_order)
+    if results is None:
+        return None, None, status
+    base_average = base_llf / max(1, base_nobs - base_burn)
+    new_periods = int(results.nobs) - int(base_nobs)
+    if new_periods > 0:
+        new_average = (results.llf - base_llf) / new_periods
+    else:
+        # Solo se corrigieron períodos ya vistos: comparamos toda la historia
+        new_average = results.llf / max(1, results.nobs - base_burn)
+    return results, float(base_average - new_average), "Success"
+
+
+def forecast_sarima(results, steps=12):
+    """
+    Genera el pronóstico de 'steps' períodos futuros con un modelo ya entrenado.
+    Retorna (forecast_df, "Success") o (None, mensaje_de_error).
+    """
+    try:
         # Generar el pronóstico
         forecast = results.get_forecast(steps=steps)
         forecast_df = forecast.summary_frame(alpha=0.05) # 95% CI
@@ -78,32 +166,28 @@ def get_sarima_forecast(ts_history, steps=12, frequency_code="ME"):
         return forecast_df, "Success"
     
     except Exception as e:
-        return None, f"Error en el entrenamiento SARIMA: {e}"
+        return None, f"Error en el pronóstico SARIMA: {e}"
+
 
-def run_backtest_sarima(ts_history, frequency_code="ME"):
+def get_sarima_forecast(ts_history, steps=12, frequency_code="ME"):
+    """
+    Entrena el modelo SARIMA y genera el pronóstico de 'steps' períodos futuros.
+    """
+    results, status = fit_sarima(ts_history, frequency_code)
+    if results is None:
+        return None, status
+    return forecast_sarima(results, steps)
+
+def run_backtest_sarima(ts_history, frequency_code="ME", order=None, seasonal_order=None):
     """
-    Realiza un backtest del modelo SARIMA.
+    Realiza un backtest del modelo SARIMA (con los órdenes por defecto o los indicados).
     """
     
     # 1. Lógica de Estacionalidad Dinámica
-    if frequency_code == "ME":
-        seasonal_period = 12
-        min_periods = 24
-        test_periods = 12
-        seasonal_order = (0, 1, 1, 12)
-        
-    elif frequency_code == "QE":
-        seasonal_period = 4
-        min_periods = 8
-        test_periods = 4
-        seasonal_order = (0, 1, 1, 4)
-        
-    else: # Anual (AE)
-        seasonal_period = 1
-        min_periods = 3
-        test_periods = 1
-       
-        seasonal_order = (0, 0, 0, 0)
+    settings = get_frequency_settings(frequency_code)
+    min_periods = settings["min_periods"]
+    test_periods = settings["test_periods"]
+    seasonal_order = tuple(seasonal_order) if seasonal_order is not None else get_seasonal_order(frequency_code)
 
     # 2. Validación Dinámica
     if len(ts_history) < (min_periods + test_periods):
@@ -118,7 +202,7 @@ def run_backtest_sarima(ts_history, frequency_code="ME"):
     
     try:
         # Parametros
-        order = (0, 1, 1)
+        order = tuple(order) if order is not None else DEFAULT_ORDER
         
         model = SARIMAX(
             train_data,
@@ -131,19 +215,158 @@ def run_backtest_sarima(ts_history, frequency_code="ME"):
         
         forecast = results.get_forecast(steps=test_periods)
         predictions = forecast.predicted_mean
+        bounds = forecast.conf_int(alpha=0.05).to_numpy()
         
-        # Calcular Métricas
-        rmse = np.sqrt(np.mean((test_data.values - predictions.values)**2))
-        mask = test_data.values != 0
-        mape = np.mean(
-            np.abs((test_data.values[mask] - predictions.values[mask]) / test_data.values[mask])
-        ) * 100
+        # Calcular Métricas (backend/models/metrics.py), con la cobertura del intervalo al 95%
+        metrics = score_series(
+            test_data.values, predictions.values, bounds[:, 0], bounds[:, 1],
+            history=train_data.values, season=settings["seasonal_period"]
+        )
         
         return {
             "status": "Success",
             "test_period_months": test_periods,
-            "mape": mape,
-            "rmse": rmse
+            **metrics,
+            # Errores del período de prueba: estiman la covarianza de la reconciliación MinT
+            "residuals": (test_data.values - predictions.values).tolist()
         }
     except Exception as e:
-        return {"status": "Error", "message": f"Error en backtesting SARIMA: {e}"}
\ No newline at end of file
+        return {"status": "Error", "message": f"Error en backtesting SARIMA: {e}"}
+
+
+def run_folds_sarima(ts_history, frequency_code="ME", origins=(), horizon=12, start_params=None,
+                     order=None, seasonal_order=None):
+    """
+    Backtest de origen móvil (ventana expansiva) sobre orígenes consecutivos: el fold
+    'origin' entrena con ts_history[:origin] y se evalúa en los 'horizon' períodos
+    siguientes. Cada fold arranca el optimizador con los parámetros del fold anterior.
+    Retorna una lista con las métricas de cada fold.
+    """
+    season = get_frequency_settings(frequency_code)["seasonal_period"]
+    folds = []
+    for origin in origins:
+        train_data = ts_history[:origin]
+        test_data = ts_history[origin:origin + horizon]
+        fold = {
+            "train_end": train_data.index[-1].strftime("%Y-%m-%d"),
+            "train_periods": int(len(train_data)),
+            "test_periods": int(len(test_data))
+        }
+
+        fold["warm_start"] = start_params is not None
+        results, status = fit_sarima(
+            train_data, frequency_code, start_params=start_params, order=order, seasonal_order=seasonal_order
+        )
+        if results is None:
+            folds.append({**fold, "status": "Error", "message": status})
+            continue
+
+        forecast = results.get_forecast(steps=len(test_data))
+        bounds = forecast.conf_int(alpha=0.05).to_numpy()
+        
+        # Calcular Métricas
+        metrics = score_series(
+            test_data.values, forecast.predicted_mean.values, bounds[:, 0], bounds[:, 1],
+            history=train_data.values, season=season
+        )
+
+        folds.append({
+            **fold,
+            "status": "Success",
+            **metrics,
+            "iterations": results.mle_retvals.get("iterations") if results.mle_retvals else None
+        })
+        start_params = results.params
+    return folds
+
+
+def choose_differencing(ts_history, frequency_code="ME"):
+    """
+    Diferenciación (d, D) de la búsqueda automática. AIC/BIC solo son comparables
+    entre modelos con la misma diferenciación, así que se fija antes de la grilla:
+    D=1 si hay ciclo estacional (como el modelo por defecto) y d=1 si la serie,
+    ya diferenciada estacionalmente, no es estacionaria según KPSS.
+    """
+    seasonal_period = get_frequency_settings(frequency_code)["seasonal_period"]
+    seasonal_diff = 1 if seasonal_period > 1 else 0
+    values = np.asarray(ts_history, dtype=float)
+    if seasonal_diff:
+        values = values[seasonal_period:] - values[:-seasonal_period]
+    if len(values) < 8:
+        return 1, seasonal_diff
+    with warnings.catch_warnings():
+        # KPSS avisa cuando el p-valor cae fuera de su tabla (0.01-0.1)
+        warnings.simplefilter("ignore")
+        p_value = kpss(values, regression="c", nlags="auto")[1]
+    return int(p_value < 0.05), seasonal_diff
+
+
+def sarima_order_candidates(ts_history, frequency_code="ME"):
+    """
+    Grilla acotada de ((p,d,q), (P,D,Q,s)) para la búsqueda automática, de menor a
+    mayor cantidad de parámetros. Se descartan de antemano los candidatos con
+    demasiados parámetros para las observaciones disponibles.
+    """
+    seasonal_period = get_frequency_settings(frequency_code)["seasonal_period"]
+    d, seasonal_diff = choose_differencing(ts_history, frequency_code)
+    if seasonal_period > 1:
+        seasonal_orders = [
+            (P, seasonal_diff, Q, seasonal_period)
+            for P in range(MAX_SEASONAL_AR_ORDER + 1) for Q in range(MAX_SEASONAL_MA_ORDER + 1)
+        ]
+    else:
+        seasonal_orders = [(0, 0, 0, 0)]
+
+    n_obs = len(ts_history) - d - seasonal_diff * seasonal_period
+    candidates = []
+    for p, q in product(range(MAX_AR_ORDER + 1), range(MAX_MA_ORDER + 1)):
+        for seasonal_order in seasonal_orders:
+            n_params = p + q + seasonal_order[0] + seasonal_order[2] + 1  # + varianza
+            if n_params * MIN_OBS_PER_PARAM > n_obs:
+                continue
+            candidates.append(((p, d, q), seasonal_order))
+    candidates.sort(key=lambda c: c[0][0] + c[0][2] + c[1][0] + c[1][2])
+    return candidates
+
+
+def score_sarima_orders(ts_history, frequency_code="ME", candidates=(), criterion="aic", maxiter=None,
+                        start_params=None):
+    """
+    Ajusta cada candidato ((p,d,q), (P,D,Q,s)) y devuelve su criterio ('aic' o 'bic').
+    Los candidatos comparten la diferenciación, así que se ajustan sobre la serie ya
+    diferenciada (simple_differencing), mucho más rápido y con criterios comparables
+    entre sí. Con 'maxiter' el ajuste se corta en ese número de iteraciones (el
+    criterio de un ajuste sin converger es una cota superior del real).
+    'start_params' es una lista con los parámetros iniciales de cada candidato.
+    Retorna una lista de diccionarios; los ajustes fallidos tienen status "Error".
+    """
+    scored = []
+    for i, (order, seasonal_order) in enumerate(candidates):
+        entry = {"order": list(order), "seasonal_order": list(seasonal_order)}
+        with warnings.catch_warnings():
+            # ConvergenceWarning esperado al cortar las iteraciones
+            warnings.simplefilter("ignore")
+            results, status = fit_sarima(
+                ts_history, frequency_code,
+                start_params=start_params[i] if start_params else None,
+                order=order, seasonal_order=seasonal_order, maxiter=maxiter, simple_differencing=True
+            )
+        if results is None:
+            scored.append({**entry, "status": "Error", "message": status})
+            continue
+
+        score = float(getattr(results, criterion))
+        if not np.isfinite(score):
+            scored.append({**entry, "status": "Error", "message": f"{criterion.upper()} no finito."})
+            continue
+
+        retvals = results.mle_retvals or {}
+        scored.append({
+            **entry,
+            "status": "Success",
+            "score": score,
+            "converged": bool(retvals.get("converged", True)),
+            "iterations": retvals.get("iterations"),
+            "params": np.asarray(results.params, dtype=float).tolist()
+        })
+    return scored
@@ -1,21 +1,22 @@
 import numpy as np
 import pandas as pd
 from xgboost import XGBRegressor
-from backend.data_processing import create_features_for_ml
+from backend.data_processing import create_features_for_ml, pandas_frequency
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import score_series
 
+# Hiperparámetros del XGBoost por serie (forman parte de la clave del registro de modelos)
+XGBOOST_PARAMS = {"objective": "reg:squarederror", "n_estimators": 100}
 
-def get_xgboost_forecast(ts_history, steps=12, frequency_code="ME"):
+
+def fit_xgboost(ts_history, frequency_code="ME"):
     """
-    Entrena el modelo XGBoost y genera el pronóstico de 'steps' períodos futuros.
+    Entrena el modelo XGBoost sobre toda la historia.
+    Retorna (XGBRegressor, "Success") o (None, mensaje_de_error).
     """
     
     # 1. Lógica de Períodos Dinámica
-    if frequency_code == "ME":
-        min_periods = 24
-    elif frequency_code == "QE":
-        min_periods = 8
-    else: # Anual (AE)
-        min_periods = 3
+    min_periods = get_frequency_settings(frequency_code)["min_periods"]
 
     try:
         # 2. Validación Dinámica
@@ -26,14 +27,26 @@ def get_xgboost_forecast(ts_history, steps=12, frequency_code="ME"):
         X, y = create_features_for_ml(ts_history, frequency_code)
         
         # 2. Entrenar el modelo
-        model = XGBRegressor(objective='reg:squarederror', n_estimators=100)
+        model = XGBRegressor(**XGBOOST_PARAMS)
         model.fit(X, y)
-        
+        return model, "Success"
+    
+    except Exception as e:
+        return None, f"Error en el entrenamiento XGBoost: {e}"
+
+
+def forecast_xgboost(model, ts_history, steps=12, frequency_code="ME"):
+    """
+    Genera el pronóstico de 'steps' períodos futuros con un modelo ya entrenado
+    sobre 'ts_history' (la historia se usa para construir las features futuras).
+    Retorna (forecast_df, "Success") o (None, mensaje_de_error).
+    """
+    try:
         # 3. Generar pronóstico futuro
         last_date = ts_history.index[-1]
         
-        # 4. Usamos el 'frequency_code' para el rango de fechas
-        future_dates = pd.date_range(start=last_date, periods=steps + 1, freq=f'{frequency_code}') [1:]
+        # 4. Usamos el 'frequency_code' (traducido a alias de pandas) para el rango de fechas
+        future_dates = pd.date_range(start=last_date, periods=steps + 1, freq=pandas_frequency(frequency_code)) [1:]
         future_df = pd.DataFrame(index=future_dates)
         future_df['Sales'] = np.nan
         
@@ -57,25 +70,30 @@ def get_xgboost_forecast(ts_history, steps=12, frequency_code="ME"):
         return forecast_df, "Success"
     
     except Exception as e:
-        return None, f"Error en el entrenamiento XGBoost: {e}"
+        return None, f"Error en el pronóstico XGBoost: {e}"
+
+
+def get_xgboost_forecast(ts_history, steps=12, frequency_code="ME"):
+    """
+    Entrena el modelo XGBoost y genera el pronóstico de 'steps' períodos futuros.
+    """
+    model, status = fit_xgboost(ts_history, frequency_code)
+    if model is None:
+        return None, status
+    return forecast_xgboost(model, ts_history, steps, frequency_code)
 
 
 def run_backtest_xgboost(ts_history, frequency_code="ME"):
     """
     Realiza un backtest del modelo XGBoost.
-    El período de prueba se adapta a la frecuencia (1 año de datos).
+    El período de prueba se adapta a la frecuencia (1 año de datos en ME/QE/AE).
+    Además de las métricas devuelve los residuos del período de prueba.
     """
     
     # 1. Lógica de Períodos Dinámica 
-    if frequency_code == "ME":
-        min_periods = 24
-        test_periods = 12 # Probar con 12 meses
-    elif frequency_code == "QE":
-        min_periods = 8
-        test_periods = 4 # Probar con 4 trimestres
-    else: # Anual (AE)
-        min_periods = 3
-        test_periods = 1 # Probar con 1 año
+    settings = get_frequency_settings(frequency_code)
+    min_periods = settings["min_periods"]
+    test_periods = settings["test_periods"]
 
     # 2. Validación Dinámica
     if len(ts_history) < (min_periods + test_periods):
@@ -93,24 +111,54 @@ def run_backtest_xgboost(ts_history, frequency_code="ME"):
     
     try:
         # 3. Entrenar el modelo
-        model = XGBRegressor(objective='reg:squarederror', n_estimators=100)
+        model = XGBRegressor(**XGBOOST_PARAMS)
         model.fit(X_train, y_train)
         
         # 4. Predecir en el set de prueba
         predictions = model.predict(X_test)
         
-        # 5. Calcular Métricas
-        rmse = np.sqrt(np.mean((y_test.values - predictions)**2))
-        mask = y_test.values != 0
-        mape = np.mean(
-            np.abs((y_test.values[mask] - predictions[mask]) / y_test.values[mask])
-        ) * 100
+        # 5. Calcular Métricas (backend/models/metrics.py)
+        metrics = score_series(
+            y_test.values, predictions, history=ts_history.values[:-test_periods], season=settings["seasonal_period"]
+        )
         
         return {
             "status": "Success",
             "test_period_months": test_periods,
-            "mape": mape,
-            "rmse": rmse
+            **metrics,
+            # Residuos del período de prueba: calibran los intervalos conformales (ver conformal.py)
+            "residuals": (y_test.values - predictions).tolist()
         }
     except Exception as e:
-        return {"status": "Error", "message": f"Error en backtesting XGBoost: {e}"}
\ No newline at end of file
+        return {"status": "Error", "message": f"Error en backtesting XGBoost: {e}"}
+
+
+def run_folds_xgboost(ts_history, frequency_code="ME", origins=(), horizon=12):
+    """
+    Backtest de origen móvil (ventana expansiva): el fold 'origin' entrena con las
+    filas [:origin] y se evalúa en los 'horizon' períodos siguientes. Las features
+    se calculan una sola vez para toda la serie, como en run_backtest_xgboost.
+    Retorna una lista con las métricas de cada fold.
+    """
+    X, y = create_features_for_ml(ts_history, frequency_code)
+    season = get_frequency_settings(frequency_code)["seasonal_period"]
+    
+    folds = []
+    for origin in origins:
+        X_train, X_test = X.iloc[:origin], X.iloc[origin:origin + horizon]
+        y_train, y_test = y.iloc[:origin], y.iloc[origin:origin + horizon]
+        fold = {
+            "train_end": y_train.index[-1].strftime("%Y-%m-%d"),
+            "train_periods": int(len(y_train)),
+            "test_periods": int(len(y_test))
+        }
+        try:
+            model = XGBRegressor(**XGBOOST_PARAMS)
+            model.fit(X_train, y_train)
+            predictions = model.predict(X_test)
+            
+            metrics = score_series(y_test.values, predictions, history=y_train.values, season=season)
+            folds.append({**fold, "status": "Success", **metrics})
+        except Exception as e:
+            folds.append({**fold, "status": "Error", "message": f"Error en backtesting XGBoost: {e}"})
+    return folds
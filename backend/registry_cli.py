@@ -0,0 +1,120 @@
+"""
+Administración del registro en disco de modelos entrenados (ver MODEL_REGISTRY_DIR).
+
+Uso:
+    python -m backend.registry_cli pretrain [--models sarima xgboost xgboost_global] [--frequencies ME QE W]
+    python -m backend.registry_cli list
+    python -m backend.registry_cli prune [--keep-last 1] [--older-than-days 30]
+
+- pretrain: carga el dataset actual y entrena (o reutiliza) los modelos de todos los
+  segmentos Categoría × Región, así el primer pronóstico tras un despliegue no entrena.
+  Los SARIMA con modelo de una versión anterior de los datos se actualizan (ver
+  backend/services/sarima_update.py).
+- list: muestra los artefactos guardados.
+- prune: borra los artefactos de datos anteriores; siempre conserva los del dataset actual.
+"""
+import argparse
+import time
+
+from backend import config
+from backend.dataset_store import DatasetHolder
+from backend.services.model_cache import ModelCache
+from backend.services.model_registry import ModelRegistry
+
+
+def _load_snapshot():
+    holder = DatasetHolder(config.DATA_SOURCE, chunk_rows=config.DATA_CHUNK_ROWS, keep_rows=config.DATA_KEEP_ROWS)
+    holder.reload()
+    if holder.snapshot is None:
+        raise SystemExit(f"No se pudo cargar el dataset: {holder.status}")
+    return holder.snapshot
+
+
+def _pretrain(registry, args):
+    # Importación local: forecast_service importa los modelos (XGBoost, statsmodels)
+    from backend.services.forecast_service import GLOBAL_MODEL, iter_forecast_batch, pretrain_global_model
+
+    snapshot = _load_snapshot()
+    # Caché propia: solo sirve de puerta al registro (se vacía tras cada frecuencia)
+    model_cache = ModelCache(registry=registry)
+    print(f"Dataset {snapshot.source} (huella {snapshot.fingerprint[:16]}), registro en {registry.root}")
+
+    for model_type in args.models:
+        for frequency in args.frequencies:
+            start = time.perf_counter()
+            saves, hits, updates = registry.saves, registry.hits, registry.updates
+            if model_type == GLOBAL_MODEL:
+                status = pretrain_global_model(snapshot, frequency, model_cache)
+                ok = int(status == "Success")
+                failed = 1 - ok
+            else:
+                ok = failed = 0
+                for result in iter_forecast_batch(snapshot, model_type, "all", 1, frequency, model_cache):
+                    if result["status"] == "success":
+                        ok += 1
+                    else:
+                        failed += 1
+                # Los modelos ya quedaron en disco: liberamos la memoria antes de la siguiente frecuencia
+                model_cache.clear()
+            print(
+                f"{model_type:>15} {frequency:>3}: {ok} ok, {failed} con error, "
+                f"{registry.saves - saves - (registry.updates - updates)} entrenados, "
+                f"{registry.updates - updates} actualizados con datos nuevos, {registry.hits - hits} ya estaban "
+                f"({time.perf_counter() - start:.1f} s)"
+            )
+
+
+def _list(registry, args):
+    entries = registry.entries()
+    for entry in entries:
+        key = entry.get("key", {})
+        backtest = entry.get("backtest", {})
+        mape = backtest.get("mape")
+        print(
+            f"{key.get('dataset', '?')[:16]}  {entry.get('family', '?'):>15}  {key.get('frequency', '?'):>3}  "
+            f"{key.get('category', '?')} / {key.get('region', '?')}  "
+            f"{entry.get('train_seconds') or 0:.2f} s  "
+            f"MAPE {'-' if mape is None else f'{mape:.1f}'}  {entry['bytes'] / 1024:.1f} KB"
+        )
+    stats = registry.stats()
+    print(f"{stats['artifacts']} artefactos de {stats['datasets']} datasets, {stats['bytes'] / 1024 ** 2:.1f} MB")
+
+
+def _prune(registry, args):
+    snapshot = _load_snapshot()
+    older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+    removed = registry.prune(
+        keep_datasets=[snapshot.fingerprint], keep_last=args.keep_last, older_than_seconds=older_than
+    )
+    for path in removed:
+        print(f"Borrado: {path}")
+    print(f"{len(removed)} datasets borrados; se conserva el actual ({snapshot.fingerprint[:16]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=config.MODEL_REGISTRY_DIR, help="Directorio del registro")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pretrain = commands.add_parser("pretrain", help="Entrena y guarda los modelos de todos los segmentos")
+    pretrain.add_argument("--models", nargs="+", default=["sarima", "xgboost", "xgboost_global"])
+    pretrain.add_argument("--frequencies", nargs="+", default=["ME", "QE", "W"])
+    pretrain.set_defaults(handler=_pretrain)
+
+    listing = commands.add_parser("list", help="Lista los artefactos guardados")
+    listing.set_defaults(handler=_list)
+
+    prune = commands.add_parser("prune", help="Borra los artefactos de datasets anteriores")
+    prune.add_argument("--keep-last", type=int, default=0, help="Datasets más recientes que se conservan")
+    prune.add_argument("--older-than-days", type=float, default=None,
+                       help="Solo borra datasets sin cambios hace más de estos días")
+    prune.set_defaults(handler=_prune)
+
+    args = parser.parse_args()
+    if not args.root:
+        raise SystemExit("El registro de modelos está desactivado (MODEL_REGISTRY_DIR vacío).")
+    args.handler(ModelRegistry(args.root), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from backend import config
+from backend.dataset_store import resolve_data_file
+from backend.services.model_executor import pool_stats
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Administration"]
+)
+
+@router.post("/reload", status_code=202)
+def reload_dataset(
+    file_name: Optional[str] = Query(None, description="Archivo dentro de data/ a cargar. Por defecto, el actual.")
+):
+    """
+    Recarga el dataset en segundo plano y lo publica de forma atómica al terminar.
+    Las peticiones en curso siguen usando el snapshot anterior.
+    """
+    path = None
+    if file_name:
+        try:
+            path = resolve_data_file(file_name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"Archivo no encontrado: {file_name}")
+
+    started = config.DATASET.reload_async(path) is not None
+    return {
+        "status": "reloading" if started else "already_reloading",
+        "current_version": config.DATASET.version
+    }
+
+@router.get("/dataset")
+def dataset_info():
+    """
+    Devuelve la versión y el origen del dataset activo.
+    """
+    snapshot = config.DATASET.snapshot
+    return {
+        "loading": config.DATASET.loading,
+        "status": config.DATASET.status,
+        "version": snapshot.version if snapshot else 0,
+        "fingerprint": snapshot.fingerprint if snapshot else None,
+        "source": snapshot.source if snapshot else config.DATASET.file_name,
+        "rows": snapshot.rows if snapshot else 0,
+        "loaded_at": snapshot.loaded_at if snapshot else None
+    }
+
+@router.get("/model-cache")
+def model_cache_stats():
+    """
+    Estado de la caché de modelos entrenados (entradas, memoria, aciertos y fallos).
+    """
+    return config.MODEL_CACHE.stats()
+
+@router.delete("/model-cache")
+def clear_model_cache():
+    """
+    Vacía la caché de modelos entrenados (los contadores se conservan).
+    """
+    config.MODEL_CACHE.clear()
+    return config.MODEL_CACHE.stats()
+
+@router.get("/model-registry")
+def model_registry_stats():
+    """
+    Estado del registro en disco de modelos (artefactos, tamaño, aciertos y fallos).
+    """
+    if config.MODEL_REGISTRY is None:
+        raise HTTPException(status_code=404, detail="El registro de modelos está desactivado (MODEL_REGISTRY_DIR vacío).")
+    return config.MODEL_REGISTRY.stats()
+
+@router.get("/model-pool")
+def model_pool_stats():
+    """
+    Estado del pool de procesos de modelos (procesos, cola, tareas en curso y rechazadas).
+    """
+    return pool_stats()
+
+@router.get("/precompute")
+def precompute_status():
+    """
+    Progreso del precálculo de pronósticos y métricas de la versión actual del
+    dataset, y cobertura por modelo y frecuencia (segmentos listos para servir).
+    """
+    return config.PRECOMPUTE.status()
+
+@router.post("/precompute", status_code=202)
+def restart_precompute():
+    """
+    Vuelve a lanzar el precálculo sobre el dataset actual (p. ej. tras vaciar la caché).
+    Lo que ya está en la caché o en el registro en disco no se vuelve a entrenar.
+    """
+    snapshot = config.check_data_loaded()
+    if not config.PRECOMPUTE.enabled:
+        raise HTTPException(status_code=404, detail="El precálculo está desactivado (PRECOMPUTE_WORKERS=0).")
+    config.PRECOMPUTE.start(snapshot)
+    return config.PRECOMPUTE.status()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
-# Importamos las variables globales y la función de chequeo desde config.py
-from backend.config import CATEGORIES, REGIONS, FREQUENCIES, check_data_loaded
+# Importamos el módulo de configuración: los filtros se leen del snapshot activo
+# porque se actualizan junto con los datos en cada recarga
+from backend import config
+from backend.filter_index import EXTRA_DIMENSIONS
 
 router = APIRouter(
     prefix="/config",
@@ -12,10 +14,15 @@ def get_filters():
     """
     Devuelve las listas de filtros para poblar los selectores del frontend.
     """ 
-    check_data_loaded() # Verifica si DF_RAW es None
+    snapshot = config.check_data_loaded() # Verifica que haya datos cargados
+    
+    # Valores de las dimensiones adicionales (filtros multi-valor de /sales/*), tomados
+    # de los agregados: no hace falta construir el índice de filtros
+    dimensions = {dim: snapshot.aggregates.dimension_values(dim) for dim in EXTRA_DIMENSIONS}
     
     return { 
-        "categories": CATEGORIES, 
-        "regions": REGIONS, 
-        "frequencies": FREQUENCIES 
+        "categories": snapshot.categories, 
+        "regions": snapshot.regions, 
+        "frequencies": config.FREQUENCIES,
+        "dimensions": dimensions
     }
\ No newline at end of file
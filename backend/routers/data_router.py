@@ -0,0 +1,64 @@
+import io
+import json
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from backend import config
+from backend.data_processing import validate_transactions
+
+router = APIRouter(
+    prefix="/data",
+    tags=["Data Ingestion"]
+)
+
+def _parse_body(content_type, body):
+    """
+    Convierte el cuerpo de la petición (CSV o JSON) en un DataFrame.
+    JSON acepta una lista de registros o {"transactions": [...]}.
+    """
+    if "csv" in content_type:
+        return pd.read_csv(io.BytesIO(body))
+
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("transactions", [])
+    if not isinstance(payload, list):
+        raise ValueError("El JSON debe ser una lista de transacciones o {\"transactions\": [...]}.")
+    return pd.DataFrame(payload)
+
+def _ingest(snapshot, content_type, body):
+    """
+    Parseo, validación y publicación del lote (pandas y listeners del dataset):
+    corre en el pool de hilos para no bloquear el event loop.
+    """
+    try:
+        batch = _parse_body(content_type, body)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Cuerpo inválido: {e}")
+
+    batch, errors = validate_transactions(batch, reference=snapshot.template)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    new_snapshot = config.DATASET.append(batch)
+    return {
+        "status": "success",
+        "rows_added": int(len(batch)),
+        "total_rows": new_snapshot.rows,
+        "version": new_snapshot.version
+    }
+
+@router.post("/transactions", status_code=201)
+async def ingest_transactions(request: Request):
+    """
+    Agrega un lote de transacciones (JSON o CSV) al dataset en memoria.
+    Los agregados de ventas y KPIs se actualizan de forma incremental y se
+    publica una nueva versión del dataset.
+    """
+    snapshot = config.check_data_loaded()
+
+    # Solo la lectura del cuerpo es asíncrona; el resto va al pool de hilos
+    body = await request.body()
+    return await run_in_threadpool(_ingest, snapshot, request.headers.get("content-type", ""), body)
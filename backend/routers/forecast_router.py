@@ -1,74 +1,286 @@
+import json
 from fastapi import APIRouter, Query, HTTPException
-from typing import Dict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional, Union
 import pandas as pd
 
 # Importamos los datos crudos y la función de chequeo
-from backend.config import DF_RAW, check_data_loaded
+from backend import config
 # Importamos los servicios que orquestan la lógica
-from backend.services.forecast_service import process_forecast_request, process_evaluation_request
+from backend.services.forecast_service import (
+    process_forecast_request, process_evaluation_request, process_forecast_report,
+    iter_forecast_batch, forecast_to_json, batch_result_to_json, MODEL_TYPES, MODEL_TYPE_ERROR
+)
+from backend.models.frequency import FREQUENCY_SETTINGS
+from backend.services.hierarchy_service import process_hierarchy_request
+from backend.services.model_executor import ModelPoolBusy, record_rejection
 
 router = APIRouter(
     prefix="/sales",
     tags=["Sales Forecasting"]
 )
 
+def _collect_filters(segment, state, sub_category, ship_mode):
+    """
+    Agrupa los filtros multi-valor opcionales (se repite el parámetro para varios valores).
+    """
+    return {
+        "segment": segment or [],
+        "state": state or [],
+        "sub_category": sub_category or [],
+        "ship_mode": ship_mode or []
+    }
+
+def _busy(e):
+    """
+    429 con Retry-After cuando la cola del pool de modelos está llena.
+    """
+    record_rejection()
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _intervals(response, result):
+    """
+    Indica si el pronóstico trae intervalos; si no (XGBoost sin residuos del
+    backtest), el motivo.
+    """
+    message = result.get("intervals_message")
+    response["intervals_available"] = message is None
+    if message is not None:
+        response["intervals_message"] = message
+    return response
+
+def _deadline(deadline_ms):
+    # Sin deadline_ms en la petición rige el valor por defecto del servidor
+    return config.FORECAST_DEADLINE_MS if deadline_ms is None else deadline_ms
+
 @router.get("/forecast", response_model=Dict)
 def sales_forecast_endpoint(
-    model_type: str = Query("sarima", description="El modelo a usar: 'sarima' o 'xgboost'"),
+    model_type: str = Query("sarima", description="El modelo a usar: 'sarima', 'xgboost', 'xgboost_global' o un baseline ('seasonal_naive', 'drift', 'moving_average', 'ses', 'holt_winters')"),
     category: str = Query("All Categories", description="Categoría del producto."),
     region: str = Query("All Regions", description="Región geográfica."),
     steps: int = Query(12, description="Número de períodos a pronosticar."),
-    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE)")
+    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE, W, D)"),
+    segment: Optional[List[str]] = Query(None, description="Segmento(s) de cliente."),
+    state: Optional[List[str]] = Query(None, description="Estado(s)."),
+    sub_category: Optional[List[str]] = Query(None, description="Subcategoría(s) de producto."),
+    ship_mode: Optional[List[str]] = Query(None, description="Modo(s) de envío."),
+    order: str = Query("default", description="Órdenes SARIMA: 'default' o 'auto' (búsqueda por AIC/BIC)."),
+    criterion: str = Query("aic", description="Criterio de la búsqueda con order=auto: 'aic' o 'bic'."),
+    deadline_ms: Optional[int] = Query(None, ge=0, description="Tiempo máximo de espera del modelo en ms (por defecto FORECAST_DEADLINE_MS; 0 = sin límite). Pasado ese tiempo la respuesta es degradada.")
 ):
     """
     Endpoint dinámico que genera un pronóstico futuro usando el modelo seleccionado.
     """
-    check_data_loaded()
+    snapshot = config.check_data_loaded()
+    filters = _collect_filters(segment, state, sub_category, ship_mode)
     
     # 1. Llamamos al servicio para procesar la petición
-    result = process_forecast_request(DF_RAW, model_type, category, region, steps, frequency)
+    try:
+        result = process_forecast_request(
+            snapshot, model_type, category, region, steps, frequency, filters,
+            model_cache=config.MODEL_CACHE, order=order, criterion=criterion, order_store=config.SARIMA_ORDERS,
+            deadline_ms=_deadline(deadline_ms)
+        )
+    except ModelPoolBusy as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # 2. Manejamos la respuesta del servicio
     if result["status"] != "success":
         raise HTTPException(status_code=400, detail=result["message"])
         
     # 3. Formateamos la respuesta a JSON
-    history_ts = result["history"]
-    forecast_df = result["forecast_df"]
-    
-    history_json = {
-        "index": [i.strftime("%Y-%m-%d") for i in history_ts.index],
-        "data": history_ts.values.tolist()
-    }
-    forecast_df['Date'] = forecast_df.index.strftime('%Y-%m-%d')
-    forecast_json = forecast_df.reset_index(drop=True).to_dict(orient='records')
+    history_json, forecast_json = forecast_to_json(result)
 
-    return {
+    response = {
         "status": "success",
         "model_used": result["model_used"],
+        "cache_hit": result["cache_hit"],
+        "degraded": result.get("degraded", False),
         "history": history_json,
         "forecast": forecast_json
     }
+    if result["sarima_order"] is not None:
+        response["sarima_order"] = result["sarima_order"]
+    _intervals(response, result)
+    if result.get("degraded"):
+        response["fallback"] = result["fallback"]
+        response["message"] = result["message"]
+    return response
 
 @router.get("/evaluation", response_model=Dict)
 def sales_evaluation_endpoint(
-    model_type: str = Query("sarima", description="El modelo a evaluar: 'sarima' o 'xgboost'"),
+    model_type: str = Query("sarima", description="El modelo a evaluar: 'sarima', 'xgboost', 'xgboost_global' o un baseline ('seasonal_naive', 'drift', 'moving_average', 'ses', 'holt_winters')"),
     category: str = Query("All Categories", description="Categoría del producto."),
     region: str = Query("All Regions", description="Región geográfica."),
-    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE)")
+    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE, W, D)"),
+    segment: Optional[List[str]] = Query(None, description="Segmento(s) de cliente."),
+    state: Optional[List[str]] = Query(None, description="Estado(s)."),
+    sub_category: Optional[List[str]] = Query(None, description="Subcategoría(s) de producto."),
+    ship_mode: Optional[List[str]] = Query(None, description="Modo(s) de envío."),
+    folds: Optional[int] = Query(None, ge=1, le=20, description="Folds del backtest de origen móvil (por defecto, un solo período de prueba)."),
+    horizon: Optional[int] = Query(None, ge=1, description="Períodos de prueba por fold (por defecto, según la frecuencia)."),
+    order: str = Query("default", description="Órdenes SARIMA: 'default' o 'auto' (búsqueda por AIC/BIC)."),
+    criterion: str = Query("aic", description="Criterio de la búsqueda con order=auto: 'aic' o 'bic'."),
+    deadline_ms: Optional[int] = Query(None, ge=0, description="Tiempo máximo de espera del backtest en ms (por defecto FORECAST_DEADLINE_MS; 0 = sin límite). Pasado ese tiempo la respuesta es degradada.")
 ):
     """
     Realiza un backtest del modelo seleccionado y devuelve las métricas de error.
     """
-    check_data_loaded()
+    snapshot = config.check_data_loaded()
+    filters = _collect_filters(segment, state, sub_category, ship_mode)
     
     # 1. Llamamos al servicio
-    metrics = process_evaluation_request(DF_RAW, model_type, category, region, frequency)
+    try:
+        metrics = process_evaluation_request(
+            snapshot, model_type, category, region, frequency, filters,
+            model_cache=config.MODEL_CACHE, folds=folds, horizon=horizon,
+            order=order, criterion=criterion, order_store=config.SARIMA_ORDERS, deadline_ms=_deadline(deadline_ms)
+        )
+    except ModelPoolBusy as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # 2. Manejamos la respuesta
     if metrics.get("status") != "Success":
         raise HTTPException(status_code=400, detail=metrics.get("message", "Error desconocido en evaluación"))
         
-    metrics["model_used"] = model_type
+    # Una respuesta degradada puede venir del modelo de respaldo
+    metrics.setdefault("model_used", model_type)
+    metrics.setdefault("degraded", False)
     return metrics
 
+@router.get("/forecast_report", response_model=Dict)
+def sales_forecast_report_endpoint(
+    model_type: str = Query("sarima", description="El modelo a usar: 'sarima', 'xgboost', 'xgboost_global' o un baseline ('seasonal_naive', 'drift', 'moving_average', 'ses', 'holt_winters')"),
+    category: str = Query("All Categories", description="Categoría del producto."),
+    region: str = Query("All Regions", description="Región geográfica."),
+    steps: int = Query(12, description="Número de períodos a pronosticar."),
+    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE, W, D)"),
+    segment: Optional[List[str]] = Query(None, description="Segmento(s) de cliente."),
+    state: Optional[List[str]] = Query(None, description="Estado(s)."),
+    sub_category: Optional[List[str]] = Query(None, description="Subcategoría(s) de producto."),
+    ship_mode: Optional[List[str]] = Query(None, description="Modo(s) de envío."),
+    folds: Optional[int] = Query(None, ge=1, le=20, description="Folds del backtest de origen móvil (por defecto, un solo período de prueba)."),
+    horizon: Optional[int] = Query(None, ge=1, description="Períodos de prueba por fold (por defecto, según la frecuencia)."),
+    order: str = Query("default", description="Órdenes SARIMA: 'default' o 'auto' (búsqueda por AIC/BIC)."),
+    criterion: str = Query("aic", description="Criterio de la búsqueda con order=auto: 'aic' o 'bic'.")
+):
+    """
+    Pronóstico y evaluación en una sola llamada: la serie se agrega una vez y el
+    backtest y el entrenamiento completo corren en paralelo.
+    """
+    snapshot = config.check_data_loaded()
+    filters = _collect_filters(segment, state, sub_category, ship_mode)
+    
+    try:
+        result = process_forecast_report(
+            snapshot, model_type, category, region, steps, frequency, filters,
+            model_cache=config.MODEL_CACHE, folds=folds, horizon=horizon,
+            order=order, criterion=criterion, order_store=config.SARIMA_ORDERS
+        )
+    except ModelPoolBusy as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result["status"] != "success":
+        raise HTTPException(status_code=400, detail=result["message"])
+    
+    history_json, forecast_json = forecast_to_json(result)
+    metrics = result["metrics"]
+    metrics["model_used"] = model_type
+    
+    response = {
+        "status": "success",
+        "model_used": result["model_used"],
+        "cache_hit": result["cache_hit"],
+        "history": history_json,
+        "forecast": forecast_json,
+        "metrics": metrics
+    }
+    if result["sarima_order"] is not None:
+        response["sarima_order"] = result["sarima_order"]
+    return _intervals(response, result)
+
+class BatchSegment(BaseModel):
+    category: str = "All Categories"
+    region: str = "All Regions"
+
+class BatchForecastRequest(BaseModel):
+    model_type: str = "sarima"
+    steps: int = Field(12, ge=1)
+    frequency: str = "ME"
+    # Lista de segmentos, o "all" para todas las combinaciones Categoría × Región
+    segments: Union[Literal["all"], List[BatchSegment]] = "all"
+
+def check_batch_request(request):
+    """
+    Valida el lote antes de responder (el streaming ya envió el 200 cuando el
+    generador empieza). Retorna el model_type normalizado.
+    """
+    model_type = request.model_type.lower()
+    if model_type not in MODEL_TYPES:
+        raise HTTPException(status_code=400, detail=MODEL_TYPE_ERROR)
+    if request.frequency not in FREQUENCY_SETTINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Frecuencia no soportada: {request.frequency} (use {', '.join(FREQUENCY_SETTINGS)})."
+        )
+    return model_type
+
+def _batch_line(result):
+    """
+    Una línea NDJSON por segmento.
+    """
+    return json.dumps(jsonable_encoder(batch_result_to_json(result))) + "\n"
+
+@router.post("/forecast/batch")
+def sales_forecast_batch_endpoint(request: BatchForecastRequest):
+    """
+    Pronostica una lista de segmentos (o todos) entrenando en paralelo en un pool de
+    procesos. La respuesta es NDJSON: una línea por segmento, en cuanto está lista.
+    """
+    snapshot = config.check_data_loaded()
+    model_type = check_batch_request(request)
+    
+    segments = request.segments
+    if segments != "all":
+        segments = [(s.category, s.region) for s in segments]
+    
+    results = iter_forecast_batch(
+        snapshot, model_type, segments, request.steps, request.frequency,
+        model_cache=config.MODEL_CACHE
+    )
+    return StreamingResponse(
+        (_batch_line(result) for result in results), media_type="application/x-ndjson"
+    )
+
+@router.get("/forecast/hierarchy", response_model=Dict)
+def sales_forecast_hierarchy_endpoint(
+    model_type: str = Query("xgboost_global", description="Modelo de los pronósticos de base (los mismos de /forecast)."),
+    method: str = Query("mint", description="Reconciliación: 'bottom_up', 'top_down', 'ols', 'wls' o 'mint'."),
+    steps: int = Query(12, ge=1, description="Número de períodos a pronosticar."),
+    frequency: str = Query("ME", description="Frecuencia (ME, QE, AE, W, D)")
+):
+    """
+    Pronóstico coherente de toda la jerarquía (Total, Categorías, Regiones y
+    Categoría × Región) en una sola llamada: los totales suman exactamente sus partes.
+    """
+    snapshot = config.check_data_loaded()
+    try:
+        result = process_hierarchy_request(
+            snapshot, model_type.lower(), steps, frequency, method, model_cache=config.MODEL_CACHE
+        )
+    except ModelPoolBusy as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result["status"] != "success":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
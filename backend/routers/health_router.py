@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend import config
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+
+@router.get("/live")
+def liveness():
+    """
+    Liveness: responde siempre que el proceso esté atendiendo peticiones,
+    aunque el dataset todavía se esté cargando.
+    """
+    return {"status": "alive"}
+
+@router.get("/ready")
+def readiness():
+    """
+    Readiness: 200 solo cuando el dataset está cargado y se pueden atender peticiones.
+    """
+    snapshot = config.DATASET.snapshot
+    if snapshot is not None:
+        return {"status": "ready", "version": snapshot.version, "rows": snapshot.rows}
+
+    if config.DATASET.loading:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading", "detail": config.DATASET.status},
+            headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)}
+        )
+
+    return JSONResponse(status_code=503, content={"status": "error", "detail": config.DATASET.status})
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException
+
+from backend import config
+from backend.routers.forecast_router import BatchForecastRequest, check_batch_request
+from backend.services.job_store import DONE, ERROR
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
+def _job_status(job):
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "completed": job["completed"],
+        "total": job["total"],
+        "data_version": job["data_version"],
+        "error": job["error"],
+        "params": job["params"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+def _get_job(job_id, with_result=False):
+    job = config.JOBS.get(job_id, with_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job
+
+@router.post("/forecast", status_code=202)
+def create_forecast_job(request: BatchForecastRequest):
+    """
+    Registra un pronóstico (uno o varios segmentos, mismos parámetros que
+    /sales/forecast/batch) y devuelve el id del job de inmediato.
+    Si ya hay un job idéntico pendiente o en curso, devuelve ese mismo id.
+    """
+    params = request.model_dump()
+    params["model_type"] = check_batch_request(request)
+
+    job, created = config.JOBS.submit_forecast(params)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job['id']}",
+        "result_url": f"/jobs/{job['id']}/result"
+    }
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """
+    Estado y progreso (segmentos terminados / total) de un job.
+    """
+    return _job_status(_get_job(job_id))
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Resultado de un job terminado: una entrada por segmento, con la misma forma
+    que las líneas de /sales/forecast/batch. 409 si el job no terminó o falló.
+    """
+    job = _get_job(job_id, with_result=True)
+    if job["status"] == ERROR:
+        raise HTTPException(status_code=409, detail=f"El job falló: {job['error']}")
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"El job aún no termina (estado: {job['status']}).")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "data_version": job["data_version"],
+        "results": job["result"]
+    }
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict
 # Importamos los datos crudos y el chequeo
-from backend.config import DF_RAW, check_data_loaded
+from backend import config
 #  Importamos las funciones de servicio
-from backend.services.kpi_service import calculate_global_kpis, get_regional_analysis
+from backend.services.kpi_service import get_kpi_report
 
 router = APIRouter(
     prefix="/global",
@@ -15,15 +15,14 @@ def global_kpis_endpoint():
     """
     Devuelve métricas clave de rendimiento (KPIs) a nivel global.
     """
-    check_data_loaded()
+    snapshot = config.check_data_loaded()
     
     
-    # 1. Calculamos los KPIs
-    kpis = calculate_global_kpis(DF_RAW)
-    # 2. Calculamos el análisis regional
-    regional_data = get_regional_analysis(DF_RAW)
+    # 1. Calculamos los KPIs y el análisis regional desde los agregados del snapshot
+    # (se mantienen al día de forma incremental al agregar transacciones)
+    kpis, regional_data = get_kpi_report(snapshot.aggregates)
     
-    # 3. Los devolvemos en la respuesta
+    # 2. Los devolvemos en la respuesta
     return {
         "status": "success",
         "kpis": kpis, # <-- La llave que faltaba
@@ -0,0 +1,141 @@
+import os
+from functools import partial
+
+import numpy as np
+
+from backend.models.baseline_models import BASELINE_MODELS, run_folds_baseline
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import METRIC_NAMES
+from backend.models.sarima_model import run_folds_sarima
+from backend.models.xgboost_model import run_folds_xgboost
+from backend.services.model_executor import MODEL_WORKERS, ModelPoolBusy, cv_task, submit_model_task
+
+# model_type -> evaluar folds(ts, freq, orígenes, horizonte)
+CV_FOLDS = {
+    "sarima": run_folds_sarima,
+    "xgboost": run_folds_xgboost,
+    **{name: partial(run_folds_baseline, method=name) for name in BASELINE_MODELS},
+}
+
+# Máximo de folds por petición (cada fold es un entrenamiento completo)
+MAX_FOLDS = 20
+
+# Mínimo de folds por tramo: solo el primer fold de cada tramo arranca en frío, así
+# que con un tramo por proceso y pocos folds ningún fold de SARIMA haría warm start
+CV_MIN_FOLDS_PER_CHUNK = max(1, int(os.getenv("CV_MIN_FOLDS_PER_CHUNK", "3")))
+
+
+def rolling_origins(n_periods, folds, horizon):
+    """
+    Orígenes del backtest de ventana expansiva: el último fold termina en el final
+    de la serie y cada fold anterior retrocede 'horizon' períodos.
+    """
+    return [n_periods - horizon * (folds - k) for k in range(folds)]
+
+
+def split_chunks(items, n_chunks):
+    """
+    Divide 'items' en 'n_chunks' tramos contiguos de tamaño parecido.
+    """
+    n_chunks = max(1, min(n_chunks, len(items)))
+    bounds = np.linspace(0, len(items), n_chunks + 1).round().astype(int)
+    return [items[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def fold_chunks(origins, workers):
+    """
+    Tramos de folds para el pool: uno por proceso, pero con al menos
+    CV_MIN_FOLDS_PER_CHUNK folds cada uno para que el warm start tenga efecto.
+    """
+    return split_chunks(origins, min(workers, -(-len(origins) // CV_MIN_FOLDS_PER_CHUNK)))
+
+
+def summarize_folds(folds, horizon):
+    """
+    Métricas agregadas (media y desviación entre folds) a partir de las de cada fold.
+    """
+    ok = [fold for fold in folds if fold["status"] == "Success"]
+    if not ok:
+        message = folds[0].get("message") if folds else "No se evaluó ningún fold."
+        return {"status": "Error", "message": message, "folds": folds}
+
+    # Media y desviación entre folds de cada métrica (coverage solo si el modelo da intervalos)
+    metrics = {}
+    for name in (name for name in METRIC_NAMES if name in ok[0]):
+        values = np.array([fold.get(name, np.nan) for fold in ok], dtype=float)
+        finite = np.isfinite(values).any()
+        metrics[name] = float(np.nanmean(values)) if finite else float('nan')
+        metrics[f"{name}_std"] = float(np.nanstd(values)) if finite else float('nan')
+    return {
+        "status": "Success",
+        "mode": "rolling",
+        "n_folds": len(folds),
+        "successful_folds": len(ok),
+        "horizon": horizon,
+        "test_period_months": horizon,
+        **metrics,
+        "folds": folds
+    }
+
+
+def run_rolling_backtest(model_type, ts_history, frequency, folds, horizon=None, workers=None, params=None):
+    """
+    Backtest de origen móvil con 'folds' folds de 'horizon' períodos (por defecto,
+    el período de prueba de la frecuencia).
+
+    Los folds se reparten en tramos contiguos de al menos CV_MIN_FOLDS_PER_CHUNK
+    folds, hasta uno por proceso del pool: los tramos corren en paralelo y, dentro de
+    cada tramo, cada fold de SARIMA arranca con los parámetros del anterior (warm start). 'params' son opciones del modelo
+    (p. ej. los órdenes de SARIMA con order=auto).
+    """
+    settings = get_frequency_settings(frequency)
+    horizon = horizon or settings["test_periods"]
+    if folds < 1 or folds > MAX_FOLDS:
+        return {"status": "Error", "message": f"folds debe estar entre 1 y {MAX_FOLDS}."}
+
+    needed = settings["min_periods"] + folds * horizon
+    if len(ts_history) < needed:
+        return {
+            "status": "Error",
+            "message": f"Datos insuficientes para backtest de origen móvil. Se necesitan > {needed} períodos."
+        }
+
+    origins = rolling_origins(len(ts_history), folds, horizon)
+    if model_type in BASELINE_MODELS:
+        # Los baselines tardan menos que el viaje al pool: se evalúan aquí mismo
+        results = CV_FOLDS[model_type](ts_history, frequency, origins, horizon)
+    else:
+        results = _run_fold_chunks(model_type, ts_history, frequency, origins, horizon, workers, params)
+        if isinstance(results, dict):
+            return results
+
+    for index, fold in enumerate(results):
+        fold["fold"] = index + 1
+    return summarize_folds(results, horizon)
+
+
+def _run_fold_chunks(model_type, ts_history, frequency, origins, horizon, workers=None, params=None):
+    """
+    Reparte los folds en tramos en el pool de procesos. Retorna la lista de folds o
+    un diccionario de error.
+    """
+    chunks = fold_chunks(origins, workers or max(1, MODEL_WORKERS))
+
+    futures = []
+    try:
+        for i, chunk in enumerate(chunks):
+            # El primer tramo decide la admisión (429 si la cola está llena);
+            # los siguientes esperan lugar, la petición ya fue aceptada
+            futures.append(submit_model_task(
+                cv_task, model_type, ts_history, frequency, chunk, horizon, params, wait=i > 0
+            ))
+        results = []
+        for future in futures:
+            results.extend(future.result())
+    except ModelPoolBusy:
+        for future in futures:
+            future.cancel()
+        raise
+    except Exception as e:
+        return {"status": "Error", "message": f"Error en el proceso de evaluación: {e}"}
+    return results
@@ -1,41 +1,599 @@
 # Contenido para: backend/services/forecast_service.py
 
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextvars import copy_context
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
 # 1. Importaciones de nuestros módulos
 from backend.data_processing import aggregate_sales
-from backend.models.sarima_model import get_sarima_forecast, run_backtest_sarima 
-from backend.models.xgboost_model import get_xgboost_forecast, run_backtest_xgboost 
+from backend.models.baseline_models import (
+    BASELINE_MODELS, fit_baseline, fit_baselines, forecast_baseline, forecast_baselines, forecast_frame,
+    right_align, run_backtest_baseline
+)
+from backend.models.conformal import add_conformal_bounds
+from backend.models.frequency import get_frequency_settings
+from backend.models.metrics import METRIC_NAMES
+from backend.models.sarima_model import (
+    DEFAULT_ORDER, fit_sarima, forecast_sarima, get_seasonal_order, run_backtest_sarima
+)
+from backend.models.xgboost_model import XGBOOST_PARAMS, fit_xgboost, forecast_xgboost, run_backtest_xgboost 
+from backend.models.global_xgboost import (
+    GLOBAL_XGBOOST_PARAMS, backtest_metrics, forecast_global_xgboost, panel_from_cube, segment_residuals
+)
+from backend.services.backtest_service import run_rolling_backtest
+from backend.services.model_cache import model_cache_key
+from backend.services.model_executor import (
+    MODEL_QUEUE_SIZE, MODEL_WORKERS, ModelPoolBusy, backtest_task, fit_forecast_task, fit_task, global_backtest_task, global_fit_task,
+    load_forecast_task, registry_load_task, run_model_task, sarima_update_task, submit_model_task,
+    update_forecast_task
+)
+from backend.services.model_registry import artifact_key, load_artifact
+from backend.services.order_search_service import CRITERIA, resolve_sarima_order
+
+def _aggregate_history(snapshot, category, region, frequency, filters=None):
+    """
+    Obtiene la serie histórica del snapshot: del cubo precalculado si solo se filtra
+    por Categoría/Región, o del índice de bitmaps si hay filtros adicionales.
+    """
+    filters = {dim: values for dim, values in (filters or {}).items() if values}
+    source = snapshot.filter_index if filters else snapshot.cube
+    return aggregate_sales(
+        df=source,
+        category=category,
+        region=region,
+        frequency=frequency,
+        filters=filters
+    )
+
+def _no_data_message(category, region, filters=None):
+    extra = "".join(
+        f"/{dim}={','.join(values)}" for dim, values in (filters or {}).items() if values
+    )
+    return f"No data found for {category}/{region}{extra}."
+
+# model_type -> (entrenar(ts, freq), pronosticar(modelo, ts, steps, freq))
+FORECASTERS = {
+    "sarima": (fit_sarima, lambda model, ts, steps, freq: forecast_sarima(model, steps)),
+    "xgboost": (fit_xgboost, forecast_xgboost),
+    **{name: (partial(fit_baseline, method=name), forecast_baseline) for name in BASELINE_MODELS},
+}
+
+# model_type -> backtest(ts, freq)
+BACKTESTS = {
+    "sarima": run_backtest_sarima,
+    "xgboost": run_backtest_xgboost,
+    **{name: partial(run_backtest_baseline, method=name) for name in BASELINE_MODELS},
+}
+
+# Modelo XGBoost global: uno por frecuencia y versión del dataset, entrenado sobre el
+# panel Categoría × Región del cubo (ver backend/models/global_xgboost.py)
+GLOBAL_MODEL = "xgboost_global"
+
+MODEL_TYPES = (*FORECASTERS, GLOBAL_MODEL)
+MODEL_TYPE_ERROR = f"model_type debe ser uno de: {', '.join(MODEL_TYPES)}"
+
+# Modelos sin intervalos propios: se calibran con los residuos de su backtest
+# (intervalos conformales, ver backend/models/conformal.py)
+CONFORMAL_MODELS = ("xgboost", GLOBAL_MODEL)
+
+# Modelo de respaldo de las peticiones con deadline_ms cuando el modelo pedido no
+# termina a tiempo y no hay un resultado anterior del segmento (ver _within_deadline)
+FALLBACK_MODEL = os.getenv("FORECAST_FALLBACK_MODEL", "seasonal_naive")
+
+# Hilos para esperar en paralelo el backtest y el entrenamiento completo de /forecast_report
+# (ambos corren en el pool de procesos; estos hilos solo esperan el resultado). Las tareas
+# se envían con copy_context().run para que conserven el carril del pool de quien las lanza.
+_REPORT_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="forecast-report")
+
+# Cálculos con deadline_ms en curso, también los que siguen tras responder con el
+# respaldo. Como mucho uno por segmento (las peticiones iguales esperan el mismo) y
+# FORECAST_DEADLINE_WORKERS en total (por defecto, los lugares del pool de procesos:
+# más no avanzarían); con todos ocupados se responde el respaldo de inmediato.
+DEADLINE_WORKERS = int(os.getenv(
+    "FORECAST_DEADLINE_WORKERS", str(max(1, MODEL_WORKERS) + MODEL_QUEUE_SIZE)
+))
+_DEADLINE_EXECUTOR = ThreadPoolExecutor(max_workers=DEADLINE_WORKERS, thread_name_prefix="forecast-deadline")
+_deadline_lock = threading.Lock()
+_deadline_running = {}
+
+# Los entrenamientos corren en el pool de procesos (backend/services/model_executor.py),
+# fuera del GIL del API. ModelPoolBusy (cola llena) se propaga al router como un 429,
+# salvo con deadline_ms, que responde con un resultado degradado (ver _within_deadline).
+# Los baselines (backend/models/baseline_models.py) tardan menos que el viaje al pool:
+# corren aquí mismo.
+def _fit_in_pool(model_type, ts_history, frequency, params=None):
+    if model_type in BASELINE_MODELS:
+        return FORECASTERS[model_type][0](ts_history, frequency)
+    try:
+        return run_model_task(fit_task, model_type, ts_history, frequency, params)
+    except ModelPoolBusy:
+        raise
+    except Exception as e:
+        return None, f"Error en el proceso de entrenamiento: {e}"
+
+def _backtest_in_pool(model_type, ts_history, frequency, params=None, wait=False):
+    if model_type in BASELINE_MODELS:
+        return BACKTESTS[model_type](ts_history, frequency)
+    try:
+        return submit_model_task(backtest_task, model_type, ts_history, frequency, params, wait=wait).result()
+    except ModelPoolBusy:
+        raise
+    except Exception as e:
+        return {"status": "Error", "message": f"Error en el proceso de evaluación: {e}"}
+
+def _hyperparameters(model_type, frequency, params=None):
+    """
+    Hiperparámetros que identifican al modelo en el registro en disco.
+    """
+    if model_type == "sarima":
+        params = params or {}
+        return {
+            "order": list(params.get("order") or DEFAULT_ORDER),
+            "seasonal_order": list(params.get("seasonal_order") or get_seasonal_order(frequency))
+        }
+    if model_type == GLOBAL_MODEL:
+        return GLOBAL_XGBOOST_PARAMS
+    return XGBOOST_PARAMS
+
+def _registry_key(model_cache, snapshot, model_type, category, region, frequency, filters=None, params=None):
+    """
+    Clave del modelo en el registro en disco (None si la caché no tiene registro).
+    Los baselines no se guardan: ajustarlos cuesta menos que leerlos del disco.
+    """
+    if model_cache is None or model_cache.registry is None or model_type in BASELINE_MODELS:
+        return None
+    return artifact_key(
+        model_type, category, region, frequency, snapshot.fingerprint, filters,
+        _hyperparameters(model_type, frequency, params)
+    )
+
+def _load_from_registry(registry, model_type, found, ts_history, frequency):
+    if found is None:
+        return None
+    if model_type != "sarima":
+        return load_artifact(model_type, *found, ts_history, frequency)
+    # Reconstruir SARIMA es una pasada del filtro de Kalman (segundos con s=52): va al pool
+    try:
+        return run_model_task(registry_load_task, model_type, *found, ts_history, frequency)
+    except ModelPoolBusy:
+        raise
+    except Exception as e:
+        print(f"Aviso: no se pudo cargar el modelo {found[0]}: {e}")
+        return None
+
+def _update_from_registry(registry, model_type, key, ts_history, frequency):
+    """
+    SARIMA de un segmento que ya tenía modelo con una versión anterior de los datos:
+    actualización incremental o reentrenamiento según backend/services/sarima_update.py.
+    Retorna (modelo, linaje) o (None, None) si no hay modelo anterior.
+    """
+    previous = registry.find_previous(model_type, key) if model_type == "sarima" else None
+    if previous is None:
+        return None, None
+    try:
+        model, lineage, status = run_model_task(sarima_update_task, *previous, ts_history, frequency)
+    except ModelPoolBusy:
+        raise
+    except Exception as e:
+        model, lineage, status = None, None, str(e)
+    if model is None:
+        print(f"Aviso: no se pudo actualizar el modelo {previous[0]}: {status}")
+    return model, lineage
+
+def _artifact_size(model_type, size):
+    # El artefacto de XGBoost es el modelo completo: su tamaño sirve para la caché sin
+    # volver a serializarlo. El de SARIMA son solo los parámetros (la caché lo estima)
+    return None if model_type == "sarima" else size
+
+def _load_or_fit(model_cache, registry_key, model_type, ts_history, frequency, fit):
+    """
+    fit() -> (modelo, status) con el registro en disco de por medio: si ya hay un
+    artefacto con esta clave se carga sin entrenar; si hay uno de datos anteriores se
+    actualiza (SARIMA); si no, se entrena. Lo nuevo se guarda en el registro.
+    Retorna (modelo, status, bytes) para ModelCache.get_or_fit.
+    """
+    if registry_key is None:
+        return fit()
+    registry = model_cache.registry
+    found = registry.find(model_type, registry_key)
+    model = _load_from_registry(registry, model_type, found, ts_history, frequency)
+    if model is not None:
+        return model, "Success", _artifact_size(model_type, found[1].get("bytes"))
+    started = time.perf_counter()
+    model, lineage = _update_from_registry(registry, model_type, registry_key, ts_history, frequency)
+    if model is not None:
+        size = registry.save(
+            model_type, registry_key, model, train_seconds=round(time.perf_counter() - started, 3), lineage=lineage
+        )
+        return model, "Success", _artifact_size(model_type, size)
+    model, status = fit()
+    size = None
+    if model is not None:
+        size = registry.save(model_type, registry_key, model, train_seconds=round(time.perf_counter() - started, 3))
+    return model, status, _artifact_size(model_type, size)
+
+def _record_backtest(model_cache, registry_key, model_type, metrics):
+    # Métricas del backtest en los metadatos del artefacto del registro
+    if registry_key is not None and metrics.get("status") == "Success":
+        model_cache.registry.record_backtest(model_type, registry_key, metrics)
+
+def _model_variant(snapshot, model_type, category, region, frequency, filters, ts_history, model_cache=None,
+                   order="default", criterion="aic", order_store=None):
+    """
+    Variante del modelo a entrenar: (etiqueta para la caché, parámetros, info del orden, status).
+    Con order="auto" (solo SARIMA) se usa el orden ganador de la búsqueda automática
+    (ver backend/services/order_search_service.py), que se busca una vez por segmento
+    y versión de los datos. Lanza ValueError si la combinación no es válida.
+    """
+    if order == "default":
+        return model_type, None, None, "Success"
+    if order != "auto":
+        raise ValueError("order debe ser 'default' o 'auto'")
+    if model_type != "sarima":
+        raise ValueError("order=auto solo aplica a model_type='sarima'")
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion debe ser uno de: {', '.join(CRITERIA)}")
+
+    result, status = resolve_sarima_order(
+        snapshot, category, region, frequency, filters, ts_history, criterion, order_store, model_cache
+    )
+    if result is None:
+        return None, None, None, status
+    params = {
+        "order": tuple(result["order"]),
+        "seasonal_order": tuple(result["seasonal_order"]),
+        "start_params": result["params"]
+    }
+    label = f"sarima{params['order']}{params['seasonal_order']}"
+    order_info = {
+        "order": result["order"],
+        "seasonal_order": result["seasonal_order"],
+        "criterion": result["criterion"],
+        "score": result["score"],
+        "searched": result["searched"]
+    }
+    return label, params, order_info, "Success"
+
+def _fit_model(snapshot, model_type, category, region, frequency, filters, ts_history, model_cache=None,
+               label=None, params=None):
+    """
+    Devuelve (modelo, status, cache_hit). Con 'model_cache' el modelo se entrena una
+    sola vez por segmento, frecuencia, variante ('label') y versión del dataset.
+    """
+    if model_cache is None:
+        model, status = _fit_in_pool(model_type, ts_history, frequency, params)
+        return model, status, False
+    key = model_cache_key(label or model_type, category, region, frequency, snapshot.version, filters)
+    registry_key = _registry_key(model_cache, snapshot, model_type, category, region, frequency, filters, params)
+    return model_cache.get_or_fit(key, lambda: _load_or_fit(
+        model_cache, registry_key, model_type, ts_history, frequency,
+        lambda: _fit_in_pool(model_type, ts_history, frequency, params)
+    ))
+
+def _run_backtest(snapshot, model_type, category, region, frequency, filters, ts_history, model_cache=None,
+                  folds=None, horizon=None, label=None, params=None, residuals=False, wait=False):
+    """
+    Devuelve las métricas del backtest: el último período de prueba (por defecto) o,
+    con 'folds', un backtest de origen móvil. Con 'model_cache' se calculan una vez por
+    segmento y versión del dataset (se guardan junto a los modelos, con otra clave).
+    Los residuos del período de prueba solo se incluyen con residuals=True. Con
+    wait=True espera lugar en el pool en lugar de lanzar ModelPoolBusy.
+    """
+    if params and "start_params" in params:
+        # Los parámetros iniciales vienen de ajustar toda la historia: en el backtest
+        # filtrarían información del período de prueba, solo se usan los órdenes
+        params = {name: value for name, value in params.items() if name != "start_params"}
+
+    def _backtest():
+        if folds:
+            return run_rolling_backtest(model_type, ts_history, frequency, folds, horizon, params=params)
+        return _backtest_in_pool(model_type, ts_history, frequency, params, wait)
+
+    if model_cache is None:
+        metrics = _backtest()
+        if not residuals:
+            metrics.pop("residuals", None)
+        return metrics
+
+    registry_key = _registry_key(model_cache, snapshot, model_type, category, region, frequency, filters, params)
+
+    def _evaluate():
+        metrics = _backtest()
+        if metrics.get("status") != "Success":
+            return None, metrics.get("message", "Error desconocido en evaluación")
+        _record_backtest(model_cache, registry_key, model_type, metrics)
+        return metrics, "Success"
+
+    mode = f"cv{folds}x{horizon or 'auto'}" if folds else "backtest"
+    key = model_cache_key(f"{label or model_type}:{mode}", category, region, frequency, snapshot.version, filters)
+    metrics, message, _ = model_cache.get_or_fit(key, _evaluate)
+    if metrics is None:
+        return {"status": "Error", "message": message}
+    metrics = dict(metrics)
+    if not residuals:
+        metrics.pop("residuals", None)
+    return metrics
+
+def _submit_residuals(snapshot, model_type, category, region, frequency, filters, ts_history, model_cache=None,
+                      label=None, params=None):
+    """
+    Lanza en paralelo con el entrenamiento el backtest cuyos residuos calibran los
+    intervalos conformales. Se calcula una vez por segmento y versión (queda en la
+    caché), así que después el intervalo es solo un cuantil. None si no aplica.
+    El modelo de la petición ya tiene su lugar en el pool: este backtest espera el
+    suyo (como los lotes) en lugar de dejar el pronóstico sin intervalos.
+    """
+    if model_type not in CONFORMAL_MODELS or model_cache is None:
+        return None
+    return _REPORT_EXECUTOR.submit(
+        copy_context().run, _run_backtest, snapshot, model_type, category, region, frequency, filters, ts_history, model_cache,
+        None, None, label, params, True, True
+    )
+
+def _bounds_from_residuals(forecast_df, residuals, message=None):
+    """
+    (forecast_df, intervals_message): el pronóstico con los intervalos conformales, o
+    sin ellos y el motivo si no hay residuos del backtest.
+    """
+    if len(residuals) == 0:
+        return forecast_df, message or "Sin residuos del backtest para calibrar los intervalos."
+    return add_conformal_bounds(forecast_df, residuals), None
+
+def _with_conformal_bounds(forecast_df, residuals_future):
+    if residuals_future is None or forecast_df is None:
+        return forecast_df, None
+    try:
+        metrics = residuals_future.result()
+    except Exception as e:
+        return forecast_df, f"No se pudo calcular el backtest de los intervalos: {e}"
+    return _bounds_from_residuals(forecast_df, metrics.get("residuals", ()), metrics.get("message"))
+
+def _global_panel(snapshot, frequency, filters=None):
+    """
+    Panel del cubo para el modelo global. El cubo solo tiene Categoría y Región:
+    con filtros adicionales hay que usar los modelos por serie.
+    """
+    if any(values for values in (filters or {}).values()):
+        raise ValueError(f"{GLOBAL_MODEL} solo admite Categoría y Región (sin filtros adicionales).")
+    panel = panel_from_cube(snapshot.cube, frequency)
+    if panel is None:
+        raise ValueError(f"Frecuencia no soportada por {GLOBAL_MODEL}: {frequency}")
+    return panel
+
+def _global_model(snapshot, frequency, panel, model_cache=None, wait=False):
+    """
+    Devuelve (modelo, status, cache_hit) del modelo global de la frecuencia. Se entrena
+    una sola vez por versión del dataset, en el pool de procesos, y lo comparten todos
+    los segmentos: pronosticar un segmento es solo una llamada a predict.
+    """
+    def _fit():
+        try:
+            return submit_model_task(global_fit_task, panel, wait=wait).result()
+        except ModelPoolBusy:
+            raise
+        except Exception as e:
+            return None, f"Error en el proceso de entrenamiento: {e}"
+
+    if model_cache is None:
+        model, status = _fit()
+        return model, status, False
+    key = model_cache_key(GLOBAL_MODEL, None, None, frequency, snapshot.version)
+    registry_key = _registry_key(model_cache, snapshot, GLOBAL_MODEL, None, None, frequency)
+    return model_cache.get_or_fit(key, lambda: _load_or_fit(
+        model_cache, registry_key, GLOBAL_MODEL, None, frequency, _fit
+    ))
+
+def _global_backtest_table(snapshot, frequency, panel, model_cache=None, wait=False):
+    """
+    (backtest, status) del modelo global: métricas y residuos de todos los segmentos.
+    Se calcula una vez por frecuencia y versión. Con wait=True espera lugar en el pool.
+    """
+    def _evaluate():
+        try:
+            backtest = submit_model_task(global_backtest_task, panel, wait=wait).result()
+        except ModelPoolBusy:
+            raise
+        except Exception as e:
+            return None, f"Error en el proceso de evaluación: {e}"
+        if backtest.get("status") != "Success":
+            return None, backtest.get("message", "Error desconocido en evaluación")
+        # En el registro: la media de los segmentos evaluados
+        eligible = backtest["eligible"]
+        _record_backtest(model_cache, _registry_key(model_cache, snapshot, GLOBAL_MODEL, None, None, frequency),
+                         GLOBAL_MODEL, {
+                             "status": "Success",
+                             "test_period_months": backtest["test_period_months"],
+                             **{
+                                 name: float(np.nanmean(backtest[name][eligible])) if eligible.any() else None
+                                 for name in METRIC_NAMES if name in backtest
+                             }
+                         })
+        return backtest, "Success"
+
+    if model_cache is None:
+        return _evaluate()
+    key = model_cache_key(f"{GLOBAL_MODEL}:backtest", None, None, frequency, snapshot.version)
+    backtest, message, _ = model_cache.get_or_fit(key, _evaluate)
+    return backtest, message
+
+def _global_backtest(snapshot, category, region, frequency, panel, model_cache=None):
+    """
+    Métricas del backtest global para un segmento. El backtest evalúa todos los
+    segmentos a la vez, así que se calcula una vez por frecuencia y versión.
+    """
+    backtest, message = _global_backtest_table(snapshot, frequency, panel, model_cache)
+    if backtest is None:
+        return {"status": "Error", "message": message}
+    return backtest_metrics(backtest, panel, category, region)
+
+def _global_bounds(forecast_df, snapshot, category, region, frequency, panel, model_cache=None):
+    # Intervalos conformales con los residuos del segmento en el backtest global;
+    # (forecast_df, intervals_message) como _with_conformal_bounds
+    if model_cache is None:
+        return forecast_df, None
+    try:
+        backtest, message = _global_backtest_table(snapshot, frequency, panel, model_cache, wait=True)
+    except Exception as e:
+        return forecast_df, f"No se pudo calcular el backtest de los intervalos: {e}"
+    if backtest is None:
+        return forecast_df, message
+    metrics = backtest_metrics(backtest, panel, category, region)
+    return _bounds_from_residuals(
+        forecast_df, segment_residuals(backtest, panel, category, region), metrics.get("message")
+    )
+
+def backtest_residuals(snapshot, model_type, category, region, frequency, model_cache=None):
+    """
+    Errores (real - pronóstico) del período de prueba del backtest de un segmento, sin
+    filtros adicionales (arreglo vacío si no hay backtest). Con 'model_cache' se
+    reutiliza el backtest de /sales/evaluation.
+    """
+    if model_type == GLOBAL_MODEL:
+        panel = _global_panel(snapshot, frequency)
+        backtest, _ = _global_backtest_table(snapshot, frequency, panel, model_cache)
+        return np.empty(0) if backtest is None else segment_residuals(backtest, panel, category, region)
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency)
+    if not data_available:
+        return np.empty(0)
+    metrics = _run_backtest(
+        snapshot, model_type, category, region, frequency, None, ts_history, model_cache, residuals=True
+    )
+    return np.asarray(metrics.get("residuals", ()), dtype=np.float64)
+
+def pretrain_global_model(snapshot, frequency, model_cache=None):
+    """
+    Entrena por adelantado el modelo global de una frecuencia (al publicar una versión),
+    para que ninguna petición pague el entrenamiento. También calcula su backtest, que
+    da las métricas y los intervalos conformales. Espera lugar en el pool.
+    """
+    panel = _global_panel(snapshot, frequency)
+    _, status, _ = _global_model(snapshot, frequency, panel, model_cache, wait=True)
+    if status == "Success" and model_cache is not None:
+        _, status = _global_backtest_table(snapshot, frequency, panel, model_cache, wait=True)
+    return status
+
+def _process_global_request(snapshot, category, region, steps, frequency, filters, ts_history, model_cache=None,
+                            order="default", folds=None, with_metrics=False):
+    """
+    Pronóstico (y opcionalmente evaluación) con el modelo XGBoost global.
+    """
+    if order != "default":
+        raise ValueError("order=auto solo aplica a model_type='sarima'")
+    if folds:
+        raise ValueError(f"folds no está disponible para {GLOBAL_MODEL}")
+    panel = _global_panel(snapshot, frequency, filters)
+
+    metrics = None
+    if with_metrics:
+        metrics = _global_backtest(snapshot, category, region, frequency, panel, model_cache)
+        if metrics.get("status") != "Success":
+            return {"status": "error", "message": metrics.get("message", "Error desconocido en evaluación")}
+
+    forecast_df = None
+    model, status, cache_hit = _global_model(snapshot, frequency, panel, model_cache)
+    if model is not None:
+        forecast_df, status = forecast_global_xgboost(model, panel, category, region, steps)
+    if status != "Success" or forecast_df is None:
+        return {"status": "error", "message": status}
+    forecast_df, intervals_message = _global_bounds(
+        forecast_df, snapshot, category, region, frequency, panel, model_cache
+    )
 
-def process_forecast_request(df_raw, model_type, category, region, steps, frequency):
+    result = {
+        "status": "success",
+        "model_used": GLOBAL_MODEL,
+        "history": ts_history,
+        "forecast_df": forecast_df,
+        "intervals_message": intervals_message,
+        "cache_hit": cache_hit,
+        "sarima_order": None
+    }
+    if with_metrics:
+        result["metrics"] = metrics
+    return result
+
+def process_forecast_request(snapshot, model_type, category, region, steps, frequency, filters=None,
+                             model_cache=None, order="default", criterion="aic", order_store=None,
+                             deadline_ms=None):
     """
-    Orquesta la lógica para generar un pronóstico.
+    Orquesta la lógica para generar un pronóstico a partir del snapshot de datos activo.
     1. Agrega los datos.
-    2. Llama al modelo solicitado.
+    2. Obtiene el modelo entrenado (de la caché si ya existe) y pronostica.
     3. Devuelve los resultados (historia y pronóstico).
+    Con 'deadline_ms', si el modelo no está listo a tiempo se responde con el último
+    pronóstico del segmento o con un baseline (ver _within_deadline).
     """
     
     # 1. Agregamos los datos históricos según los filtros
     # (Esta lógica estaba en el endpoint /sales/forecast 
-    ts_history, data_available = aggregate_sales( 
-        df=df_raw, 
-        category=category, 
-        region=region, 
-        frequency=frequency 
-    )
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency, filters)
     
     if not data_available: 
-        return {"status": "error", "message": f"No data found for {category}/{region}."} 
+        return {"status": "error", "message": _no_data_message(category, region, filters)} 
 
     # 2. Enrutador de modelo
-    if model_type == "sarima": 
-        forecast_df, status = get_sarima_forecast(ts_history, steps, frequency) 
-    elif model_type == "xgboost": 
-        forecast_df, status = get_xgboost_forecast(ts_history, steps, frequency) 
-    else:
-        return {"status": "error", "message": "model_type debe ser 'sarima' o 'xgboost'"} 
+    if model_type not in MODEL_TYPES:
+        return {"status": "error", "message": MODEL_TYPE_ERROR} 
+
+    latest_key = _latest_key("forecast", model_type, category, region, frequency, filters, order, criterion)
+    stored = _stored(model_cache, latest_key, snapshot, steps)
+    if stored is not None:
+        return _stored_forecast(stored, model_type, ts_history, steps)
+
+    def _compute():
+        result = _forecast_segment(
+            snapshot, model_type, category, region, steps, frequency, filters, ts_history, model_cache,
+            order, criterion, order_store
+        )
+        if result["status"] == "success":
+            _remember(model_cache, latest_key, snapshot, forecast_df=result["forecast_df"],
+                      sarima_order=result["sarima_order"], intervals_message=result.get("intervals_message"))
+        return result
+
+    if model_type in BASELINE_MODELS:
+        return _compute()
+    return _within_deadline(_compute, deadline_ms, lambda reason: _fallback_forecast(
+        model_cache, latest_key, model_type, ts_history, steps, frequency, reason
+    ), key=(latest_key, snapshot.version, steps))
+
+def _forecast_segment(snapshot, model_type, category, region, steps, frequency, filters, ts_history,
+                      model_cache=None, order="default", criterion="aic", order_store=None):
+    if model_type == GLOBAL_MODEL:
+        return _process_global_request(
+            snapshot, category, region, steps, frequency, filters, ts_history, model_cache, order
+        )
+
+    label, params, order_info, status = _model_variant(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache,
+        order, criterion, order_store
+    )
+    if label is None:
+        return {"status": "error", "message": status}
+
+    residuals_future = _submit_residuals(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, label, params
+    )
+    model, status, cache_hit = _fit_model(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, label, params
+    )
+    forecast_df = None
+    if model is not None:
+        # Cambiar solo el horizonte no reentrena: se reutiliza el modelo ya ajustado
+        _, forecast = FORECASTERS[model_type]
+        forecast_df, status = forecast(model, ts_history, steps, frequency)
     
     if status != "Success" or forecast_df is None:
         # 'status' aquí contiene el mensaje de error del modelo (ej. "Datos insuficientes...")
         return {"status": "error", "message": status} 
+    forecast_df, intervals_message = _with_conformal_bounds(forecast_df, residuals_future)
     
     # 3. Devolvemos los datos crudos (Series y DataFrame)
     # El router se encargará de formatearlos a JSON
@@ -43,37 +601,625 @@ def process_forecast_request(df_raw, model_type, category, region, steps, freque
         "status": "success",
         "model_used": model_type, 
         "history": ts_history, 
-        "forecast_df": forecast_df 
+        "forecast_df": forecast_df,
+        "intervals_message": intervals_message,
+        "cache_hit": cache_hit,
+        "sarima_order": order_info
     }
 
-def process_evaluation_request(df_raw, model_type, category, region, frequency):
+def process_evaluation_request(snapshot, model_type, category, region, frequency, filters=None,
+                               model_cache=None, folds=None, horizon=None, order="default", criterion="aic",
+                               order_store=None, deadline_ms=None):
     """
-    Orquesta la lógica para generar una evaluación (backtest).
+    Orquesta la lógica para generar una evaluación (backtest) a partir del snapshot activo.
     1. Agrega los datos.
     2. Llama al modelo de backtest solicitado.
     3. Devuelve las métricas.
+    Con 'deadline_ms', si el backtest no termina a tiempo se responden las últimas
+    métricas del segmento o las de un baseline (ver _within_deadline).
     """
     
     # 1. Agregamos los datos históricos
     # (Esta lógica estaba en el endpoint /sales/evaluation 
-    ts_history, data_available = aggregate_sales( 
-        df=df_raw, 
-        category=category, 
-        region=region, 
-        frequency=frequency 
-    )
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency, filters)
     
     if not data_available: 
-        return {"status": "error", "message": f"No data found for {category}/{region}."} 
+        return {"status": "error", "message": _no_data_message(category, region, filters)} 
 
     # 2. Enrutador de modelo
-    if model_type == "sarima": 
-        metrics = run_backtest_sarima(ts_history, frequency) 
-    elif model_type == "xgboost": 
-        metrics = run_backtest_xgboost(ts_history, frequency) 
-    else:
-        return {"status": "error", "message": "model_type debe ser 'sarima' o 'xgboost'"} 
+    if model_type not in MODEL_TYPES:
+        return {"status": "error", "message": MODEL_TYPE_ERROR} 
+
+    latest_key = _latest_key(
+        _evaluation_mode(folds, horizon), model_type, category, region, frequency, filters, order, criterion
+    )
+    stored = _stored(model_cache, latest_key, snapshot)
+    if stored is not None:
+        return dict(stored["metrics"])
+
+    def _compute():
+        metrics = _evaluate_segment(
+            snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, folds, horizon,
+            order, criterion, order_store
+        )
+        if metrics.get("status") == "Success":
+            _remember(model_cache, latest_key, snapshot, metrics=dict(metrics))
+        return metrics
+
+    if model_type in BASELINE_MODELS:
+        return _compute()
+    return _within_deadline(_compute, deadline_ms, lambda reason: _fallback_evaluation(
+        model_cache, latest_key, model_type, ts_history, frequency, folds, horizon, reason
+    ), key=(latest_key, snapshot.version, folds, horizon))
+
+def _evaluate_segment(snapshot, model_type, category, region, frequency, filters, ts_history, model_cache=None,
+                      folds=None, horizon=None, order="default", criterion="aic", order_store=None):
+    if model_type == GLOBAL_MODEL:
+        if order != "default":
+            raise ValueError("order=auto solo aplica a model_type='sarima'")
+        if folds:
+            raise ValueError(f"folds no está disponible para {GLOBAL_MODEL}")
+        panel = _global_panel(snapshot, frequency, filters)
+        return _global_backtest(snapshot, category, region, frequency, panel, model_cache)
+    label, params, order_info, status = _model_variant(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache,
+        order, criterion, order_store
+    )
+    if label is None:
+        return {"status": "Error", "message": status}
+    metrics = _run_backtest(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, folds, horizon,
+        label, params
+    )
+    if order_info is not None:
+        metrics["sarima_order"] = order_info
 
     # 3. Devolvemos el diccionario de métricas
     # El diccionario ya incluye un "status" y "message" en caso de error
-    return metrics 
\ No newline at end of file
+    return metrics
+
+def _evaluation_mode(folds=None, horizon=None):
+    return f"cv{folds}x{horizon or 'auto'}" if folds else "backtest"
+
+def _latest_key(kind, model_type, category, region, frequency, filters=None, order="default", criterion="aic"):
+    # Clave del último resultado de un segmento (sin versión del dataset)
+    variant = model_type if order == "default" else f"{model_type}:{order}:{criterion}"
+    return model_cache_key(f"{variant}:{kind}", category, region, frequency, None, filters)
+
+def _remember(model_cache, key, snapshot, **result):
+    if model_cache is not None:
+        model_cache.put_latest(key, {"version": snapshot.version, **result})
+
+def _stored(model_cache, key, snapshot, steps=None):
+    """
+    Último resultado del segmento si es de esta versión de los datos (y, si es un
+    pronóstico, cubre 'steps' períodos): se sirve sin tocar el modelo. Así se sirven
+    los resultados precalculados (ver backend/services/precompute_service.py).
+    """
+    latest = model_cache.get_latest(key) if model_cache is not None else None
+    if latest is None or latest["version"] != snapshot.version:
+        return None
+    if steps is not None and len(latest["forecast_df"]) < steps:
+        return None
+    return latest
+
+def _stored_forecast(stored, model_type, ts_history, steps):
+    return {
+        "status": "success",
+        "model_used": model_type,
+        "history": ts_history,
+        "forecast_df": stored["forecast_df"].iloc[:steps],
+        "intervals_message": stored.get("intervals_message"),
+        "cache_hit": True,
+        "sarima_order": stored.get("sarima_order")
+    }
+
+def has_stored_results(model_cache, snapshot, model_type, category, region, frequency):
+    """
+    (pronóstico, métricas del backtest): si el segmento ya tiene cada resultado de
+    esta versión de los datos listo para servir (sin filtros y con órdenes por defecto).
+    """
+    return tuple(
+        _stored(model_cache, _latest_key(kind, model_type, category, region, frequency), snapshot) is not None
+        for kind in ("forecast", _evaluation_mode())
+    )
+
+def _within_deadline(compute, deadline_ms, fallback, key):
+    """
+    Corre compute() en _DEADLINE_EXECUTOR y espera hasta 'deadline_ms' (None o 0: sin
+    límite). Si no termina a tiempo devuelve fallback(motivo); compute() sigue en
+    segundo plano y deja el modelo en la caché para la próxima petición. Si ya hay un
+    cálculo en curso con la misma 'key', se espera ese en lugar de lanzar otro; si no
+    queda lugar para uno nuevo, se responde fallback(motivo) sin esperar. Con el pool
+    lleno (ModelPoolBusy) también responde fallback(motivo) en lugar de un 429; sin
+    límite, el error se propaga. Los demás errores se propagan igual que sin límite.
+    """
+    if not deadline_ms:
+        return compute()
+    with _deadline_lock:
+        future = _deadline_running.get(key)
+        started = future is None and len(_deadline_running) < DEADLINE_WORKERS
+        if started:
+            future = _DEADLINE_EXECUTOR.submit(copy_context().run, compute)
+            _deadline_running[key] = future
+    if future is None:
+        return fallback("Hay demasiados modelos entrenándose en segundo plano; reintente en unos segundos")
+    if started:
+        future.add_done_callback(partial(_deadline_done, key))
+    try:
+        return future.result(timeout=deadline_ms / 1000)
+    except ModelPoolBusy as e:
+        return fallback(f"El pool de modelos está lleno; reintente en {e.retry_after} s para el modelo pedido")
+    except FutureTimeout:
+        future.add_done_callback(_report_background_failure)
+        return fallback(f"El modelo no terminó en {deadline_ms} ms; sigue entrenándose en segundo plano")
+
+def _deadline_done(key, future):
+    with _deadline_lock:
+        if _deadline_running.get(key) is future:
+            del _deadline_running[key]
+
+def _report_background_failure(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Aviso: falló el entrenamiento en segundo plano tras el deadline: {error}")
+
+def _fallback_forecast(model_cache, latest_key, model_type, ts_history, steps, frequency, reason):
+    """
+    Pronóstico degradado: el último pronóstico del segmento (aunque sea de una versión
+    anterior de los datos) si cubre los 'steps' períodos siguientes a la historia, o
+    si no, el baseline FALLBACK_MODEL.
+    """
+    degraded = {"degraded": True, "message": reason, "cache_hit": False, "sarima_order": None}
+    latest = model_cache.get_latest(latest_key) if model_cache is not None else None
+    if latest is not None:
+        forecast_df = latest["forecast_df"]
+        forecast_df = forecast_df[forecast_df.index > ts_history.index[-1]]
+        if len(forecast_df) >= steps:
+            return {
+                **degraded,
+                "status": "success",
+                "model_used": model_type,
+                "fallback": {"source": "cache", "dataset_version": latest["version"]},
+                "history": ts_history,
+                "forecast_df": forecast_df.iloc[:steps],
+                "intervals_message": latest.get("intervals_message")
+            }
+
+    fit, forecast = FORECASTERS[FALLBACK_MODEL]
+    model, status = fit(ts_history, frequency)
+    forecast_df = None
+    if model is not None:
+        forecast_df, status = forecast(model, ts_history, steps, frequency)
+    if forecast_df is None:
+        return {"status": "error", "message": f"{reason} y el respaldo {FALLBACK_MODEL} falló: {status}"}
+    return {
+        **degraded,
+        "status": "success",
+        "model_used": FALLBACK_MODEL,
+        "fallback": {"source": FALLBACK_MODEL},
+        "history": ts_history,
+        "forecast_df": forecast_df
+    }
+
+def _fallback_evaluation(model_cache, latest_key, model_type, ts_history, frequency, folds, horizon, reason):
+    """
+    Evaluación degradada: las últimas métricas del segmento (aunque sean de una versión
+    anterior de los datos) o, si no hay, las del baseline FALLBACK_MODEL.
+    """
+    degraded = {"degraded": True, "message": reason}
+    latest = model_cache.get_latest(latest_key) if model_cache is not None else None
+    if latest is not None:
+        return {
+            **latest["metrics"],
+            **degraded,
+            "model_used": model_type,
+            "fallback": {"source": "cache", "dataset_version": latest["version"]}
+        }
+    if folds:
+        metrics = run_rolling_backtest(FALLBACK_MODEL, ts_history, frequency, folds, horizon)
+    else:
+        metrics = BACKTESTS[FALLBACK_MODEL](ts_history, frequency)
+    if metrics.get("status") != "Success":
+        return {"status": "Error", "message": f"{reason} y el respaldo {FALLBACK_MODEL} falló: {metrics.get('message')}"}
+    return {**metrics, **degraded, "model_used": FALLBACK_MODEL, "fallback": {"source": FALLBACK_MODEL}}
+
+def process_forecast_report(snapshot, model_type, category, region, steps, frequency, filters=None,
+                            model_cache=None, folds=None, horizon=None, order="default", criterion="aic",
+                            order_store=None):
+    """
+    Pronóstico y evaluación en una sola petición.
+    1. Agrega los datos una sola vez.
+    2. Corre en paralelo el backtest y el entrenamiento con toda la historia.
+    3. Devuelve historia, pronóstico y métricas.
+    """
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency, filters)
+
+    if not data_available:
+        return {"status": "error", "message": _no_data_message(category, region, filters)}
+
+    if model_type not in MODEL_TYPES:
+        return {"status": "error", "message": MODEL_TYPE_ERROR}
+
+    forecast_key = _latest_key("forecast", model_type, category, region, frequency, filters, order, criterion)
+    metrics_key = _latest_key(
+        _evaluation_mode(folds, horizon), model_type, category, region, frequency, filters, order, criterion
+    )
+    stored_forecast = _stored(model_cache, forecast_key, snapshot, steps)
+    stored_metrics = _stored(model_cache, metrics_key, snapshot)
+    if stored_forecast is not None and stored_metrics is not None:
+        return {
+            **_stored_forecast(stored_forecast, model_type, ts_history, steps),
+            "metrics": dict(stored_metrics["metrics"])
+        }
+
+    result = _forecast_report(
+        snapshot, model_type, category, region, steps, frequency, filters, ts_history, model_cache, folds, horizon,
+        order, criterion, order_store
+    )
+    if result["status"] == "success":
+        _remember(model_cache, forecast_key, snapshot, forecast_df=result["forecast_df"],
+                  sarima_order=result["sarima_order"], intervals_message=result.get("intervals_message"))
+        _remember(model_cache, metrics_key, snapshot, metrics=dict(result["metrics"]))
+    return result
+
+def _forecast_report(snapshot, model_type, category, region, steps, frequency, filters, ts_history,
+                     model_cache=None, folds=None, horizon=None, order="default", criterion="aic", order_store=None):
+    if model_type == GLOBAL_MODEL:
+        return _process_global_request(
+            snapshot, category, region, steps, frequency, filters, ts_history, model_cache, order, folds,
+            with_metrics=True
+        )
+
+    # Con order=auto ambos usan el orden elegido sobre toda la historia
+    label, params, order_info, status = _model_variant(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache,
+        order, criterion, order_store
+    )
+    if label is None:
+        return {"status": "error", "message": status}
+
+    # 2. El backtest entrena con la historia recortada: es independiente del modelo completo
+    metrics_future = _REPORT_EXECUTOR.submit(
+        copy_context().run, _run_backtest, snapshot, model_type, category, region, frequency, filters, ts_history, model_cache,
+        folds, horizon, label, params
+    )
+    # Con folds las métricas vienen del backtest móvil; los intervalos, del backtest simple
+    residuals_future = _submit_residuals(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, label, params
+    )
+    model, status, cache_hit = _fit_model(
+        snapshot, model_type, category, region, frequency, filters, ts_history, model_cache, label, params
+    )
+    metrics = metrics_future.result()
+
+    # Mismo orden de errores que el cliente anterior (evaluación primero, luego pronóstico)
+    if metrics.get("status") != "Success":
+        return {"status": "error", "message": metrics.get("message", "Error desconocido en evaluación")}
+
+    forecast_df = None
+    if model is not None:
+        _, forecast = FORECASTERS[model_type]
+        forecast_df, status = forecast(model, ts_history, steps, frequency)
+
+    if status != "Success" or forecast_df is None:
+        return {"status": "error", "message": status}
+    forecast_df, intervals_message = _with_conformal_bounds(forecast_df, residuals_future)
+
+    return {
+        "status": "success",
+        "model_used": model_type,
+        "history": ts_history,
+        "forecast_df": forecast_df,
+        "intervals_message": intervals_message,
+        "metrics": metrics,
+        "cache_hit": cache_hit,
+        "sarima_order": order_info
+    }
+
+def resolve_batch_segments(snapshot, segments):
+    """
+    Lista de pares (categoría, región) del lote. "all" equivale a todas las
+    combinaciones que publica /config/filters (incluidos los totales "All ...").
+    """
+    if segments == "all":
+        return [(category, region) for category in snapshot.categories for region in snapshot.regions]
+    return [(category, region) for category, region in segments]
+
+def iter_forecast_batch(snapshot, model_type, segments, steps, frequency, model_cache=None, pool=None):
+    """
+    Pronostica varios segmentos y entrega cada resultado en cuanto está listo
+    (generador, en orden de finalización).
+    - Los segmentos cuyo modelo ya está en la caché se resuelven de inmediato.
+    - Los que están en el registro en disco se cargan (sin entrenar), los SARIMA con
+      un modelo de datos anteriores se actualizan y el resto se entrena, en paralelo en 'pool' (por defecto, el pool de procesos de
+      backend/services/model_executor.py). Se envían tantos como admite la cola
+      del pool y el resto a medida que terminan, así un lote grande no deja sin
+      lugar a las peticiones individuales.
+    Cada resultado tiene la misma forma que process_forecast_request(), más
+    "category" y "region". Un fallo de un segmento (o de lo que comparten todos,
+    como el panel del modelo global) es un resultado con status "error": el
+    generador no lanza excepciones a mitad del lote.
+    """
+    if model_type not in MODEL_TYPES:
+        raise ValueError(MODEL_TYPE_ERROR)
+    if model_type == GLOBAL_MODEL:
+        yield from _iter_global_batch(snapshot, segments, steps, frequency, model_cache, pool)
+        return
+    if model_type in BASELINE_MODELS:
+        yield from _iter_baseline_batch(snapshot, model_type, segments, steps, frequency)
+        return
+    if pool is not None:
+        submit = lambda fn, *args, wait=False: pool.submit(fn, *args)
+    else:
+        submit = submit_model_task
+
+    queued = deque()
+    for category, region in resolve_batch_segments(snapshot, segments):
+        segment = {"category": category, "region": region}
+        try:
+            result = _prepare_batch_segment(
+                snapshot, model_type, segment, steps, frequency, model_cache, queued
+            )
+        except Exception as e:
+            result = _segment_error(segment, e)
+        if result is not None:
+            yield result
+
+    pending = {}
+    try:
+        while queued or pending:
+            # Llenamos la cola del pool; si no tenemos nada en curso, esperamos un lugar
+            failed = []
+            while queued:
+                item = queued[0]
+                try:
+                    future = submit(*item[-1], wait=not pending)
+                except ModelPoolBusy:
+                    break
+                except Exception as e:
+                    queued.popleft()
+                    failed.append(_segment_error(item[0], f"Error en el proceso de entrenamiento: {e}"))
+                    continue
+                queued.popleft()
+                pending[future] = (item, time.perf_counter())
+            yield from failed
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                (segment, key, registry_key, ts_history, task), started = pending.pop(future)
+                try:
+                    model, forecast_df, status, *lineage = future.result()
+                except Exception as e:
+                    yield {**segment, "status": "error", "message": f"Error en el proceso de entrenamiento: {e}"}
+                    continue
+                loaded = task[0] is load_forecast_task
+                if model is None and task[0] is not fit_forecast_task:
+                    # Artefacto ilegible o actualización fallida: se entrena como si no existiera
+                    queued.append((segment, key, registry_key, ts_history,
+                                   (fit_forecast_task, model_type, ts_history, steps, frequency)))
+                    continue
+                try:
+                    if model is not None and model_cache is not None:
+                        model_cache.put(key, model)
+                        if not loaded and registry_key is not None:
+                            model_cache.registry.save(
+                                model_type, registry_key, model, train_seconds=round(time.perf_counter() - started, 3),
+                                lineage=lineage[0] if lineage else None
+                            )
+                        forecast_df = _cached_bounds(
+                            forecast_df, snapshot, model_type, segment["category"], segment["region"], frequency,
+                            model_cache
+                        )
+                    result = _batch_result(segment, model_type, ts_history, forecast_df, status, cache_hit=loaded)
+                except Exception as e:
+                    result = _segment_error(segment, e)
+                yield result
+    finally:
+        # Si el cliente corta la conexión, no seguimos entrenando lo que falta
+        for future in pending:
+            future.cancel()
+
+def _prepare_batch_segment(snapshot, model_type, segment, steps, frequency, model_cache, queued):
+    """
+    Resuelve un segmento del lote sin el pool (sin datos o modelo en la caché) y
+    devuelve su resultado, o agrega a 'queued' la tarea que lo carga, actualiza o
+    entrena y devuelve None.
+    """
+    category, region = segment["category"], segment["region"]
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency)
+    if not data_available:
+        return {**segment, "status": "error", "message": _no_data_message(category, region)}
+
+    key = model_cache_key(model_type, category, region, frequency, snapshot.version)
+    model = model_cache.get(key) if model_cache is not None else None
+    if model is not None:
+        forecast_df, status = FORECASTERS[model_type][1](model, ts_history, steps, frequency)
+        forecast_df = _cached_bounds(forecast_df, snapshot, model_type, category, region, frequency, model_cache)
+        return _batch_result(segment, model_type, ts_history, forecast_df, status, cache_hit=True)
+    registry_key = _registry_key(model_cache, snapshot, model_type, category, region, frequency)
+    found = previous = None
+    if registry_key is not None:
+        found = model_cache.registry.find(model_type, registry_key)
+        if found is None and model_type == "sarima":
+            previous = model_cache.registry.find_previous(model_type, registry_key)
+    if found is not None:
+        task = (load_forecast_task, model_type, *found, ts_history, steps, frequency)
+    elif previous is not None:
+        task = (update_forecast_task, *previous, ts_history, steps, frequency)
+    else:
+        task = (fit_forecast_task, model_type, ts_history, steps, frequency)
+    queued.append((segment, key, registry_key, ts_history, task))
+    return None
+
+def _segment_error(segment, error):
+    # Un fallo de un segmento es una línea de error del lote, no corta la respuesta
+    return {**segment, "status": "error", "message": str(error)}
+
+def _batch_errors(snapshot, segments, error):
+    """
+    Una línea de error por segmento cuando falla lo que comparten todos (p. ej. el
+    panel del modelo global con una frecuencia no soportada).
+    """
+    for category, region in resolve_batch_segments(snapshot, segments):
+        yield _segment_error({"category": category, "region": region}, error)
+
+def _iter_global_batch(snapshot, segments, steps, frequency, model_cache=None, pool=None):
+    """
+    Lote con el modelo global: un solo entrenamiento (o ninguno, si ya está en la
+    caché) y una llamada a predict por segmento.
+    """
+    try:
+        panel = _global_panel(snapshot, frequency)
+        if pool is not None:
+            model, status = pool.submit(global_fit_task, panel).result()
+            cache_hit = False
+        else:
+            model, status, cache_hit = _global_model(snapshot, frequency, panel, model_cache, wait=True)
+
+        # Backtest global ya calculado (p. ej. por pretrain_global_model): da los intervalos
+        backtest = None
+        if model_cache is not None:
+            backtest = model_cache.get(
+                model_cache_key(f"{GLOBAL_MODEL}:backtest", None, None, frequency, snapshot.version)
+            )
+    except Exception as e:
+        yield from _batch_errors(snapshot, segments, e)
+        return
+
+    for category, region in resolve_batch_segments(snapshot, segments):
+        segment = {"category": category, "region": region}
+        try:
+            ts_history, data_available = _aggregate_history(snapshot, category, region, frequency)
+            if not data_available:
+                result = {**segment, "status": "error", "message": _no_data_message(category, region)}
+            else:
+                forecast_df, segment_status = None, status
+                if model is not None:
+                    forecast_df, segment_status = forecast_global_xgboost(model, panel, category, region, steps)
+                if forecast_df is not None and backtest is not None:
+                    forecast_df = add_conformal_bounds(
+                        forecast_df, segment_residuals(backtest, panel, category, region)
+                    )
+                result = _batch_result(segment, GLOBAL_MODEL, ts_history, forecast_df, segment_status, cache_hit)
+        except Exception as e:
+            result = _segment_error(segment, e)
+        yield result
+
+def _iter_baseline_batch(snapshot, model_type, segments, steps, frequency):
+    """
+    Lote con un baseline: todas las series del panel Categoría × Región del cubo se
+    ajustan y pronostican juntas (una operación de NumPy por paso de tiempo, no una
+    por segmento). Las frecuencias que no están en el cubo van serie por serie.
+    """
+    settings = get_frequency_settings(frequency)
+    try:
+        table = snapshot.cube.panel(frequency)
+        if table is not None:
+            _, values, first, last = table
+            n_periods = values.shape[2]
+            n_regions = len(snapshot.cube.regions)
+            state = fit_baselines(
+                right_align(values.reshape(-1, n_periods), first.ravel(), last.ravel()),
+                model_type, settings["seasonal_period"]
+            )
+            mean, lower, upper = forecast_baselines(state, steps)
+            rows = {
+                (category, region): c * n_regions + r
+                for c, category in enumerate(snapshot.cube.categories)
+                for r, region in enumerate(snapshot.cube.regions)
+            }
+    except Exception as e:
+        yield from _batch_errors(snapshot, segments, e)
+        return
+
+    for category, region in resolve_batch_segments(snapshot, segments):
+        segment = {"category": category, "region": region}
+        try:
+            result = _baseline_batch_segment(
+                snapshot, model_type, segment, steps, frequency, settings,
+                (mean, lower, upper, rows) if table is not None else None
+            )
+        except Exception as e:
+            result = _segment_error(segment, e)
+        yield result
+
+def _baseline_batch_segment(snapshot, model_type, segment, steps, frequency, settings, panel_forecast=None):
+    category, region = segment["category"], segment["region"]
+    ts_history, data_available = _aggregate_history(snapshot, category, region, frequency)
+    if not data_available:
+        return {**segment, "status": "error", "message": _no_data_message(category, region)}
+    row = panel_forecast[3].get((category, region)) if panel_forecast is not None else None
+    if row is None or len(ts_history) < settings["min_periods"]:
+        # Serie por serie (también da el mensaje de historia insuficiente)
+        model, status = FORECASTERS[model_type][0](ts_history, frequency)
+        forecast_df = None
+        if model is not None:
+            forecast_df, status = forecast_baseline(model, ts_history, steps, frequency)
+    else:
+        mean, lower, upper, _ = panel_forecast
+        forecast_df = forecast_frame(mean[row], lower[row], upper[row], ts_history.index[-1], frequency)
+        status = "Success"
+    return _batch_result(segment, model_type, ts_history, forecast_df, status, cache_hit=False)
+
+def forecast_to_json(result):
+    """
+    Convierte la historia (Series) y el pronóstico (DataFrame) de un resultado a JSON
+    (NaN -> None, p. ej. los intervalos de XGBoost).
+    """
+    history_ts = result["history"]
+    forecast_df = result["forecast_df"].copy()
+    
+    history_json = {
+        "index": [i.strftime("%Y-%m-%d") for i in history_ts.index],
+        "data": history_ts.values.tolist()
+    }
+    forecast_df['Date'] = forecast_df.index.strftime('%Y-%m-%d')
+    forecast_json = [
+        {k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in row.items()}
+        for row in forecast_df.reset_index(drop=True).to_dict(orient='records')
+    ]
+    return history_json, forecast_json
+
+def batch_result_to_json(result):
+    """
+    Resultado de un segmento del lote listo para serializar (una línea NDJSON o un job).
+    """
+    if result["status"] != "success":
+        return result
+    history_json, forecast_json = forecast_to_json(result)
+    return {
+        "category": result["category"],
+        "region": result["region"],
+        "status": "success",
+        "model_used": result["model_used"],
+        "cache_hit": result["cache_hit"],
+        "history": history_json,
+        "forecast": forecast_json
+    }
+
+def _cached_bounds(forecast_df, snapshot, model_type, category, region, frequency, model_cache=None):
+    """
+    Intervalos conformales en el lote, solo si el backtest del segmento ya está en la
+    caché: el lote no entrena modelos extra para calibrarlos.
+    """
+    if forecast_df is None or model_cache is None or model_type not in CONFORMAL_MODELS:
+        return forecast_df
+    metrics = model_cache.get(model_cache_key(f"{model_type}:backtest", category, region, frequency, snapshot.version))
+    if metrics is None:
+        return forecast_df
+    return add_conformal_bounds(forecast_df, metrics.get("residuals", ()))
+
+def _batch_result(segment, model_type, ts_history, forecast_df, status, cache_hit):
+    if status != "Success" or forecast_df is None:
+        return {**segment, "status": "error", "message": status}
+    return {
+        **segment,
+        "status": "success",
+        "model_used": model_type,
+        "history": ts_history,
+        "forecast_df": forecast_df,
+        "cache_hit": cache_hit
+    }
@@ -0,0 +1,150 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backend.data_processing import pandas_frequency
+from backend.models.reconciliation import (
+    RECONCILIATION_METHODS, base_rows, coherence_error, reconcile, reconciliation_matrix, summing_matrix
+)
+from backend.services.forecast_service import MODEL_TYPE_ERROR, MODEL_TYPES, backtest_residuals, iter_forecast_batch
+from backend.services.model_executor import ModelPoolBusy
+
+# Backtests simultáneos para los errores de MinT (cada uno ocupa un lugar del pool)
+RESIDUAL_WORKERS = 4
+
+
+def _level(category_index, region_index):
+    if category_index == 0 and region_index == 0:
+        return "total"
+    if region_index == 0:
+        return "category"
+    if category_index == 0:
+        return "region"
+    return "category_region"
+
+
+def _base_forecasts(snapshot, model_type, segments, steps, frequency, dates, gap, model_cache=None):
+    """
+    Pronósticos de base [serie, h] de todas las celdas del cubo en una sola pasada por
+    lotes (un entrenamiento por celda en paralelo o, con xgboost_global y los
+    baselines, uno para todo el panel). Las celdas cuya historia termina antes que el
+    panel pronostican 'gap' períodos de más y se alinean por fecha.
+    Retorna (pronósticos, errores por segmento).
+    """
+    rows = {segment: i for i, segment in enumerate(segments)}
+    base = np.full((len(segments), steps), np.nan)
+    errors = {}
+    for result in iter_forecast_batch(snapshot, model_type, segments, steps + gap, frequency, model_cache):
+        segment = (result["category"], result["region"])
+        if result["status"] != "success":
+            errors[segment] = result["message"]
+            continue
+        base[rows[segment]] = result["forecast_df"]["Sales Forecast"].reindex(dates).to_numpy()
+    return base, errors
+
+
+def _segment_residuals(snapshot, model_type, segment, frequency, model_cache=None):
+    # Como los lotes, espera lugar en el pool en vez de rechazar la petición
+    while True:
+        try:
+            return backtest_residuals(snapshot, model_type, *segment, frequency, model_cache)
+        except ModelPoolBusy as e:
+            time.sleep(e.retry_after)
+
+
+def _residual_matrix(snapshot, model_type, segments, frequency, model_cache=None):
+    """
+    Errores del backtest de cada celda [serie, período], alineados al final del período
+    de prueba (NaN donde una serie tiene menos).
+    """
+    with ThreadPoolExecutor(max_workers=RESIDUAL_WORKERS, thread_name_prefix="hierarchy") as executor:
+        residuals = list(executor.map(
+            lambda segment: _segment_residuals(snapshot, model_type, segment, frequency, model_cache), segments
+        ))
+    n_periods = max((len(r) for r in residuals), default=0)
+    matrix = np.full((len(segments), n_periods), np.nan)
+    for i, r in enumerate(residuals):
+        if len(r):
+            matrix[i, n_periods - len(r):] = r
+    return matrix
+
+
+def process_hierarchy_request(snapshot, model_type, steps, frequency, method="mint", model_cache=None):
+    """
+    Pronóstico coherente de toda la jerarquía Total / Categoría / Región /
+    Categoría × Región en una sola petición:
+    1. Pronósticos de base de todas las celdas del cubo en una pasada por lotes.
+    2. Reconciliación con la matriz de agregación S: y = S @ G @ y_base (ver
+       backend/models/reconciliation.py), así los totales suman exactamente.
+    3. Devuelve, por serie, el pronóstico de base y el reconciliado.
+    """
+    if model_type not in MODEL_TYPES:
+        return {"status": "error", "message": MODEL_TYPE_ERROR}
+    if method not in RECONCILIATION_METHODS:
+        return {"status": "error", "message": f"method debe ser uno de: {', '.join(RECONCILIATION_METHODS)}"}
+    table = snapshot.cube.panel(frequency)
+    if table is None:
+        return {"status": "error", "message": f"Frecuencia no soportada por la jerarquía: {frequency}"}
+
+    index, values, first, last = table
+    categories, regions = snapshot.cube.categories, snapshot.cube.regions
+    n_categories, n_regions = len(categories), len(regions)
+    segments = [(category, region) for category in categories for region in regions]
+    S = summing_matrix(n_categories, n_regions)
+    rows = base_rows(n_categories, n_regions)
+
+    # Todas las series se pronostican desde el último período del panel
+    dates = pd.date_range(start=index[-1], periods=steps + 1, freq=pandas_frequency(frequency))[1:]
+    gap = int((len(index) - 1 - last[last >= 0]).max(initial=0))
+
+    base, errors = _base_forecasts(snapshot, model_type, segments, steps, frequency, dates, gap, model_cache)
+    needed = rows if method == "bottom_up" else [0] if method == "top_down" else range(len(segments))
+    missing = [segments[i] for i in needed if np.isnan(base[i]).any()]
+    if missing:
+        details = "; ".join(f"{c}/{r}: {errors.get((c, r), 'pronóstico incompleto')}" for c, r in missing[:3])
+        return {"status": "error", "message": f"Sin pronóstico de base para {len(missing)} series ({details})."}
+
+    proportions = residuals = None
+    if method == "top_down":
+        # Proporciones históricas: ventas de cada celda de base sobre el total
+        totals = values.reshape(n_categories * n_regions, -1).sum(axis=1)
+        proportions = totals[rows] / totals[0] if totals[0] > 0 else np.full(len(rows), 1 / len(rows))
+    elif method == "mint":
+        residuals = _residual_matrix(snapshot, model_type, segments, frequency, model_cache)
+        if residuals.shape[1] < 2:
+            return {"status": "error", "message": "MinT necesita los errores del backtest de cada serie (la historia es muy corta); use 'wls' u 'ols'."}
+
+    G, info = reconciliation_matrix(S, method, rows, proportions, residuals)
+    if method == "mint":
+        # Series sin errores del backtest (p. ej. historia corta): MinT usa su varianza estructural
+        info["missing_residuals"] = [
+            {"category": segments[i][0], "region": segments[i][1]}
+            for i in np.flatnonzero(~np.isfinite(residuals).any(axis=1))
+        ]
+    # Las series que el método no usa (p. ej. las de base en top_down) pueden faltar
+    reconciled = reconcile(np.nan_to_num(base), S, G)
+
+    return {
+        "status": "success",
+        "model_used": model_type,
+        "method": method,
+        "frequency": frequency,
+        "dates": [date.strftime("%Y-%m-%d") for date in dates],
+        "reconciliation": info,
+        "coherence": {
+            "base_max_error": coherence_error(base, S, rows) if not np.isnan(base).any() else None,
+            "reconciled_max_error": coherence_error(reconciled, S, rows)
+        },
+        "series": [
+            {
+                "category": category,
+                "region": region,
+                "level": _level(i // n_regions, i % n_regions),
+                "base_forecast": [None if np.isnan(v) else float(v) for v in base[i]],
+                "forecast": reconciled[i].tolist()
+            }
+            for i, (category, region) in enumerate(segments)
+        ]
+    }
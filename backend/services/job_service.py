@@ -0,0 +1,141 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.forecast_service import batch_result_to_json, iter_forecast_batch, resolve_batch_segments
+from backend.services.job_store import DONE, ERROR, PENDING, RUNNING, JobStore
+
+# Segundos que un job espera a que termine la carga inicial del dataset
+DATA_WAIT_SECONDS = 300
+
+
+def job_dedup_key(kind, params, data_version):
+    """
+    Dos jobs son idénticos si piden lo mismo sobre la misma versión del dataset.
+    """
+    canonical = json.dumps({"kind": kind, "params": params, "version": data_version}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class JobManager:
+    """
+    Ejecuta jobs de pronóstico en segundo plano. El estado vive en un JobStore (SQLite);
+    al iniciar se retoman los jobs que quedaron pendientes o a medias.
+    Los entrenamientos van al pool de procesos de modelos, como los lotes de
+    /sales/forecast/batch; estos hilos solo coordinan y guardan el progreso.
+    """
+
+    def __init__(self, store_path, dataset, model_cache=None, workers=2):
+        self.store_path = store_path
+        # La base SQLite se abre en start(), no al importar la configuración
+        self.store = None
+        self.dataset = dataset
+        self.model_cache = model_cache
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """
+        Crea los hilos de trabajo y vuelve a encolar los jobs sin terminar.
+        """
+        with self._lock:
+            if self.store is None:
+                self.store = JobStore(self.store_path)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jobs")
+        recovered = self.store.unfinished()
+        for job in recovered:
+            self._enqueue(job["id"])
+        return len(recovered)
+
+    def shutdown(self):
+        """
+        Detiene los hilos. Los jobs interrumpidos vuelven a 'pending' y se retoman
+        en el próximo inicio.
+        """
+        self._stopping.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit_forecast(self, params):
+        """
+        Registra un job de pronóstico (mismos parámetros que /sales/forecast/batch).
+        Si ya hay uno idéntico pendiente o en curso, devuelve ese. Retorna (job, creado).
+        """
+        if self.store is None:
+            raise RuntimeError("El gestor de jobs no está iniciado.")
+        snapshot = self.dataset.snapshot
+        version = snapshot.version if snapshot is not None else None
+        job, created = self.store.create_or_get(
+            "forecast", params, job_dedup_key("forecast", params, version)
+        )
+        if created:
+            self._enqueue(job["id"])
+        return job, created
+
+    def get(self, job_id, with_result=False):
+        if self.store is None:
+            return None
+        return self.store.get(job_id, with_result)
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if self._executor is None or job_id in self._queued:
+                return
+            self._queued.add(job_id)
+            self._executor.submit(self._run, job_id)
+
+    def _wait_for_data(self):
+        # Los jobs retomados al iniciar pueden correr antes de que termine la carga inicial
+        deadline = time.time() + DATA_WAIT_SECONDS
+        while self.dataset.snapshot is None:
+            if not self.dataset.loading or time.time() > deadline:
+                return None
+            time.sleep(0.5)
+        return self.dataset.snapshot
+
+    def _run(self, job_id):
+        try:
+            job = self.store.get(job_id)
+            if job is None or job["status"] not in (PENDING, RUNNING):
+                return
+
+            snapshot = self._wait_for_data()
+            if snapshot is None:
+                self.store.update(job_id, status=ERROR, error=f"Datos no cargados. Razón: {self.dataset.status}")
+                return
+
+            params = job["params"]
+            segments = params["segments"]
+            if segments != "all":
+                segments = [(s["category"], s["region"]) for s in segments]
+            total = len(resolve_batch_segments(snapshot, segments))
+            self.store.update(job_id, status=RUNNING, completed=0, total=total, data_version=snapshot.version)
+
+            results = []
+            for result in iter_forecast_batch(
+                snapshot, params["model_type"], segments, params["steps"], params["frequency"],
+                model_cache=self.model_cache
+            ):
+                if self._stopping.is_set():
+                    self.store.update(job_id, status=PENDING, completed=0)
+                    return
+                results.append(batch_result_to_json(result))
+                self.store.update(job_id, completed=len(results))
+
+            self.store.update(job_id, status=DONE, completed=len(results), result=results)
+        except Exception as e:
+            if self._stopping.is_set():
+                self.store.update(job_id, status=PENDING, completed=0)
+            else:
+                self.store.update(job_id, status=ERROR, error=f"Error al ejecutar el job: {e}")
+        finally:
+            with self._lock:
+                self._queued.discard(job_id)
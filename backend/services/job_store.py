@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Estados de un job
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+UNFINISHED = (PENDING, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    data_version INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+
+class JobStore:
+    """
+    Estado de los jobs en SQLite, para que sobreviva a un reinicio del servidor.
+    Cada operación abre su propia conexión (sqlite3 no comparte conexiones entre hilos).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit al salir (o rollback si hubo error)
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row, with_result=False):
+        if row is None:
+            return None
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "params": json.loads(row["params"]),
+            "status": row["status"],
+            "completed": row["completed"],
+            "total": row["total"],
+            "progress": row["completed"] / row["total"] if row["total"] else 0.0,
+            "data_version": row["data_version"],
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+        if with_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def create_or_get(self, kind, params, dedup_key):
+        """
+        Crea un job pendiente, o devuelve el job sin terminar con la misma 'dedup_key'.
+        Retorna (job, creado).
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            # Transacción de escritura desde la consulta: otro proceso del servidor
+            # no puede insertar el mismo job entre el SELECT y el INSERT
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE dedup_key = ? AND status IN ({','.join('?' * len(UNFINISHED))}) "
+                "ORDER BY created_at LIMIT 1",
+                (dedup_key, *UNFINISHED)
+            ).fetchone()
+            if row is not None:
+                return self._to_dict(row), False
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, dedup_key, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), dedup_key, PENDING, now, now)
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_dict(row), True
+
+    def get(self, job_id, with_result=False):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, with_result)
+
+    def update(self, job_id, **fields):
+        """
+        Actualiza columnas del job ('result' se guarda como JSON).
+        """
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def unfinished(self):
+        """
+        Jobs pendientes o que estaban corriendo, en orden de creación.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({','.join('?' * len(UNFINISHED))}) ORDER BY created_at",
+                UNFINISHED
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
@@ -18,25 +18,26 @@ def calculate_global_kpis(df):
     avg_ticket = total_sales / max(1, total_orders)
 
     # --- KPIs logísticos ---
-    df['Shipping_Time'] = (df['Ship_Date'] - df['Order_Date']).dt.days
-    avg_shipping_time = df['Shipping_Time'].mean()
-    pct_late_shipments = (df['Shipping_Time'] > 7).mean() * 100
+    # Serie local: el DataFrame es compartido entre peticiones y no se modifica
+    shipping_time = (df['Ship_Date'] - df['Order_Date']).dt.days
+    avg_shipping_time = shipping_time.mean()
+    pct_late_shipments = (shipping_time > 7).mean() * 100
 
     # --- KPIs geográficos ---
-    profit_by_state = df.groupby('State')['Profit'].sum().to_dict()
-    sales_by_region = df.groupby('Region')['Sales'].sum().to_dict()
+    profit_by_state = df.groupby('State', observed=True)['Profit'].sum().to_dict()
+    sales_by_region = df.groupby('Region', observed=True)['Sales'].sum().to_dict()
     top_region = max(sales_by_region, key=sales_by_region.get) if sales_by_region else "N/A"
     bottom_region = min(sales_by_region, key=sales_by_region.get) if sales_by_region else "N/A"
 
     # --- KPIs de producto ---
-    product_profit = df.groupby('Product_Name')['Profit'].sum().sort_values(ascending=False)
+    product_profit = df.groupby('Product_Name', observed=True)['Profit'].sum().sort_values(ascending=False)
     top_10_products_profit = product_profit.head(10).to_dict()
     bottom_10_products_profit = product_profit.tail(10).sort_values(ascending=True).to_dict()
 
     # --- KPIs por categoría/segmento/subcategoría ---
-    sales_by_category = df.groupby('Category')['Sales'].sum().sort_values(ascending=False).to_dict()
-    sales_by_segment = df.groupby('Segment')['Sales'].sum().sort_values(ascending=False).to_dict()
-    profit_by_subcategory = df.groupby('Sub_Category')['Profit'].sum().sort_values(ascending=False).to_dict()
+    sales_by_category = df.groupby('Category', observed=True)['Sales'].sum().sort_values(ascending=False).to_dict()
+    sales_by_segment = df.groupby('Segment', observed=True)['Sales'].sum().sort_values(ascending=False).to_dict()
+    profit_by_subcategory = df.groupby('Sub_Category', observed=True)['Profit'].sum().sort_values(ascending=False).to_dict()
 
     return {
         # Financieros
@@ -70,7 +71,7 @@ def get_regional_analysis(df):
     if df is None or df.empty:
         return {"top_region": "N/A", "top_sales": 0, "sales_by_region": {}}
     
-    regional_sales = df.groupby('Region')['Sales'].sum().sort_values(ascending=False)
+    regional_sales = df.groupby('Region', observed=True)['Sales'].sum().sort_values(ascending=False)
     
     if regional_sales.empty:
         return {"top_region": "N/A", "top_sales": 0, "sales_by_region": {}}
@@ -83,4 +84,21 @@ def get_regional_analysis(df):
         "top_region": top_region,
         "top_sales": top_sales,
         "sales_by_region": sales_by_region_dict
-    }
\ No newline at end of file
+    }
+
+def get_kpi_report(aggregates):
+    """
+    Calcula KPIs globales y análisis regional desde los agregados incrementales
+    del snapshot (sin recorrer las filas).
+    """
+    kpis = aggregates.to_kpis()
+    sales_by_region = pd.Series(kpis.get("sales_by_region", {}), dtype='float64')
+    if sales_by_region.empty:
+        return kpis, {"top_region": "N/A", "top_sales": 0, "sales_by_region": {}}
+
+    regional_sales = sales_by_region.sort_values(ascending=False)
+    return kpis, {
+        "top_region": regional_sales.idxmax(),
+        "top_sales": regional_sales.max(),
+        "sales_by_region": regional_sales.to_dict()
+    }
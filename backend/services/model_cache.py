@@ -0,0 +1,195 @@
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+# Tamaño medido por forma de modelo SARIMA (ver estimate_size)
+_SARIMA_SIZES = {}
+_SARIMA_SIZES_LOCK = threading.Lock()
+
+
+def _sarima_shape(value):
+    # Órdenes y observaciones: determinan los arreglos del filtro de Kalman, que son
+    # casi toda la memoria de un SARIMAXResults
+    model = getattr(value, "model", None)
+    if model is None or not hasattr(model, "seasonal_order") or not hasattr(model, "order"):
+        return None
+    return type(value).__name__, tuple(model.order), tuple(model.seasonal_order), int(value.nobs)
+
+
+def _pickled_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def estimate_size(value):
+    """
+    Tamaño aproximado en bytes de un modelo entrenado (serializado con pickle).
+    Serializar un SARIMA semanal cuesta decenas de ms y los de la misma forma
+    (órdenes y largo de la serie) pesan lo mismo: se mide uno por forma y se reutiliza.
+    Los modelos que vienen del registro en disco traen el tamaño del artefacto (ver put()).
+    Si el objeto no se puede serializar se usa sys.getsizeof como cota inferior.
+    """
+    shape = _sarima_shape(value)
+    if shape is None:
+        return _pickled_size(value)
+    with _SARIMA_SIZES_LOCK:
+        size = _SARIMA_SIZES.get(shape)
+    if size is None:
+        size = _pickled_size(value)
+        with _SARIMA_SIZES_LOCK:
+            _SARIMA_SIZES[shape] = size
+    return size
+
+
+def model_cache_key(model_type, category, region, frequency, version, filters=None):
+    """
+    Clave de un modelo entrenado. Los filtros adicionales cambian la serie, así que
+    forman parte de la clave (normalizados para que el orden de los valores no importe).
+    """
+    normalized = tuple(sorted(
+        (dim, tuple(sorted(values))) for dim, values in (filters or {}).items() if values
+    ))
+    return (model_type, category, region, frequency, version, normalized)
+
+
+class ModelCache:
+    """
+    Caché LRU en memoria de modelos entrenados (SARIMAXResults, XGBRegressor...).
+    Se desalojan los menos usados cuando se supera 'max_bytes' o, si es mayor que 0,
+    'max_entries'.
+    Las claves incluyen la versión del dataset: al publicarse una versión nueva
+    las entradas anteriores dejan de consultarse y purge_versions() las libera.
+    'registry' (opcional) es el segundo nivel en disco: ver backend/services/model_registry.py.
+    Aparte guarda el último resultado de cada segmento sin importar la versión (hasta
+    'max_latest'): es el respaldo de las peticiones con deadline_ms.
+    """
+
+    def __init__(self, max_entries=0, max_bytes=256 * 1024 * 1024, registry=None, max_latest=256):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.registry = registry
+        self.max_latest = max_latest
+        self._entries = OrderedDict()  # clave -> (modelo, bytes)
+        self._latest = OrderedDict()  # clave sin versión -> último resultado
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Un lock por clave en entrenamiento: peticiones simultáneas del mismo
+        # segmento esperan al primer entrenamiento en lugar de repetirlo. Cada lock
+        # lleva la cuenta de los hilos que lo usan y se borra cuando llega a 0:
+        # así nadie crea un lock nuevo (y entrena otra vez) mientras otros esperan
+        self._fit_locks = {}  # clave -> [lock, hilos que lo usan]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Nunca cabría: no desalojamos todo lo demás por un solo modelo
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def get_or_fit(self, key, fit):
+        """
+        Devuelve (modelo, "Success", hit) desde la caché, o llama a fit() -> (modelo, status)
+        y guarda el resultado si el entrenamiento fue exitoso. Los errores no se guardan.
+        fit() puede devolver también el tamaño en bytes (modelo, status, bytes) si ya lo
+        conoce, p. ej. el del artefacto del registro; si no, se estima.
+        """
+        model = self.get(key)
+        if model is not None:
+            return model, "Success", True
+
+        with self._lock:
+            fit_lock = self._fit_locks.setdefault(key, [threading.Lock(), 0])
+            fit_lock[1] += 1
+        try:
+            with fit_lock[0]:
+                # Otro hilo pudo terminar el entrenamiento mientras esperábamos
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        return entry[0], "Success", True
+
+                model, status, *size = fit()
+                if model is not None:
+                    self.put(key, model, size[0] if size else None)
+                return model, status, False
+        finally:
+            with self._lock:
+                fit_lock[1] -= 1
+                if not fit_lock[1]:
+                    del self._fit_locks[key]
+
+    def put_latest(self, key, value):
+        """
+        Guarda el último resultado (pronóstico, métricas) de un segmento. 'key' no
+        incluye la versión del dataset: sobrevive a purge_versions().
+        """
+        with self._lock:
+            self._latest[key] = value
+            self._latest.move_to_end(key)
+            while len(self._latest) > self.max_latest:
+                self._latest.popitem(last=False)
+
+    def get_latest(self, key):
+        with self._lock:
+            return self._latest.get(key)
+
+    def _evict(self):
+        while self._entries and (
+            0 < self.max_entries < len(self._entries) or self._bytes > self.max_bytes
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def purge_versions(self, keep_version):
+        """
+        Elimina las entradas de versiones del dataset distintas de 'keep_version'.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[4] != keep_version]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "latest_results": len(self._latest),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
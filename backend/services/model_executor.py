@@ -0,0 +1,344 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Procesos para entrenar modelos fuera del proceso del API (por defecto, uno por núcleo).
+# MODEL_WORKERS=0 entrena en el mismo hilo de la petición (sin pool, útil para depurar).
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", str(os.cpu_count() or 1)))
+
+# Tareas que pueden esperar en cola además de las que se están ejecutando. Con la cola
+# llena se rechaza la petición (429) en lugar de acumular latencia.
+MODEL_QUEUE_SIZE = int(os.getenv("MODEL_QUEUE_SIZE", str(2 * max(1, MODEL_WORKERS))))
+
+# Lugares del pool que pueden ocupar a la vez las tareas de segundo plano (precálculo y
+# modelos globales al publicar una versión); el resto queda siempre para las peticiones.
+# Por defecto, la mitad de los procesos, y nunca todo el pool.
+MODEL_BACKGROUND_SLOTS = max(1, min(
+    int(os.getenv("MODEL_BACKGROUND_SLOTS", str(max(1, MODEL_WORKERS // 2)))),
+    max(1, MODEL_WORKERS) + MODEL_QUEUE_SIZE - 1
+))
+
+# Segundos sugeridos al cliente (cabecera Retry-After) cuando la cola está llena
+MODEL_RETRY_AFTER_SECONDS = int(os.getenv("MODEL_RETRY_AFTER_SECONDS", "2"))
+
+# 'forkserver' evita heredar los hilos del servidor (fork + hilos puede bloquearse)
+# y arranca los procesos mucho más rápido que 'spawn'
+MODEL_POOL_START_METHOD = os.getenv(
+    "MODEL_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Variables que limitan los hilos nativos (BLAS, OpenMP) de cada proceso: con un
+# proceso por núcleo, XGBoost/NumPy multihilo solo agregan contención
+_SINGLE_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Lugares disponibles (en ejecución + en cola); cada tarea libera el suyo al terminar
+_slots = threading.BoundedSemaphore(max(1, MODEL_WORKERS) + MODEL_QUEUE_SIZE)
+# Parte de esos lugares que puede tomar el segundo plano (ver background_lane)
+_background_slots = threading.BoundedSemaphore(MODEL_BACKGROUND_SLOTS)
+_background = ContextVar("model_background", default=False)
+# queue_full cuenta cada vez que no hubo lugar, incluidos los reintentos internos de
+# lotes, precálculo y jerarquía; rejected solo las que llegaron al cliente como 429
+_counters = {"in_flight": 0, "background_in_flight": 0, "submitted": 0, "queue_full": 0, "rejected": 0}
+_counters_lock = threading.Lock()
+
+
+class ModelPoolBusy(RuntimeError):
+    """
+    La cola del pool de modelos está llena; el cliente debe reintentar más tarde.
+    """
+
+    def __init__(self, retry_after=MODEL_RETRY_AFTER_SECONDS):
+        super().__init__("El servicio de modelos está ocupado. Intente de nuevo en unos segundos.")
+        self.retry_after = retry_after
+
+
+def _worker_init():
+    for name in _SINGLE_THREAD_ENV:
+        os.environ.setdefault(name, "1")
+
+
+def get_process_pool():
+    """
+    Devuelve el pool de procesos de modelos, creándolo en el primer uso.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MODEL_WORKERS,
+                mp_context=multiprocessing.get_context(MODEL_POOL_START_METHOD),
+                initializer=_worker_init
+            )
+        return _pool
+
+
+def _submit_to_pool(fn, *args):
+    # Si un proceso murió (p. ej. por falta de memoria) el pool queda inutilizable:
+    # se reemplaza por uno nuevo y se reintenta
+    global _pool
+    pool = get_process_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return get_process_pool().submit(fn, *args)
+
+
+def _run_inline(fn, *args):
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+@contextmanager
+def background_lane():
+    """
+    Las tareas enviadas dentro del bloque (y desde los hilos que copian su contexto)
+    son de segundo plano: entre todas ocupan como máximo MODEL_BACKGROUND_SLOTS
+    lugares del pool, así las peticiones nunca se quedan sin lugar por ellas.
+    """
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def _release_slot(background):
+    def _release(_future):
+        with _counters_lock:
+            _counters["in_flight"] -= 1
+            if background:
+                _counters["background_in_flight"] -= 1
+        _slots.release()
+        if background:
+            _background_slots.release()
+    return _release
+
+
+def _acquire(semaphore, wait):
+    if semaphore.acquire(blocking=wait):
+        return
+    with _counters_lock:
+        _counters["queue_full"] += 1
+    raise ModelPoolBusy()
+
+
+def submit_model_task(fn, *args, wait=False):
+    """
+    Envía una tarea al pool de procesos y devuelve su Future.
+    Si no hay lugar en la cola: con wait=False lanza ModelPoolBusy; con wait=True
+    espera a que se libere uno (lo usan los lotes, que ya limitan lo que envían).
+    En background_lane() también tiene que haber lugar en la parte del segundo plano.
+    """
+    if MODEL_WORKERS <= 0:
+        return _run_inline(fn, *args)
+
+    background = _background.get()
+    if background:
+        _acquire(_background_slots, wait)
+    try:
+        _acquire(_slots, wait)
+    except ModelPoolBusy:
+        if background:
+            _background_slots.release()
+        raise
+    try:
+        future = _submit_to_pool(fn, *args)
+    except Exception:
+        _slots.release()
+        if background:
+            _background_slots.release()
+        raise
+    with _counters_lock:
+        _counters["in_flight"] += 1
+        _counters["submitted"] += 1
+        if background:
+            _counters["background_in_flight"] += 1
+    future.add_done_callback(_release_slot(background))
+    return future
+
+
+def run_model_task(fn, *args):
+    """
+    Ejecuta una tarea en el pool y espera su resultado (lanza ModelPoolBusy si la cola está llena).
+    """
+    return submit_model_task(fn, *args).result()
+
+
+def record_rejection():
+    """
+    Cuenta un ModelPoolBusy que se respondió al cliente como 429.
+    """
+    with _counters_lock:
+        _counters["rejected"] += 1
+
+
+def pool_stats():
+    with _counters_lock:
+        return {
+            "workers": MODEL_WORKERS,
+            "queue_size": MODEL_QUEUE_SIZE,
+            "capacity": max(1, MODEL_WORKERS) + MODEL_QUEUE_SIZE,
+            "background_slots": MODEL_BACKGROUND_SLOTS,
+            "start_method": MODEL_POOL_START_METHOD,
+            **_counters
+        }
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# --- Tareas que corren dentro de los procesos del pool ---
+# Los módulos de modelos se importan dentro de la tarea: así el proceso principal
+# no paga la importación al crear el pool y los procesos ya tienen el entorno de
+# _worker_init() configurado cuando se carga XGBoost.
+
+def warm_up_task(_=None):
+    """
+    Importa los módulos de modelos en el proceso (para medir o precalentar el pool).
+    """
+    import backend.services.forecast_service  # noqa: F401
+    return os.getpid()
+
+
+def fit_forecast_task(model_type, ts_history, steps, frequency, params=None):
+    """
+    Entrena el modelo y pronostica 'steps' períodos.
+    Retorna (modelo, forecast_df, status); el modelo vuelve al proceso principal
+    para guardarlo en la caché de modelos.
+    """
+    from backend.services.forecast_service import FORECASTERS
+
+    fit, forecast = FORECASTERS[model_type]
+    model, status = fit(ts_history, frequency, **(params or {}))
+    if model is None:
+        return None, None, status
+    forecast_df, status = forecast(model, ts_history, steps, frequency)
+    return model, forecast_df, status
+
+
+def fit_task(model_type, ts_history, frequency, params=None):
+    """
+    Entrena el modelo con toda la historia. Retorna (modelo, status).
+    'params' son opciones del modelo (p. ej. los órdenes de SARIMA con order=auto).
+    """
+    from backend.services.forecast_service import FORECASTERS
+
+    fit, _ = FORECASTERS[model_type]
+    return fit(ts_history, frequency, **(params or {}))
+
+
+def backtest_task(model_type, ts_history, frequency, params=None):
+    """
+    Corre el backtest del modelo. Retorna el diccionario de métricas.
+    """
+    from backend.services.forecast_service import BACKTESTS
+
+    return BACKTESTS[model_type](ts_history, frequency, **(params or {}))
+
+
+def cv_task(model_type, ts_history, frequency, origins, horizon, params=None):
+    """
+    Evalúa un tramo de folds consecutivos del backtest de origen móvil.
+    """
+    from backend.services.backtest_service import CV_FOLDS
+
+    return CV_FOLDS[model_type](ts_history, frequency, origins, horizon, **(params or {}))
+
+
+def order_search_task(ts_history, frequency, candidates, criterion, maxiter=None, start_params=None):
+    """
+    Ajusta un grupo de candidatos de la búsqueda automática de órdenes SARIMA.
+    """
+    from backend.models.sarima_model import score_sarima_orders
+
+    return score_sarima_orders(ts_history, frequency, candidates, criterion, maxiter, start_params)
+
+
+def global_fit_task(panel):
+    """
+    Entrena el modelo XGBoost global sobre el panel completo. Retorna (modelo, status).
+    """
+    from backend.models.global_xgboost import fit_global_xgboost
+
+    return fit_global_xgboost(panel)
+
+
+def global_backtest_task(panel):
+    """
+    Backtest del modelo XGBoost global (métricas de todos los segmentos).
+    """
+    from backend.models.global_xgboost import run_backtest_global_xgboost
+
+    return run_backtest_global_xgboost(panel)
+
+
+def registry_load_task(family, directory, meta, ts_history, frequency):
+    """
+    Reconstruye un modelo del registro en disco (SARIMA: una pasada del filtro de
+    Kalman, que con s=52 tarda segundos y no debe correr en el proceso del API).
+    """
+    from backend.services.model_registry import load_artifact
+
+    return load_artifact(family, directory, meta, ts_history, frequency)
+
+
+def load_forecast_task(model_type, directory, meta, ts_history, steps, frequency):
+    """
+    Reconstruye un modelo del registro en disco y pronostica 'steps' períodos.
+    Mismo resultado que fit_forecast_task(); modelo None si el artefacto no se pudo leer.
+    """
+    from backend.services.forecast_service import FORECASTERS
+    from backend.services.model_registry import load_artifact
+
+    model = load_artifact(model_type, directory, meta, ts_history, frequency)
+    if model is None:
+        return None, None, "No se pudo cargar el modelo del registro."
+    _, forecast = FORECASTERS[model_type]
+    forecast_df, status = forecast(model, ts_history, steps, frequency)
+    return model, forecast_df, status
+
+
+def sarima_update_task(directory, meta, ts_history, frequency):
+    """
+    Actualiza (o reentrena, según la política) el SARIMA de un segmento a partir de
+    su artefacto con datos anteriores. Retorna (modelo, linaje, status).
+    """
+    from backend.services.model_registry import read_sarima_payload
+    from backend.services.sarima_update import update_or_refit_sarima
+
+    return update_or_refit_sarima(ts_history, frequency, read_sarima_payload(directory), meta)
+
+
+def update_forecast_task(directory, meta, ts_history, steps, frequency):
+    """
+    sarima_update_task() y pronóstico de 'steps' períodos, en una sola tarea del lote.
+    Retorna (modelo, forecast_df, status, linaje).
+    """
+    from backend.models.sarima_model import forecast_sarima
+
+    model, lineage, status = sarima_update_task(directory, meta, ts_history, frequency)
+    if model is None:
+        return None, None, status, None
+    forecast_df, status = forecast_sarima(model, steps)
+    return model, forecast_df, status, lineage
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from backend.models.metrics import METRIC_NAMES
+
+# Versión del formato de los artefactos: los de otro formato se ignoran al cargar
+REGISTRY_FORMAT = 1
+
+
+def artifact_key(model_type, category, region, frequency, dataset_hash, filters=None, hyperparameters=None):
+    """
+    Identidad de un artefacto: variante del modelo, segmento, frecuencia, filtros,
+    hiperparámetros y huella de los datos con los que se entrenó.
+    Es un diccionario serializable a JSON (se guarda en los metadatos).
+    """
+    return {
+        "model_type": model_type,
+        "category": category,
+        "region": region,
+        "frequency": frequency,
+        "filters": sorted([dim, sorted(values)] for dim, values in (filters or {}).items() if values),
+        "hyperparameters": json.loads(json.dumps(hyperparameters or {}, sort_keys=True)),
+        "dataset": dataset_hash
+    }
+
+
+def artifact_id(key):
+    """
+    Identificador del artefacto dentro del directorio de su dataset: no incluye la
+    huella de los datos, así el mismo segmento tiene el mismo id en cada versión
+    (ver ModelRegistry.find_previous).
+    """
+    lineage = {name: value for name, value in key.items() if name != "dataset"}
+    return hashlib.sha256(json.dumps(lineage, sort_keys=True).encode()).hexdigest()[:24]
+
+
+# --- Formatos por familia de modelo ---
+# save(modelo, directorio) -> (archivos, metadatos extra); load(directorio, meta, ts, freq) -> modelo o None
+
+def _save_sarima(results, directory):
+    # Solo los parámetros: no dependen de la versión de statsmodels y ocupan unos pocos bytes
+    payload = {
+        "params": np.asarray(results.params, dtype=float).tolist(),
+        "order": list(results.model.order),
+        "seasonal_order": list(results.model.seasonal_order)
+    }
+    with open(os.path.join(directory, "params.json"), "w") as f:
+        json.dump(payload, f)
+    # Historia y verosimilitud del ajuste: las usa la actualización incremental
+    # (backend/services/sarima_update.py) cuando llegan datos nuevos
+    return ["params.json"], {
+        "start": str(results.data.row_labels[0]),
+        "nobs": int(results.nobs),
+        "llf": float(results.llf),
+        "burn": int(results.loglikelihood_burn)
+    }
+
+
+def read_sarima_payload(directory):
+    """
+    Parámetros y órdenes de un artefacto SARIMA.
+    """
+    with open(os.path.join(directory, "params.json")) as f:
+        return json.load(f)
+
+
+def _load_sarima(directory, meta, ts_history, frequency):
+    from backend.models.sarima_model import load_sarima
+
+    payload = read_sarima_payload(directory)
+    results, _ = load_sarima(
+        ts_history, frequency, payload["params"], payload["order"], payload["seasonal_order"]
+    )
+    return results
+
+
+def _save_xgboost(model, directory):
+    model.save_model(os.path.join(directory, "model.ubj"))
+    return ["model.ubj"], {}
+
+
+def _load_xgboost(directory, meta, ts_history, frequency):
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    model.load_model(os.path.join(directory, "model.ubj"))
+    return model
+
+
+def _save_global_xgboost(model, directory):
+    model["model"].save_model(os.path.join(directory, "model.ubj"))
+    np.save(os.path.join(directory, "scale.npy"), model["scale"])
+    return ["model.ubj", "scale.npy"], {"lag": int(model["lag"]), "n_regions": int(model["n_regions"])}
+
+
+def _load_global_xgboost(directory, meta, ts_history, frequency):
+    model = _load_xgboost(directory, meta, ts_history, frequency)
+    return {
+        "model": model,
+        "scale": np.load(os.path.join(directory, "scale.npy")),
+        "lag": meta["extra"]["lag"],
+        "n_regions": meta["extra"]["n_regions"]
+    }
+
+
+# familia -> (guardar, cargar)
+CODECS = {
+    "sarima": (_save_sarima, _load_sarima),
+    "xgboost": (_save_xgboost, _load_xgboost),
+    "xgboost_global": (_save_global_xgboost, _load_global_xgboost),
+}
+
+
+def load_artifact(family, directory, meta, ts_history=None, frequency=None):
+    """
+    Lee los archivos de un artefacto y reconstruye el modelo (None si no se puede).
+    """
+    try:
+        return CODECS[family][1](directory, meta, ts_history, frequency)
+    except Exception as e:
+        print(f"Aviso: no se pudo cargar el modelo {directory}: {e}")
+        return None
+
+
+def _library_versions():
+    versions = {}
+    for name in ("xgboost", "statsmodels"):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            pass
+    return versions
+
+
+class ModelRegistry:
+    """
+    Registro en disco de modelos entrenados, para no reentrenar tras un reinicio o un
+    despliegue. Estructura: <raíz>/<huella de datos>/<familia>/<id>/ con los archivos
+    del modelo y meta.json (clave, tiempo de entrenamiento, métricas del backtest).
+    Es el segundo nivel de la caché de modelos (ver ModelCache.registry).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0
+        self.updates = 0
+
+    def _directory(self, family, key):
+        return os.path.join(self.root, key["dataset"][:16], family, artifact_id(key))
+
+    @staticmethod
+    def _read_meta(directory):
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(directory, meta):
+        # Escritura atómica: un lector nunca ve un meta.json a medias
+        tmp = os.path.join(directory, f".meta-{uuid.uuid4().hex}.json")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    def find(self, family, key):
+        """
+        (directorio, metadatos) del artefacto guardado con esta clave, o None.
+        """
+        directory = self._directory(family, key)
+        meta = self._read_meta(directory)
+        found = bool(meta) and meta.get("format") == REGISTRY_FORMAT and meta.get("key") == key and bool(meta.get("files"))
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (directory, meta) if found else None
+
+    def find_previous(self, family, key):
+        """
+        (directorio, metadatos) del artefacto más reciente del mismo modelo y segmento
+        entrenado con otros datos (una versión anterior del dataset), o None.
+        """
+        if not os.path.isdir(self.root):
+            return None
+        lineage = {name: value for name, value in key.items() if name != "dataset"}
+        current = key["dataset"][:16]
+        best = None
+        for dataset in os.listdir(self.root):
+            if dataset == current:
+                continue
+            directory = os.path.join(self.root, dataset, family, artifact_id(key))
+            meta = self._read_meta(directory)
+            if not meta or meta.get("format") != REGISTRY_FORMAT or not meta.get("files"):
+                continue
+            if {name: value for name, value in meta.get("key", {}).items() if name != "dataset"} != lineage:
+                continue
+            if best is None or meta.get("trained_at", 0) > best[1].get("trained_at", 0):
+                best = (directory, meta)
+        return best
+
+    def load(self, family, key, ts_history=None, frequency=None):
+        """
+        Modelo guardado con esta clave, o None si no existe o no se puede leer.
+        Para cargar en otro proceso: find() y load_artifact().
+        """
+        found = self.find(family, key)
+        if found is None:
+            return None
+        return load_artifact(family, *found, ts_history, frequency or key["frequency"])
+
+    def save(self, family, key, model, train_seconds=None, lineage=None):
+        """
+        Guarda el modelo y sus metadatos. Los errores de disco no interrumpen la petición.
+        'lineage' describe de dónde sale el modelo (ajuste completo o actualización
+        incremental, ver backend/services/sarima_update.py).
+        Retorna el tamaño en bytes del artefacto (None si no se pudo guardar).
+        """
+        directory = self._directory(family, key)
+        try:
+            with self._lock:
+                os.makedirs(directory, exist_ok=True)
+                # Los archivos se escriben en un directorio temporal y se mueven al final
+                staging = os.path.join(directory, f".staging-{uuid.uuid4().hex}")
+                os.makedirs(staging)
+                try:
+                    files, extra = CODECS[family][0](model, staging)
+                    for name in files:
+                        os.replace(os.path.join(staging, name), os.path.join(directory, name))
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+
+                meta = self._read_meta(directory) or {}
+                meta.update({
+                    "format": REGISTRY_FORMAT,
+                    "family": family,
+                    "key": key,
+                    "files": files,
+                    # Tamaño del artefacto: la caché en memoria lo usa como tamaño del modelo
+                    "bytes": sum(os.path.getsize(os.path.join(directory, name)) for name in files),
+                    "extra": extra,
+                    "trained_at": time.time(),
+                    "train_seconds": train_seconds,
+                    "libraries": _library_versions()
+                })
+                if lineage is None and "nobs" in extra:
+                    lineage = {"mode": "fit", "fitted_nobs": extra["nobs"], "updates": 0}
+                if lineage is not None:
+                    meta["lineage"] = lineage
+                self._write_meta(directory, meta)
+                self.saves += 1
+                if lineage is not None and lineage.get("mode") == "update":
+                    self.updates += 1
+                return meta["bytes"]
+        except Exception as e:
+            print(f"Aviso: no se pudo guardar el modelo en {directory}: {e}")
+        return None
+
+    def record_backtest(self, family, key, metrics):
+        """
+        Agrega las métricas del backtest a los metadatos del artefacto (el backtest
+        puede terminar antes o después que el entrenamiento).
+        """
+        directory = self._directory(family, key)
+        summary = {name: metrics.get(name) for name in ("mode", "test_period_months", "n_folds", *METRIC_NAMES)}
+        summary = {name: value for name, value in summary.items() if value is not None}
+        try:
+            with self._lock:
+                os.makedirs(directory, exist_ok=True)
+                meta = self._read_meta(directory) or {"key": key, "family": family}
+                meta["backtest"] = {**summary, "evaluated_at": time.time()}
+                self._write_meta(directory, meta)
+        except Exception as e:
+            print(f"Aviso: no se pudieron guardar las métricas en {directory}: {e}")
+
+    def entries(self):
+        """
+        Metadatos de todos los artefactos, con 'path' y 'bytes'.
+        """
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for dataset in sorted(os.listdir(self.root)):
+            for family in sorted(os.listdir(os.path.join(self.root, dataset))):
+                family_dir = os.path.join(self.root, dataset, family)
+                if not os.path.isdir(family_dir):
+                    continue
+                for name in sorted(os.listdir(family_dir)):
+                    directory = os.path.join(family_dir, name)
+                    meta = self._read_meta(directory)
+                    if meta is None:
+                        continue
+                    size = sum(
+                        os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)
+                        if os.path.isfile(os.path.join(directory, f))
+                    )
+                    entries.append({**meta, "path": directory, "bytes": size})
+        return entries
+
+    def prune(self, keep_datasets=(), keep_last=0, older_than_seconds=None):
+        """
+        Borra los artefactos de datos que ya no se usan: se conservan las huellas de
+        'keep_datasets', las 'keep_last' más recientes y (si se indica) todo lo
+        entrenado hace menos de 'older_than_seconds'. Retorna las rutas borradas.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        keep = {dataset[:16] for dataset in keep_datasets}
+        datasets = [
+            (os.path.getmtime(os.path.join(self.root, name)), name)
+            for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))
+        ]
+        datasets.sort(reverse=True)
+        keep.update(name for _, name in datasets[:keep_last])
+
+        now = time.time()
+        removed = []
+        with self._lock:
+            for mtime, name in datasets:
+                if name in keep:
+                    continue
+                if older_than_seconds is not None and now - mtime < older_than_seconds:
+                    continue
+                path = os.path.join(self.root, name)
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "root": self.root,
+            "artifacts": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries),
+            "datasets": len({entry["key"]["dataset"] for entry in entries if "dataset" in entry.get("key", {})}),
+            "hits": self.hits,
+            "misses": self.misses,
+            "saves": self.saves,
+            "updates": self.updates
+        }
@@ -0,0 +1,128 @@
+import time
+
+from backend.models.sarima_model import sarima_order_candidates
+from backend.services.model_cache import model_cache_key
+from backend.services.model_executor import MODEL_WORKERS, ModelPoolBusy, order_search_task, submit_model_task
+
+# Criterios de información admitidos para elegir el orden
+CRITERIA = ("aic", "bic")
+
+# Tope de iteraciones del tamizado: los candidatos que no convergen rápido no
+# consumen un ajuste completo
+SEARCH_MAXITER = 30
+
+# Mejores candidatos del tamizado que se ajustan hasta converger
+SEARCH_FINALISTS = 3
+
+
+def _score_in_pool(ts_history, frequency, candidates, criterion, maxiter, start_params, workers):
+    """
+    Reparte los candidatos entre los procesos del pool y devuelve sus criterios en el
+    mismo orden. El reparto es alternado (candidato i -> grupo i % n) para que cada
+    proceso reciba modelos simples y complejos.
+    """
+    n_groups = max(1, min(workers, len(candidates)))
+    groups = [list(range(g, len(candidates), n_groups)) for g in range(n_groups)]
+
+    futures = []
+    try:
+        for g, indexes in enumerate(groups):
+            # El primer grupo decide la admisión (429 si la cola está llena)
+            futures.append(submit_model_task(
+                order_search_task, ts_history, frequency, [candidates[i] for i in indexes], criterion,
+                maxiter, [start_params[i] for i in indexes] if start_params else None, wait=g > 0
+            ))
+        scored = [None] * len(candidates)
+        for indexes, future in zip(groups, futures):
+            for i, entry in zip(indexes, future.result()):
+                scored[i] = entry
+        return scored
+    except ModelPoolBusy:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def search_sarima_order(ts_history, frequency, criterion="aic", workers=None):
+    """
+    Búsqueda automática del orden SARIMA por AIC/BIC sobre una grilla acotada
+    (ver sarima_order_candidates), en dos etapas:
+    1. Tamizado en paralelo con un tope de SEARCH_MAXITER iteraciones; los ajustes
+       que fallan o dan un criterio no finito quedan descartados.
+    2. Los SEARCH_FINALISTS mejores se ajustan hasta converger, arrancando desde los
+       parámetros del tamizado. Gana el de menor criterio entre los que convergen.
+    Los parámetros del ganador ("params") sirven de punto de partida al entrenar el
+    modelo final: sin ellos, órdenes altos con s=52 pueden converger a un óptimo inestable.
+    """
+    if criterion not in CRITERIA:
+        return {"status": "Error", "message": f"criterion debe ser uno de: {', '.join(CRITERIA)}."}
+
+    started = time.perf_counter()
+    workers = workers or max(1, MODEL_WORKERS)
+    candidates = sarima_order_candidates(ts_history, frequency)
+    if not candidates:
+        return {"status": "Error", "message": "Datos insuficientes para la búsqueda automática de órdenes SARIMA."}
+
+    screened = _score_in_pool(ts_history, frequency, candidates, criterion, SEARCH_MAXITER, None, workers)
+    ok = sorted((entry for entry in screened if entry["status"] == "Success"), key=lambda e: e["score"])
+    if not ok:
+        return {"status": "Error", "message": screened[0].get("message", "Ningún candidato SARIMA se pudo ajustar.")}
+
+    finalists = ok[:SEARCH_FINALISTS]
+    final = _score_in_pool(
+        ts_history, frequency, [(e["order"], e["seasonal_order"]) for e in finalists], criterion,
+        None, [e["params"] for e in finalists], workers
+    )
+    fitted = [entry for entry in final if entry["status"] == "Success"]
+    if not fitted:
+        return {"status": "Error", "message": final[0].get("message", "Ningún finalista SARIMA se pudo ajustar.")}
+    best = min([e for e in fitted if e["converged"]] or fitted, key=lambda e: e["score"])
+
+    return {
+        "status": "Success",
+        "order": best["order"],
+        "seasonal_order": best["seasonal_order"],
+        "criterion": criterion,
+        "score": best["score"],
+        "converged": best["converged"],
+        "params": best["params"],
+        "candidates": len(candidates),
+        "screen_failed": len(candidates) - len(ok),
+        "finalists": [
+            {"order": e["order"], "seasonal_order": e["seasonal_order"], "score": e.get("score"),
+             "converged": e.get("converged", False)}
+            for e in final
+        ],
+        "search_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def resolve_sarima_order(snapshot, category, region, frequency, filters, ts_history, criterion="aic",
+                         order_store=None, model_cache=None):
+    """
+    Orden SARIMA de un segmento con order=auto. Se busca una sola vez por segmento,
+    frecuencia, criterio y versión de los datos: el ganador se guarda en 'order_store'
+    (SQLite, sobrevive a reinicios) y en 'model_cache' (las peticiones simultáneas del
+    mismo segmento esperan la misma búsqueda).
+    Retorna (resultado, status); el resultado incluye "searched" (False si se reutilizó).
+    """
+    def _load_or_search():
+        if order_store is not None:
+            stored = order_store.get(snapshot, category, region, frequency, filters, criterion)
+            if stored is not None:
+                return {**stored, "searched": False}, "Success"
+        result = search_sarima_order(ts_history, frequency, criterion)
+        if result["status"] != "Success":
+            return None, result["message"]
+        if order_store is not None:
+            order_store.put(snapshot, category, region, frequency, filters, criterion, result)
+        return {**result, "searched": True}, "Success"
+
+    if model_cache is None:
+        return _load_or_search()
+
+    key = model_cache_key(f"sarima:order-{criterion}", category, region, frequency, snapshot.version, filters)
+    result, status, hit = model_cache.get_or_fit(key, _load_or_search)
+    if result is not None and hit:
+        result = {**result, "searched": False}
+    return result, status
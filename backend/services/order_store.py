@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sarima_orders (
+    category TEXT NOT NULL,
+    region TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    filters TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    criterion TEXT NOT NULL,
+    data_version INTEGER,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (category, region, frequency, filters, fingerprint, criterion)
+);
+"""
+
+
+def _filters_key(filters):
+    # Mismo criterio que model_cache_key: el orden de los valores no importa
+    return json.dumps(sorted(
+        [dim, sorted(values)] for dim, values in (filters or {}).items() if values
+    ))
+
+
+class SarimaOrderStore:
+    """
+    Órdenes SARIMA ganadores de la búsqueda automática, en SQLite, por segmento,
+    frecuencia, criterio y versión de los datos. La versión se identifica por la
+    huella del snapshot (el número de versión vuelve a 1 en cada inicio), así un
+    reinicio con los mismos datos no repite la búsqueda.
+    La base se crea en el primer uso, no al importar la configuración.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=30)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(_SCHEMA)
+                    finally:
+                        conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit al salir (o rollback si hubo error)
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, snapshot, category, region, frequency, filters, criterion):
+        """
+        Resultado guardado de la búsqueda, o None si este segmento no se buscó con estos datos.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM sarima_orders WHERE category = ? AND region = ? AND frequency = ? "
+                "AND filters = ? AND fingerprint = ? AND criterion = ?",
+                (category, region, frequency, _filters_key(filters), snapshot.fingerprint, criterion)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, snapshot, category, region, frequency, filters, criterion, result):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sarima_orders "
+                "(category, region, frequency, filters, fingerprint, criterion, data_version, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (category, region, frequency, _filters_key(filters), snapshot.fingerprint, criterion,
+                 snapshot.version, json.dumps(result), time.time())
+            )
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sarima_orders").fetchone()[0]
@@ -0,0 +1,225 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.forecast_service import (
+    has_stored_results, pretrain_global_model, process_evaluation_request, process_forecast_request,
+    resolve_batch_segments
+)
+from backend.services.model_executor import ModelPoolBusy, background_lane
+
+# Errores recientes que se muestran en el estado del precálculo
+MAX_REPORTED_ERRORS = 20
+
+
+class Precomputer:
+    """
+    Precalcula en segundo plano el pronóstico y las métricas del backtest de cada
+    combinación (modelo, categoría, región, frecuencia) al publicarse cada versión del
+    dataset (al arrancar y tras cada recarga), con 'workers' combinaciones a la vez.
+    Pasa por los mismos servicios que las peticiones: los resultados quedan en la caché
+    de modelos (último resultado de cada segmento) y los modelos en el registro en disco,
+    así que la primera petición de cada segmento ya no entrena.
+    Antes de los segmentos entrena los modelos globales de 'global_frequencies'.
+    Las corridas no se superponen: una versión nueva espera a que la anterior suelte
+    lo que está calculando, y shutdown() detiene la corrida en curso.
+    Los entrenamientos van al pool de procesos por el carril de segundo plano
+    (background_lane): ocupan como máximo MODEL_BACKGROUND_SLOTS lugares, así que el
+    resto del pool queda para las peticiones. Si esa parte o el pool están llenos,
+    la combinación espera y reintenta.
+    Los lotes de /data/transactions lo relanzan como máximo una vez cada
+    DATA_APPEND_COALESCE_SECONDS (ver backend/config.py).
+    """
+
+    def __init__(self, model_cache, models, frequencies, steps=12, workers=2, global_frequencies=()):
+        self.model_cache = model_cache
+        self.models = list(models)
+        self.frequencies = list(frequencies)
+        self.global_frequencies = list(global_frequencies)
+        self.steps = steps
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._snapshot = None
+        self._progress = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def enabled(self):
+        return bool(self.models and self.frequencies and self.workers > 0)
+
+    def start(self, snapshot):
+        """
+        Lanza el precálculo de 'snapshot' en un hilo (listener del DatasetHolder). Una
+        corrida de una versión anterior se abandona: sus combinaciones pendientes ya
+        no se calculan.
+        """
+        if self._stopping.is_set() or not (self.enabled or self.global_frequencies):
+            return None
+        tasks = [
+            (frequency, model_type, category, region)
+            for frequency in self.frequencies
+            for model_type in self.models
+            for category, region in resolve_batch_segments(snapshot, "all")
+        ] if self.enabled else []
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._snapshot = snapshot
+            self._progress = {
+                "version": snapshot.version,
+                "total": len(tasks),
+                "completed": 0,
+                "failed": 0,
+                "retries": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "global_models": {},
+                "errors": []
+            }
+            previous = self._thread
+            thread = threading.Thread(
+                target=self._run, args=(snapshot, generation, tasks, previous),
+                name=f"precompute-v{snapshot.version}", daemon=True
+            )
+            self._thread = thread
+        thread.start()
+        return thread
+
+    def shutdown(self, timeout=10):
+        """
+        Detiene la corrida en curso: no se lanzan más entrenamientos y se espera (hasta
+        'timeout' segundos) a que terminen los que ya están en marcha.
+        """
+        self._stopping.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _superseded(self, generation):
+        return self._stopping.is_set() or generation != self._generation
+
+    def _run(self, snapshot, generation, tasks, previous=None):
+        # La corrida anterior ya está abandonada: solo falta que termine lo que tenía en curso
+        if previous is not None:
+            previous.join()
+        for frequency in self.global_frequencies:
+            if self._superseded(generation):
+                return
+            self._pretrain(snapshot, generation, frequency)
+        if tasks:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="precompute") as executor:
+                for task in tasks:
+                    if self._superseded(generation):
+                        break
+                    executor.submit(self._compute, snapshot, generation, *task)
+        with self._lock:
+            if generation == self._generation:
+                self._progress["finished_at"] = time.time()
+
+    def _pretrain(self, snapshot, generation, frequency):
+        try:
+            with background_lane():
+                status = pretrain_global_model(snapshot, frequency, self.model_cache)
+        except Exception as e:
+            status = str(e)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._progress["global_models"][frequency] = status
+        if status != "Success":
+            print(f"Aviso: no se pudo entrenar el modelo global {frequency} (v{snapshot.version}): {status}")
+
+    def _compute(self, snapshot, generation, frequency, model_type, category, region):
+        message = None
+        while True:
+            if self._superseded(generation):
+                return
+            try:
+                with background_lane():
+                    forecast = process_forecast_request(
+                        snapshot, model_type, category, region, self.steps, frequency, model_cache=self.model_cache
+                    )
+                    metrics = process_evaluation_request(
+                        snapshot, model_type, category, region, frequency, model_cache=self.model_cache
+                    )
+            except ModelPoolBusy as e:
+                self._record(generation, retries=1)
+                time.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                message = str(e)
+            else:
+                if forecast["status"] != "success":
+                    message = forecast["message"]
+                elif metrics.get("status") != "Success":
+                    message = metrics.get("message", "Error desconocido en evaluación")
+            break
+
+        if message is None:
+            self._record(generation, completed=1)
+        else:
+            self._record(generation, completed=1, failed=1, error={
+                "model_type": model_type, "category": category, "region": region, "frequency": frequency,
+                "message": message
+            })
+
+    def _record(self, generation, completed=0, failed=0, retries=0, error=None):
+        with self._lock:
+            if generation != self._generation:
+                return
+            progress = self._progress
+            progress["completed"] += completed
+            progress["failed"] += failed
+            progress["retries"] += retries
+            if error is not None:
+                progress["errors"] = (progress["errors"] + [error])[-MAX_REPORTED_ERRORS:]
+
+    def status(self):
+        """
+        Progreso de la última corrida y cobertura: cuántos segmentos de cada modelo y
+        frecuencia tienen el pronóstico y las métricas de la versión actual listos
+        para servir (los que la caché desalojó vuelven a calcularse en su petición).
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            progress = dict(self._progress) if self._progress else None
+        result = {
+            "enabled": self.enabled,
+            "models": self.models,
+            "frequencies": self.frequencies,
+            "global_frequencies": self.global_frequencies,
+            "steps": self.steps,
+            "workers": self.workers,
+            "progress": progress,
+            "coverage": None
+        }
+        if progress is None:
+            return result
+        progress["running"] = progress["finished_at"] is None
+        progress["elapsed_seconds"] = round((progress["finished_at"] or time.time()) - progress["started_at"], 1)
+
+        segments = resolve_batch_segments(snapshot, "all")
+        coverage = {}
+        totals = {"segments": 0, "forecasts": 0, "metrics": 0}
+        for model_type in self.models:
+            for frequency in self.frequencies:
+                ready = [
+                    has_stored_results(self.model_cache, snapshot, model_type, category, region, frequency)
+                    for category, region in segments
+                ]
+                entry = {
+                    "segments": len(segments),
+                    "forecasts": sum(forecast for forecast, _ in ready),
+                    "metrics": sum(metrics for _, metrics in ready)
+                }
+                coverage[f"{model_type}/{frequency}"] = entry
+                for name in totals:
+                    totals[name] += entry[name]
+        totals["ratio"] = round(
+            (totals["forecasts"] + totals["metrics"]) / (2 * totals["segments"]), 4
+        ) if totals["segments"] else 0.0
+        result["coverage"] = {"total": totals, "by_model": coverage}
+        return result
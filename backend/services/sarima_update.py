@@ -0,0 +1,89 @@
+import os
+
+from backend.models.frequency import get_frequency_settings
+from backend.models.sarima_model import fit_sarima, update_sarima
+
+# Reentrenamiento completo programado: tras este número de ciclos estacionales de
+# datos nuevos (1 = un año en ME/QE/W, una semana en D) desde el último ajuste
+# completo. 0 desactiva la actualización incremental (siempre se reentrena).
+SARIMA_REFIT_CYCLES = float(os.getenv("SARIMA_REFIT_CYCLES", "1"))
+
+# Deriva máxima (caída de la log-verosimilitud media por observación nueva, en nats)
+# que admite la actualización incremental; por encima se reentrena
+SARIMA_DRIFT_THRESHOLD = float(os.getenv("SARIMA_DRIFT_THRESHOLD", "1.0"))
+
+
+def history_mismatch(extra, ts_history):
+    """
+    Motivo por el que la historia nueva no continúa la del modelo anterior, o None.
+    """
+    if "nobs" not in extra or "start" not in extra:
+        return "el modelo anterior no guarda su historia"
+    if str(ts_history.index[0]) != extra["start"]:
+        return "la historia empieza en otra fecha"
+    if len(ts_history) < extra["nobs"]:
+        return "la historia es más corta que la del modelo anterior"
+    return None
+
+
+def scheduled_refit(lineage, nobs, frequency_code, cycles=SARIMA_REFIT_CYCLES):
+    """
+    Motivo del reentrenamiento completo programado, o None si aún toca actualizar.
+    """
+    if cycles <= 0:
+        return "actualización incremental desactivada"
+    fitted_nobs = lineage.get("fitted_nobs")
+    if fitted_nobs is None:
+        return "sin ajuste completo previo"
+    limit = max(1, round(cycles * get_frequency_settings(frequency_code)["seasonal_period"]))
+    if nobs - fitted_nobs >= limit:
+        return f"{nobs - fitted_nobs} períodos nuevos desde el último ajuste completo (límite {limit})"
+    return None
+
+
+def update_or_refit_sarima(ts_history, frequency_code, payload, meta, cycles=SARIMA_REFIT_CYCLES,
+                           drift_threshold=SARIMA_DRIFT_THRESHOLD):
+    """
+    Entrena un segmento que ya tenía modelo con datos anteriores ('payload': parámetros
+    y órdenes; 'meta': metadatos del artefacto en el registro):
+    - si la historia continúa la anterior y no toca el reentrenamiento programado, se
+      actualiza con los parámetros existentes (ver update_sarima);
+    - si la deriva supera 'drift_threshold' o toca reentrenar, se ajusta de nuevo
+      arrancando desde los parámetros anteriores (converge en pocas iteraciones).
+    Retorna (SARIMAXResults, linaje, status); el linaje va a los metadatos del registro.
+    """
+    extra = meta.get("extra", {})
+    lineage = meta.get("lineage") or {}
+    base = {"base_dataset": meta.get("key", {}).get("dataset"), "new_periods": len(ts_history) - extra.get("nobs", 0)}
+
+    drift = None
+    reason = history_mismatch(extra, ts_history) or scheduled_refit(lineage, len(ts_history), frequency_code, cycles)
+    if reason is None:
+        results, drift, status = update_sarima(
+            ts_history, frequency_code, payload["params"], payload["order"], payload["seasonal_order"],
+            extra["llf"], extra["nobs"], extra.get("burn", 0)
+        )
+        if results is not None and drift <= drift_threshold:
+            return results, {
+                **base,
+                "mode": "update",
+                "fitted_nobs": lineage["fitted_nobs"],
+                "updates": lineage.get("updates", 0) + 1,
+                "drift": round(drift, 4)
+            }, status
+        reason = status if results is None else f"deriva {drift:.2f} > {drift_threshold}"
+
+    results, status = fit_sarima(
+        ts_history, frequency_code, start_params=payload["params"], order=payload["order"],
+        seasonal_order=payload["seasonal_order"]
+    )
+    if results is None:
+        return None, None, status
+    return results, {
+        **base,
+        "mode": "refit",
+        "reason": reason,
+        "fitted_nobs": int(results.nobs),
+        "updates": 0,
+        "drift": None if drift is None else round(drift, 4)
+    }, status
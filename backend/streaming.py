@@ -0,0 +1,165 @@
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+
+import pandas as pd
+
+from backend.aggregates import SalesAggregates
+from backend.data_processing import (
+    CACHE_DIR, CATEGORICAL_COLUMNS, COMPACT_SCHEMA, PARQUET_AVAILABLE, TRANSACTION_SCHEMA,
+    clean_columns, compact_dataframe, list_shards
+)
+
+# Filas por bloque: la memoria pico de la carga queda acotada por este valor
+DEFAULT_CHUNK_ROWS = 250_000
+
+# Directorio donde se guardan las filas limpias cuando no se mantienen en memoria
+ROWS_DIR = os.path.join(CACHE_DIR, 'rows')
+
+
+@dataclass
+class StreamResult:
+    """
+    Resultado de una carga por bloques: los agregados ya reducidos y las filas,
+    en memoria (frames) o en disco (rows_path).
+    """
+    aggregates: SalesAggregates
+    frames: tuple
+    rows_path: str
+    template: pd.DataFrame
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, csv_encoding='utf-8'):
+    """
+    Recorre las partes de la fuente (CSV o Parquet) devolviendo DataFrames de
+    a lo sumo 'chunk_rows' filas, sin cargar nunca un archivo completo.
+    """
+    for shard in list_shards(path):
+        if shard.lower().endswith('.parquet'):
+            if not PARQUET_AVAILABLE:
+                raise ImportError("Se requiere pyarrow para leer archivos Parquet.")
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(shard)
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_rows):
+                yield record_batch.to_pandas()
+        else:
+            with pd.read_csv(shard, chunksize=chunk_rows, encoding=csv_encoding) as reader:
+                for chunk in reader:
+                    yield chunk
+
+
+def prepare_chunk(chunk, compact=COMPACT_SCHEMA):
+    """
+    Aplica a un bloque la misma limpieza que load_data() (nombres, fechas y,
+    si corresponde, esquema compacto).
+    """
+    chunk = clean_columns(chunk)
+    if compact:
+        chunk = compact_dataframe(chunk)
+    return chunk
+
+
+def _spool_chunk(rows_dir, index, chunk):
+    # Las categóricas se escriben como texto: cada bloque tiene su propio diccionario
+    # y así las partes se pueden leer juntas como un solo dataset
+    on_disk = chunk.copy()
+    for col in on_disk.select_dtypes(include='category').columns:
+        on_disk[col] = on_disk[col].astype('str')
+    on_disk.to_parquet(os.path.join(rows_dir, f'part-{index:05d}.parquet'), index=False)
+
+
+def read_spooled_rows(rows_path, columns=None):
+    """
+    Lee las filas guardadas en disco por stream_load (opcionalmente solo algunas columnas).
+    """
+    df = pd.read_parquet(rows_path, columns=columns)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def new_rows_path(fingerprint):
+    """
+    Directorio nuevo para las filas de una carga: cada carga escribe en el suyo, así
+    nunca se pisan ni se borran archivos que un snapshot publicado todavía lee.
+    """
+    return os.path.join(ROWS_DIR, f'{fingerprint[:16]}-{uuid.uuid4().hex[:8]}')
+
+
+def prune_spooled_rows(keep=()):
+    """
+    Borra los directorios de filas de cargas anteriores, salvo los de 'keep' y las
+    cargas en curso (.tmp).
+    """
+    if not os.path.isdir(ROWS_DIR):
+        return
+    keep = {os.path.abspath(path) for path in keep if path}
+    for name in os.listdir(ROWS_DIR):
+        path = os.path.join(ROWS_DIR, name)
+        if not name.endswith('.tmp') and os.path.abspath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def stream_load(path, fingerprint, chunk_rows=DEFAULT_CHUNK_ROWS, keep_rows="memory",
+                compact=None, csv_encoding='utf-8', rows_path=None):
+    """
+    Carga una exportación grande por bloques de 'chunk_rows' filas, reduciendo cada
+    bloque directamente a las ventas por (Categoría, Región, día) y a los acumuladores
+    de KPIs.
+    - keep_rows="memory": las filas limpias se conservan como bloques en memoria.
+    - keep_rows="disk": las filas se escriben a Parquet y no quedan en memoria, en
+      'rows_path' (por defecto, new_rows_path()). Los directorios de cargas anteriores
+      no se tocan: los borra quien publica, cuando ningún snapshot los usa.
+    Retorna (StreamResult, status_message) o (None, mensaje_de_error).
+    """
+    compact = COMPACT_SCHEMA if compact is None else compact
+    if keep_rows not in ("memory", "disk"):
+        return None, f"keep_rows debe ser 'memory' o 'disk', no '{keep_rows}'."
+    if keep_rows == "disk" and not PARQUET_AVAILABLE:
+        return None, "keep_rows='disk' requiere pyarrow."
+
+    shards = list_shards(path)
+    if not shards:
+        return None, f"Error: no se encontraron archivos CSV/Parquet en {path}"
+
+    rows_path = (rows_path or new_rows_path(fingerprint)) if keep_rows == "disk" else None
+    tmp_rows_path = f'{rows_path}.{os.getpid()}.tmp' if rows_path else None
+
+    aggregates = SalesAggregates()
+    frames = []
+    template = None
+    try:
+        if tmp_rows_path:
+            shutil.rmtree(tmp_rows_path, ignore_errors=True)
+            os.makedirs(tmp_rows_path)
+
+        for index, chunk in enumerate(iter_chunks(path, chunk_rows, csv_encoding)):
+            chunk = prepare_chunk(chunk, compact)
+
+            if template is None:
+                missing = [col for col in TRANSACTION_SCHEMA if col not in chunk.columns]
+                if missing:
+                    return None, f"Error: faltan columnas obligatorias: {', '.join(missing)}"
+                template = chunk.iloc[:0]
+
+            aggregates.accumulate(chunk)
+            if tmp_rows_path:
+                _spool_chunk(tmp_rows_path, index, chunk)
+            else:
+                frames.append(chunk)
+
+        if template is None:
+            return None, f"Error: la fuente {path} no contiene filas."
+
+        if tmp_rows_path:
+            # El directorio completo aparece de una vez
+            os.replace(tmp_rows_path, rows_path)
+
+        return StreamResult(aggregates, tuple(frames), rows_path, template), "Success"
+    except Exception as e:
+        return None, f"Error al cargar o preprocesar los datos por bloques: {e}"
+    finally:
+        if tmp_rows_path and os.path.exists(tmp_rows_path):
+            shutil.rmtree(tmp_rows_path, ignore_errors=True)
@@ -0,0 +1,59 @@
+"""
+Compara la latencia de aggregate_sales() recorriendo el DataFrame (camino original)
+contra la consulta al cubo precalculado, a medida que crece el número de filas.
+El dataset se replica N veces para simular historiales más grandes.
+
+Uso:
+    python -m benchmarks.bench_aggregate_sales [--scales 1 10 50] [--repeat 20]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.data_processing import aggregate_sales, load_data
+
+
+def _best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    base, status = load_data()
+    assert status == "Success", status
+
+    query = dict(category="Furniture", region="West", frequency="ME")
+    print(f"{'filas':>12}{'DataFrame (ms)':>16}{'cubo (us)':>12}{'agregados+cubo (ms)':>21}{'aceleración':>13}")
+    for scale in args.scales:
+        df = pd.concat([base] * scale, ignore_index=True)
+        for col in base.select_dtypes(include='category').columns:
+            df[col] = df[col].astype('category')
+
+        start = time.perf_counter()
+        cube = SalesCube(SalesAggregates.from_frame(df))
+        build = time.perf_counter() - start
+
+        expected, _ = aggregate_sales(df, **query)
+        actual, _ = aggregate_sales(cube, **query)
+        pd.testing.assert_series_equal(expected, actual, check_names=False, rtol=1e-9)
+
+        frame_time = _best_of(lambda: aggregate_sales(df, **query), max(3, args.repeat // scale))
+        cube_time = _best_of(lambda: aggregate_sales(cube, **query), args.repeat * 10)
+        print(f"{len(df):>12,}{frame_time * 1e3:>16.2f}{cube_time * 1e6:>12.1f}"
+              f"{build * 1e3:>21.1f}{frame_time / cube_time:>12.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Modelos de referencia (baselines) sobre todos los segmentos Categoría × Región:
+- tiempo por segmento de ajustar y pronosticar todo el panel de una vez (NumPy
+  vectorizado) vs. serie por serie,
+- MAPE medio del backtest de cada baseline, junto al de XGBoost por serie
+  (--with-xgboost) como referencia.
+
+Uso:
+    python -m benchmarks.bench_baselines [--frequency ME] [--steps 12] [--with-xgboost]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.data_processing import aggregate_sales, load_data
+from backend.models.baseline_models import (
+    BASELINE_MODELS, backtest_baselines, fit_baseline, fit_baselines, forecast_baseline, forecast_baselines,
+    right_align
+)
+from backend.models.frequency import get_frequency_settings
+from backend.models.xgboost_model import run_backtest_xgboost
+
+
+def _best_of(fn, repeat=5):
+    # Mejor de 'repeat' corridas: los tiempos son de microsegundos
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frequency", default="ME")
+    parser.add_argument("--steps", type=int, default=12)
+    parser.add_argument("--with-xgboost", action="store_true", help="Incluye el MAPE de XGBoost por serie")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df, status = load_data()
+    assert status == "Success", status
+    cube = SalesCube(SalesAggregates.from_frame(df))
+    settings = get_frequency_settings(args.frequency)
+    season = settings["seasonal_period"]
+
+    _, values, first, last = cube.panel(args.frequency)
+    Y = right_align(values.reshape(-1, values.shape[2]), first.ravel(), last.ravel())
+    segments = [(c, r) for c in cube.categories for r in cube.regions]
+    series = [aggregate_sales(cube, *segment, args.frequency)[0] for segment in segments]
+    # Mismo largo mínimo que exigen los endpoints
+    usable = np.array([len(ts) >= settings["min_periods"] + settings["test_periods"] for ts in series])
+
+    print(f"{args.frequency}: {len(segments)} segmentos, {Y.shape[1]} períodos, horizonte {args.steps}")
+    print(f"{'baseline':>16}{'panel (ms/serie)':>18}{'por serie (ms)':>16}{'aceleración':>13}{'MAPE medio':>12}")
+    for method in BASELINE_MODELS:
+        panel_seconds = _best_of(lambda: forecast_baselines(fit_baselines(Y, method, season), args.steps))
+
+        def _loop():
+            for ts in series:
+                state, _ = fit_baseline(ts, args.frequency, method)
+                if state is not None:
+                    forecast_baseline(state, ts, args.steps, args.frequency)
+        loop_seconds = _best_of(_loop, repeat=2)
+
+        mape = backtest_baselines(Y, method, season, settings["test_periods"])["mape"]
+        per_segment = panel_seconds / len(segments) * 1000
+        print(f"{method:>16}{per_segment:>18.3f}{loop_seconds / len(segments) * 1000:>16.3f}"
+              f"{loop_seconds / panel_seconds:>12.1f}x{np.nanmean(mape[usable]):>11.1f}%")
+
+    if args.with_xgboost:
+        mapes = [run_backtest_xgboost(ts, args.frequency) for ts, ok in zip(series, usable) if ok]
+        mapes = [metrics["mape"] for metrics in mapes if metrics["status"] == "Success"]
+        print(f"{'xgboost':>16}{'':>18}{'':>16}{'':>13}{np.mean(mapes):>11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Mide el pronóstico por lotes (todas las combinaciones Categoría × Región) con
+distinto número de procesos: tiempo total y tiempo hasta el primer resultado.
+El caso de 1 proceso equivale al bucle secuencial segmento por segmento.
+
+Uso:
+    python -m benchmarks.bench_forecast_batch [--workers 1 2 4] [--model sarima] [--frequency ME]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.aggregates import SalesAggregates
+from backend.data_processing import load_data
+from backend.dataset_store import build_snapshot
+from backend.services.forecast_service import iter_forecast_batch
+from backend.services.model_executor import MODEL_POOL_START_METHOD, _worker_init, warm_up_task
+
+
+def _run(snapshot, pool, model, frequency, steps):
+    start = time.perf_counter()
+    first = None
+    ok = 0
+    for result in iter_forecast_batch(snapshot, model, "all", steps, frequency, pool=pool):
+        if first is None:
+            first = time.perf_counter() - start
+        ok += result["status"] == "success"
+    return time.perf_counter() - start, first, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--model", default="sarima")
+    parser.add_argument("--frequency", default="ME")
+    parser.add_argument("--steps", type=int, default=12)
+    args = parser.parse_args()
+
+    df, status = load_data()
+    assert status == "Success", status
+    snapshot = build_snapshot([df], SalesAggregates.from_frame(df), 1, "bench", "bench", "bench", df.iloc[:0])
+    n_segments = len(snapshot.categories) * len(snapshot.regions)
+
+    print(f"{n_segments} segmentos, modelo={args.model}, frecuencia={args.frequency}, núcleos={os.cpu_count()}")
+    print(f"{'procesos':>9}{'total (s)':>11}{'primer resultado (s)':>22}{'aceleración':>13}{'ok':>5}")
+    baseline = None
+    for workers in args.workers:
+        context = multiprocessing.get_context(MODEL_POOL_START_METHOD)
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_worker_init) as pool:
+            # Calentamiento: arranque de procesos e importación de los modelos
+            list(pool.map(warm_up_task, range(workers)))
+            total, first, ok = _run(snapshot, pool, args.model, args.frequency, args.steps)
+        baseline = baseline or total
+        print(f"{workers:>9}{total:>11.2f}{first:>22.2f}{baseline / total:>12.2f}x{ok:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Modelo XGBoost global vs. un XGBoost por serie, sobre todos los segmentos Categoría × Región:
+- tiempo de servir un pronóstico (por serie: entrenar + predecir; global: solo predecir),
+- costo del entrenamiento global (una vez por versión del dataset y frecuencia),
+- MAPE medio del backtest de cada enfoque.
+
+Uso:
+    python -m benchmarks.bench_global_xgboost [--frequency ME] [--steps 12]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.data_processing import aggregate_sales, load_data
+from backend.models.global_xgboost import (
+    backtest_metrics, fit_global_xgboost, forecast_global_xgboost, panel_from_cube, run_backtest_global_xgboost
+)
+from backend.models.xgboost_model import get_xgboost_forecast, run_backtest_xgboost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frequency", default="ME")
+    parser.add_argument("--steps", type=int, default=12)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df, status = load_data()
+    assert status == "Success", status
+    cube = SalesCube(SalesAggregates.from_frame(df))
+    panel = panel_from_cube(cube, args.frequency)
+    segments = [(c, r) for c in cube.categories for r in cube.regions]
+    series = {segment: aggregate_sales(cube, *segment, args.frequency)[0] for segment in segments}
+
+    start = time.perf_counter()
+    model, status = fit_global_xgboost(panel)
+    assert model is not None, status
+    train_seconds = time.perf_counter() - start
+
+    per_series, global_ = [], []
+    for segment in segments:
+        start = time.perf_counter()
+        get_xgboost_forecast(series[segment], args.steps, args.frequency)
+        per_series.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        forecast_global_xgboost(model, panel, *segment, args.steps)
+        global_.append(time.perf_counter() - start)
+
+    backtest = run_backtest_global_xgboost(panel)
+    mape_series, mape_global = [], []
+    for segment in segments:
+        local = run_backtest_xgboost(series[segment], args.frequency)
+        shared = backtest_metrics(backtest, panel, *segment)
+        if local["status"] == "Success" and shared["status"] == "Success":
+            mape_series.append(local["mape"])
+            mape_global.append(shared["mape"])
+
+    print(f"{args.frequency}: {len(segments)} segmentos, {panel['values'].shape[2]} períodos, horizonte {args.steps}")
+    print(f"{'enfoque':>12}{'ms/pronóstico (p50)':>22}{'total (s)':>11}{'MAPE medio':>12}")
+    print(f"{'por serie':>12}{np.median(per_series) * 1000:>22.1f}{sum(per_series):>11.2f}{np.mean(mape_series):>12.1f}")
+    print(f"{'global':>12}{np.median(global_) * 1000:>22.1f}{sum(global_):>11.2f}{np.mean(mape_global):>12.1f}")
+    print(f"Entrenamiento global (una vez por versión): {train_seconds:.2f} s; segmentos evaluados: {len(mape_global)}")
+
+
+if __name__ == "__main__":
+    main()
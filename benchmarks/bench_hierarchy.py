@@ -0,0 +1,85 @@
+"""
+Reconciliación de la jerarquía Total / Categoría / Región / Categoría × Región:
+error de un período de prueba reservado (los últimos 'test_periods' del panel) por
+nivel, para los pronósticos de base de un baseline y cada método de reconciliación.
+También verifica que los reconciliados sumen exactamente.
+
+Uso:
+    python -m benchmarks.bench_hierarchy [--frequency ME] [--baseline holt_winters]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.data_processing import load_data
+from backend.models.baseline_models import BASELINE_MODELS, backtest_errors, fit_baselines, forecast_baselines, right_align
+from backend.models.frequency import get_frequency_settings
+from backend.models.reconciliation import (
+    RECONCILIATION_METHODS, base_rows, coherence_error, reconcile, reconciliation_matrix, summing_matrix
+)
+
+LEVELS = ("total", "category", "region", "category_region")
+
+
+def _levels(n_categories, n_regions):
+    categories, regions = np.divmod(np.arange(n_categories * n_regions), n_regions)
+    return {
+        "total": (categories == 0) & (regions == 0),
+        "category": (categories > 0) & (regions == 0),
+        "region": (categories == 0) & (regions > 0),
+        "category_region": (categories > 0) & (regions > 0)
+    }
+
+
+def _mape(actual, forecasts, mask):
+    # Como en los backtests, los períodos sin ventas no cuentan para el MAPE
+    actual, forecasts = actual[mask], forecasts[mask]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nanmean(np.where(actual > 0, np.abs(actual - forecasts) / actual, np.nan)) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frequency", default="ME")
+    parser.add_argument("--baseline", default="holt_winters", choices=BASELINE_MODELS)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df, status = load_data()
+    assert status == "Success", status
+    cube = SalesCube(SalesAggregates.from_frame(df))
+    settings = get_frequency_settings(args.frequency)
+    season, test = settings["seasonal_period"], settings["test_periods"]
+
+    _, values, first, last = cube.panel(args.frequency)
+    n_categories, n_regions = len(cube.categories), len(cube.regions)
+    Y = right_align(values.reshape(-1, values.shape[2]), first.ravel(), last.ravel())
+    train, actual = Y[:, :-test], Y[:, -test:]
+    S = summing_matrix(n_categories, n_regions)
+    rows = base_rows(n_categories, n_regions)
+    levels = _levels(n_categories, n_regions)
+
+    base, _, _ = forecast_baselines(fit_baselines(train, args.baseline, season), test)
+    residuals = backtest_errors(train, args.baseline, season, test)
+    totals = np.nansum(train, axis=1)
+    proportions = totals[rows] / totals[0]
+
+    print(f"{args.frequency}: {len(Y)} series ({len(rows)} de base), prueba de {test} períodos, base {args.baseline}")
+    print(f"{'método':>12}" + "".join(f"{level:>17}" for level in LEVELS) + f"{'coherencia':>13}{'ms':>8}")
+    print(f"{'base':>12}" + "".join(f"{_mape(actual, base, levels[level]):>16.1f}%" for level in LEVELS)
+          + f"{coherence_error(np.nan_to_num(base), S, rows):>13.1f}")
+    for method in RECONCILIATION_METHODS:
+        start = time.perf_counter()
+        G, _ = reconciliation_matrix(S, method, rows, proportions, residuals)
+        forecasts = reconcile(np.nan_to_num(base), S, G)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{method:>12}" + "".join(f"{_mape(actual, forecasts, levels[level]):>16.1f}%" for level in LEVELS)
+              + f"{coherence_error(forecasts, S, rows):>13.1e}{elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compara el tiempo de carga en frío (parseo del Excel + escritura de la caché)
+contra la carga en caliente (lectura de la caché Parquet).
+
+Uso:
+    python -m benchmarks.bench_load_data [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from backend import data_processing
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not data_processing.PARQUET_AVAILABLE:
+        print("pyarrow no está instalado: la caché columnar está desactivada.")
+        return
+
+    # Usamos un directorio de caché temporal para no tocar la caché real
+    data_processing.CACHE_DIR = tempfile.mkdtemp(prefix="bench_cache_")
+    try:
+        cold, warm = [], []
+        for _ in range(args.repeat):
+            shutil.rmtree(data_processing.CACHE_DIR, ignore_errors=True)
+            elapsed, (df, status) = _timed(data_processing.load_data)
+            assert status == "Success", status
+            cold.append(elapsed)
+
+            elapsed, (df_cached, status) = _timed(data_processing.load_data)
+            assert status == "Success", status
+            warm.append(elapsed)
+
+        assert df.shape == df_cached.shape
+
+        cold_best, warm_best = min(cold), min(warm)
+        print(f"Filas: {len(df):,}  Columnas: {df.shape[1]}")
+        print(f"{'Carga':<28}{'mejor (ms)':>12}{'media (ms)':>12}")
+        print(f"{'Fría (Excel + caché)':<28}{cold_best * 1000:>12.1f}{sum(cold) / len(cold) * 1000:>12.1f}")
+        print(f"{'Caliente (Parquet)':<28}{warm_best * 1000:>12.1f}{sum(warm) / len(warm) * 1000:>12.1f}")
+        print(f"Aceleración: {cold_best / warm_best:.1f}x")
+    finally:
+        shutil.rmtree(data_processing.CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Reporta el uso de memoria por columna del DataFrame en esquema completo vs. compacto.
+
+Uso:
+    python -m benchmarks.bench_memory [--workers 4]
+"""
+import argparse
+
+import pandas as pd
+
+from backend import data_processing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="Workers por host para estimar el total.")
+    args = parser.parse_args()
+
+    df_full, status = data_processing.load_data(use_cache=False, compact=False)
+    assert status == "Success", status
+    df_compact = data_processing.compact_dataframe(df_full)
+
+    report = data_processing.memory_report(df_full, df_compact)
+    with pd.option_context('display.width', 120, 'display.max_rows', 100):
+        print(report.to_string(float_format=lambda v: f"{v:,.1f}"))
+
+    total_before = report.loc['TOTAL', 'bytes_before'] / 1e6
+    total_after = report.loc['TOTAL', 'bytes_after'] / 1e6
+    print(f"\nTotal por worker: {total_before:.2f} MB -> {total_after:.2f} MB")
+    print(f"Total con {args.workers} workers: {total_before * args.workers:.2f} MB -> {total_after * args.workers:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Métricas de error (backend/models/metrics.py) de muchas series a la vez: tiempo de
+una sola llamada vectorizada sobre [serie, h] vs. una llamada por serie, con ventas
+sintéticas (períodos en 0 y series de distinto largo incluidos).
+
+Uso:
+    python -m benchmarks.bench_metrics [--series 20 200 2000] [--horizon 12] [--season 12]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.models.metrics import forecast_metrics, score_series
+
+
+def _best_of(fn, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic(n_series, n_periods, rng):
+    # Ventas con estacionalidad, algunos períodos en 0 y el inicio de algunas series en NaN
+    periods = np.arange(n_periods)
+    level = rng.uniform(100, 10000, (n_series, 1))
+    values = level * (1 + 0.3 * np.sin(2 * np.pi * periods / 12)) * rng.lognormal(0, 0.2, (n_series, n_periods))
+    values[rng.random(values.shape) < 0.05] = 0.0
+    starts = rng.integers(0, n_periods // 2, n_series)
+    values[periods[None, :] < starts[:, None]] = np.nan
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--horizon", type=int, default=12)
+    parser.add_argument("--season", type=int, default=12)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'series':>8}{'vectorizado (ms)':>18}{'por serie (ms)':>16}{'aceleración':>13}")
+    for n_series in args.series:
+        values = _synthetic(n_series, 48 + args.horizon, rng)
+        history, actual = values[:, :-args.horizon], values[:, -args.horizon:]
+        predictions = actual * rng.normal(1, 0.15, actual.shape)
+        lower, upper = predictions * 0.8, predictions * 1.2
+
+        vectorized = _best_of(lambda: forecast_metrics(actual, predictions, lower, upper, history, args.season))
+
+        def _loop():
+            for i in range(n_series):
+                score_series(actual[i], predictions[i], lower[i], upper[i], history[i], args.season)
+        loop = _best_of(_loop, repeat=2)
+
+        # Mismo resultado serie por serie
+        metrics = forecast_metrics(actual, predictions, lower, upper, history, args.season)
+        single = score_series(actual[-1], predictions[-1], lower[-1], upper[-1], history[-1], args.season)
+        assert all(np.isclose(metrics[name][-1], value, equal_nan=True) for name, value in single.items())
+
+        print(f"{n_series:>8}{vectorized * 1000:>18.3f}{loop * 1000:>16.3f}{loop / vectorized:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Rendimiento del backtest de origen móvil (folds por segundo):
+- frío: cada fold de SARIMA arranca el optimizador desde cero,
+- warm start: cada fold arranca con los parámetros del fold anterior (un solo proceso),
+- paralelo: los folds repartidos en tramos contiguos entre N procesos (warm start dentro de cada
+  tramo), con el mismo reparto que el servicio (fold_chunks).
+La columna "warm start" es la fracción de folds que arrancó con los parámetros del fold anterior.
+
+Uso:
+    python -m benchmarks.bench_rolling_backtest [--model sarima] [--frequency W] [--folds 8] [--workers 2]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.data_processing import aggregate_sales, load_data
+from backend.models.frequency import get_frequency_settings
+from backend.services.backtest_service import CV_FOLDS, fold_chunks, rolling_origins
+from backend.services.model_executor import MODEL_POOL_START_METHOD, _worker_init, cv_task, warm_up_task
+
+
+def _iterations(folds):
+    return sum(fold.get("iterations") or 0 for fold in folds)
+
+
+def _warm_rate(folds):
+    return sum(bool(fold.get("warm_start")) for fold in folds) / len(folds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="sarima")
+    parser.add_argument("--frequency", default="ME")
+    parser.add_argument("--category", default="All Categories")
+    parser.add_argument("--region", default="All Regions")
+    parser.add_argument("--folds", type=int, default=8)
+    parser.add_argument("--horizon", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df, status = load_data()
+    assert status == "Success", status
+    ts_history, _ = aggregate_sales(df, args.category, args.region, args.frequency)
+    settings = get_frequency_settings(args.frequency)
+    horizon = args.horizon or max(1, settings["test_periods"] // 2)
+    needed = settings["min_periods"] + args.folds * horizon
+    if len(ts_history) < needed:
+        raise SystemExit(f"Datos insuficientes: {len(ts_history)} períodos, se necesitan {needed}.")
+    origins = rolling_origins(len(ts_history), args.folds, horizon)
+    run_folds = CV_FOLDS[args.model]
+
+    print(f"{args.model} {args.frequency}: {len(ts_history)} períodos, {args.folds} folds de {horizon}, núcleos={os.cpu_count()}")
+    print(f"{'modo':>24}{'total (s)':>11}{'folds/s':>9}{'iteraciones':>13}{'warm start':>12}")
+
+    def _report(name, elapsed, folds):
+        print(f"{name:>24}{elapsed:>11.2f}{len(folds) / elapsed:>9.2f}{_iterations(folds):>13}{_warm_rate(folds):>12.0%}")
+
+    # 1. Frío: un fold por llamada, sin parámetros iniciales
+    start = time.perf_counter()
+    cold = [fold for origin in origins for fold in run_folds(ts_history, args.frequency, [origin], horizon)]
+    _report("frío (secuencial)", time.perf_counter() - start, cold)
+
+    # 2. Warm start: todos los folds encadenados en un proceso
+    start = time.perf_counter()
+    warm = run_folds(ts_history, args.frequency, origins, horizon)
+    _report("warm start (secuencial)", time.perf_counter() - start, warm)
+
+    # 3. Paralelo: tramos contiguos en el pool de procesos
+    context = multiprocessing.get_context(MODEL_POOL_START_METHOD)
+    with ProcessPoolExecutor(args.workers, mp_context=context, initializer=_worker_init) as pool:
+        list(pool.map(warm_up_task, range(args.workers)))
+        start = time.perf_counter()
+        chunks = fold_chunks(origins, args.workers)
+        futures = [pool.submit(cv_task, args.model, ts_history, args.frequency, chunk, horizon) for chunk in chunks]
+        parallel = [fold for future in futures for fold in future.result()]
+        _report(f"paralelo ({len(chunks)} tramos)", time.perf_counter() - start, parallel)
+
+
+if __name__ == "__main__":
+    main()
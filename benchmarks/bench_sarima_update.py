@@ -0,0 +1,80 @@
+"""
+Actualización incremental de SARIMA (parámetros existentes aplicados a la historia
+completa, ver update_sarima) vs. reentrenamiento completo, a medida que crece la
+historia: para cada corte se entrena con la historia hasta el corte y se agregan
+'--new' períodos.
+- tiempo del reentrenamiento en frío, del reentrenamiento arrancando desde los
+  parámetros anteriores y de la actualización,
+- deriva de la actualización y diferencia de su pronóstico con el reentrenamiento.
+
+Uso:
+    python -m benchmarks.bench_sarima_update [--frequency W] [--new 4] [--cuts 4]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from backend.aggregates import SalesAggregates
+from backend.cube import SalesCube
+from backend.data_processing import aggregate_sales, load_data
+from backend.models.frequency import get_frequency_settings
+from backend.models.sarima_model import fit_sarima, update_sarima
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frequency", default="W")
+    parser.add_argument("--category", default="All Categories")
+    parser.add_argument("--region", default="All Regions")
+    parser.add_argument("--new", type=int, default=4, help="Períodos nuevos por actualización")
+    parser.add_argument("--cuts", type=int, default=4, help="Largos de historia a medir")
+    parser.add_argument("--steps", type=int, default=12)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df, status = load_data()
+    assert status == "Success", status
+    cube = SalesCube(SalesAggregates.from_frame(df))
+    ts_history, _ = aggregate_sales(cube, args.category, args.region, args.frequency)
+
+    min_periods = get_frequency_settings(args.frequency)["min_periods"]
+    first_cut = min_periods + 1
+    last_cut = len(ts_history) - args.new
+    if last_cut < first_cut:
+        raise SystemExit(f"Historia insuficiente: {len(ts_history)} períodos, se necesitan > {first_cut + args.new}.")
+    cuts = np.unique(np.linspace(first_cut, last_cut, args.cuts).astype(int))
+
+    print(f"{args.frequency} {args.category}/{args.region}: {len(ts_history)} períodos, +{args.new} por actualización")
+    print(f"{'historia':>9}{'frío (s)':>10}{'tibio (s)':>11}{'update (s)':>12}{'aceleración':>13}{'deriva':>9}{'Δ pronóstico':>14}")
+    for cut in cuts:
+        base, _ = fit_sarima(ts_history.iloc[:cut], args.frequency)
+        if base is None:
+            continue
+        extended = ts_history.iloc[:cut + args.new]
+
+        (cold, _), cold_seconds = _timed(fit_sarima, extended, args.frequency)
+        (_, _), warm_seconds = _timed(fit_sarima, extended, args.frequency, start_params=base.params)
+        (updated, drift, _), update_seconds = _timed(
+            update_sarima, extended, args.frequency, base.params, base.model.order, base.model.seasonal_order,
+            base.llf, base.nobs, base.loglikelihood_burn
+        )
+
+        # Diferencia relativa media entre el pronóstico actualizado y el reentrenado
+        cold_forecast = cold.forecast(args.steps).to_numpy()
+        updated_forecast = updated.forecast(args.steps).to_numpy()
+        difference = np.mean(np.abs(updated_forecast - cold_forecast)) / np.mean(np.abs(cold_forecast)) * 100
+
+        print(f"{cut + args.new:>9}{cold_seconds:>10.2f}{warm_seconds:>11.2f}{update_seconds:>12.3f}"
+              f"{cold_seconds / update_seconds:>12.1f}x{drift:>9.2f}{difference:>13.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,11 @@ def fetch_config():
     """
     try:
         response = requests.get(f"{API_BASE_URL}/config/filters")
+        if response.status_code == 503:
+            # El backend está arriba pero todavía cargando el dataset
+            retry_after = response.headers.get("Retry-After", "unos")
+            st.info(f"⏳ El API está cargando los datos. Recargue la página en {retry_after} segundos.")
+            st.stop()
         response.raise_for_status()
         return response.json()
     except requests.exceptions.ConnectionError:
@@ -40,35 +45,28 @@ def fetch_global_kpis():
         return None
 
 
-def fetch_forecast(category, region, model_type, steps, frequency_code):
+def fetch_forecast(category, region, model_type, steps, frequency_code, filters=None):
     """
     Obtiene el pronóstico y la evaluación para los filtros seleccionados.
     Ahora envía los parámetros de 'steps' y 'frequency_code'.
+    'filters' es un dict opcional {dimensión: [valores]} (segment, state, sub_category, ship_mode).
     """
+    # Los filtros multi-valor se envían como parámetros repetidos
+    extra_params = {dim: values for dim, values in (filters or {}).items() if values}
     try:
-        # 1. Llamamos al endpoint de evaluación
-        eval_response = requests.get(f"{API_BASE_URL}/sales/evaluation", params={
-            "model_type": model_type.lower(), 
-            "category": category, 
-            "region": region,
-            "frequency": frequency_code
-        })
-        eval_response.raise_for_status()
-        metrics = eval_response.json()
-        
-        # 2. Llamamos al endpoint de pronóstico
-        forecast_response = requests.get(f"{API_BASE_URL}/sales/forecast", params={
+        # Un solo endpoint: el backend agrega la serie una vez y entrena en paralelo
+        # el modelo de evaluación (backtest) y el de pronóstico
+        response = requests.get(f"{API_BASE_URL}/sales/forecast_report", params={
             "model_type": model_type.lower(), 
             "category": category, 
             "region": region,
             "steps": steps,          
-            "frequency": frequency_code 
+            "frequency": frequency_code,
+            **extra_params
         })
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
+        response.raise_for_status()
+        forecast_data = response.json()
         
-        # 3. Combinamos la respuesta
-        forecast_data['metrics'] = metrics
         forecast_data['model_used'] = model_type.upper() # Guardar como 'SARIMA' o 'XGBOOST'
         
         return forecast_data
@@ -12,8 +12,17 @@ def render_forecast_tab(config):
     # --- Sidebar de Filtros ---
     st.sidebar.header("Configuración del Pronóstico")
     
-    model_options = ["SARIMA", "XGBoost"]
-    selected_model = st.sidebar.selectbox("Modelo de Pronóstico:", model_options)
+    model_options = {
+        "SARIMA": "sarima",
+        "XGBoost": "xgboost",
+        "XGBoost Global": "xgboost_global",
+        "Baseline: Naive Estacional": "seasonal_naive",
+        "Baseline: Drift": "drift",
+        "Baseline: Media Móvil": "moving_average",
+        "Baseline: Suavizado Exponencial Simple": "ses",
+        "Baseline: Holt-Winters": "holt_winters"
+    }
+    selected_model = st.sidebar.selectbox("Modelo de Pronóstico:", list(model_options))
     
     # Lógica de Frecuencias
     all_freqs = config.get("frequencies", {"Mensual (ME)": "ME"})
@@ -30,11 +39,29 @@ def render_forecast_tab(config):
     region_options = config.get("regions", [])
     selected_region = st.sidebar.selectbox("Región:", region_options, index=0)
     
+    # Filtros adicionales (multi-selección, opcionales)
+    dimensions = config.get("dimensions", {})
+    dimension_labels = {
+        "segment": "Segmento:",
+        "state": "Estado:",
+        "sub_category": "Subcategoría:",
+        "ship_mode": "Modo de Envío:"
+    }
+    selected_filters = {}
+    with st.sidebar.expander("Filtros adicionales"):
+        for dim, label in dimension_labels.items():
+            if dimensions.get(dim):
+                selected_filters[dim] = st.multiselect(label, dimensions[dim])
+    
     # Slider de Horizonte (dinámico)
     if selected_freq_name == "Mensual (ME)":
         min_val, max_val, def_val = 1, 36, 12
     elif selected_freq_name == "Trimestral (QE)":
         min_val, max_val, def_val = 1, 8, 4
+    elif selected_freq_name == "Semanal (W)":
+        min_val, max_val, def_val = 1, 52, 12
+    elif selected_freq_name == "Diario (D)":
+        min_val, max_val, def_val = 1, 90, 30
     else: # Por si acaso
         min_val, max_val, def_val = 1, 3, 2
         
@@ -52,9 +79,10 @@ def render_forecast_tab(config):
             forecast_result = fetch_forecast(
                 selected_category,
                 selected_region,
-                selected_model,
+                model_options[selected_model],
                 forecast_steps,
-                selected_freq_code
+                selected_freq_code,
+                selected_filters
             )
         
         if forecast_result:
@@ -70,8 +98,8 @@ def render_forecast_tab(config):
         display_metrics(data['metrics'], f"Evaluación de Precisión ({selected_model})")
         display_forecast_chart_and_table(data)
         
-        if selected_model == "XGBoost":
-            st.info("💡 **Nota:** XGBoost no calcula intervalos de confianza por defecto.")
+        if selected_model.startswith("XGBoost"):
+            st.info("💡 **Nota:** los intervalos de XGBoost son conformales (95%), calibrados con los errores del backtest.")
             
     elif st.session_state.get('forecast_data') is None:
         st.info("Seleccione los filtros y haga clic en 'Generar Pronóstico' para comenzar el análisis.")
\ No newline at end of file